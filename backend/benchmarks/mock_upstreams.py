@@ -0,0 +1,123 @@
+"""
+Local stand-ins for every upstream the backend calls.
+
+MockUpstreams is an httpx transport, installed as `upstream.transport`,
+that answers EVM JSON-RPC (single and batched), XRPL JSON-RPC, Solana,
+Blockstream/mempool, TronGrid and CoinGecko requests from memory. Each
+upstream kind gets its own latency, jitter and error rate, so a run can
+model a slow price API or a flaky RPC node.
+"""
+import asyncio
+import json
+import random
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs
+
+import httpx
+
+KINDS = ("evm", "xrpl", "solana", "bitcoin", "tron", "coingecko")
+
+
+@dataclass
+class Profile:
+    latency_ms: float = 50.0
+    jitter_ms: float = 10.0
+    error_rate: float = 0.0
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+
+class MockUpstreams(httpx.AsyncBaseTransport):
+    """Answers upstream requests in-process with injected latency and errors"""
+
+    def __init__(self, profiles: Optional[Dict[str, Profile]] = None, seed: Optional[int] = None):
+        self.profiles = {kind: Profile() for kind in KINDS}
+        self.profiles.update(profiles or {})
+        self.random = random.Random(seed)
+        self.requests = {kind: 0 for kind in KINDS}
+        self.errors = {kind: 0 for kind in KINDS}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(await request.aread() or b"null")
+        kind = self.classify(request, body)
+        profile = self.profiles[kind]
+        self.requests[kind] += 1
+        await asyncio.sleep(profile.delay(self.random))
+        if self.random.random() < profile.error_rate:
+            self.errors[kind] += 1
+            return httpx.Response(503, json={"error": "injected"})
+        return httpx.Response(200, json=getattr(self, f"_{kind}")(request, body))
+
+    @staticmethod
+    def classify(request: httpx.Request, body: Any) -> str:
+        host, path = request.url.host, request.url.path
+        if "coingecko" in host:
+            return "coingecko"
+        if "/wallet/" in path:
+            return "tron"
+        if "/address/" in path or path.endswith("/blocks/tip/height"):
+            return "bitcoin"
+        method = (body[0] if isinstance(body, list) else body or {}).get("method", "")
+        if method.startswith(("eth_", "net_", "web3_")):
+            return "evm"
+        if method in ("getBalance", "getHealth", "getTokenAccountsByOwner"):
+            return "solana"
+        return "xrpl"
+
+    # ---- responses ----
+
+    def _balance(self, address: str, scale: int) -> int:
+        # Stable across runs, unlike hash()
+        return (zlib.crc32(address.encode()) % 1000 + 1) * scale
+
+    def _evm(self, request, body):
+        def reply(call):
+            method = call["method"]
+            if method == "eth_getBalance":
+                result = hex(self._balance(call["params"][0], 10 ** 15))
+            elif method == "eth_blockNumber":
+                result = hex(20_000_000)
+            else:
+                return {"jsonrpc": "2.0", "id": call.get("id"), "error": {"code": -32601, "message": "not mocked"}}
+            return {"jsonrpc": "2.0", "id": call.get("id"), "result": result}
+        return [reply(call) for call in body] if isinstance(body, list) else reply(body)
+
+    def _xrpl(self, request, body):
+        method = body.get("method")
+        params = (body.get("params") or [{}])[0]
+        if method == "account_info":
+            balance = str(self._balance(params["account"], 10 ** 6))
+            return {"result": {"status": "success", "account_data": {"Account": params["account"], "Balance": balance}}}
+        if method == "account_lines":
+            return {"result": {"status": "success", "lines": []}}
+        return {"result": {"status": "success", "info": {"server_state": "full"}}}
+
+    def _solana(self, request, body):
+        method = body["method"]
+        if method == "getBalance":
+            return {"jsonrpc": "2.0", "id": body.get("id"), "result": {"value": self._balance(body["params"][0], 10 ** 7)}}
+        if method == "getTokenAccountsByOwner":
+            return {"jsonrpc": "2.0", "id": body.get("id"), "result": {"value": []}}
+        return {"jsonrpc": "2.0", "id": body.get("id"), "result": "ok"}
+
+    def _bitcoin(self, request, body):
+        if request.url.path.endswith("/blocks/tip/height"):
+            return 850_000
+        address = request.url.path.rsplit("/", 1)[-1]
+        return {"chain_stats": {"funded_txo_sum": self._balance(address, 10 ** 5), "spent_txo_sum": 0}}
+
+    def _tron(self, request, body):
+        if request.url.path.endswith("/getaccount"):
+            return {"balance": self._balance(body["address"], 10 ** 6)}
+        return {"block_header": {"raw_data": {"number": 60_000_000}}}
+
+    def _coingecko(self, request, body):
+        query = parse_qs(request.url.query.decode())
+        if request.url.path.endswith("/simple/price"):
+            ids = query.get("ids", [""])[0].split(",")
+            return {coin: {"usd": 1.0 + len(coin), "usd_24h_change": 0.5} for coin in ids if coin}
+        start, end = int(query["from"][0]), int(query["to"][0])
+        return {"prices": [[t * 1000, 2.0 + (t // 3600) % 24 / 100] for t in range(start - start % 3600, end, 3600)]}
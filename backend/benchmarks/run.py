@@ -0,0 +1,272 @@
+"""
+Offline load benchmark.
+
+Runs the FastAPI app in-process behind an ASGI transport, with every
+upstream answered by MockUpstreams, and drives each scenario with
+concurrent clients for a fixed time. Results (throughput, p50/p95/p99
+latency, RSS) are written as JSON so runs can be diffed between commits.
+
+    cd backend
+    python -m benchmarks.run --duration 10 --concurrency 50 --output after.json
+    python -m benchmarks.run --latency evm=120 --error-rate coingecko=0.2
+    python -m benchmarks.run --compare before.json after.json --fail-over 10
+
+Mongo comes from MONGO_URL (a throwaway bench_* database that is dropped
+afterwards); `--mongo mock` uses mongomock-motor instead when installed.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List
+
+from dotenv import load_dotenv
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+SCENARIOS = ("balances_multi", "prices", "login", "wallets")
+MULTI_CHAINS = ("ethereum", "bsc", "polygon", "arbitrum", "xrp", "solana", "bitcoin", "tron")
+
+
+def parse_overrides(values: List[str], cast=float) -> Dict[str, Any]:
+    overrides = {}
+    for value in values or []:
+        kind, _, number = value.partition("=")
+        overrides[kind] = cast(number)
+    return overrides
+
+
+def percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def address_for(chain: str, i: int) -> str:
+    if chain == "xrp":
+        return f"rBench{i:026d}"
+    if chain == "solana":
+        return f"So1Bench{i:036d}"
+    if chain == "bitcoin":
+        return f"bc1qbench{i:033d}"
+    if chain == "tron":
+        return f"TBench{i:028d}"
+    return f"0x{i:040x}"
+
+
+async def drive(request: Callable[[int], Awaitable[Any]], concurrency: int, duration: float) -> Dict[str, Any]:
+    """Run `concurrency` closed-loop clients for `duration` seconds"""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    deadline = time.perf_counter() + duration
+
+    async def client(worker: int):
+        i = worker
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = str((await request(i)).status_code)
+            except Exception as e:
+                status = type(e).__name__
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            i += concurrency
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    await asyncio.gather(*(client(w) for w in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    ok = sum(n for s, n in statuses.items() if s.startswith("2"))
+    return {
+        "requests": len(ordered),
+        "errors": len(ordered) - ok,
+        "throughput_rps": round(len(ordered) / elapsed, 1),
+        "latency_ms": {
+            "p50": round(percentile(ordered, 50) * 1000, 2),
+            "p95": round(percentile(ordered, 95) * 1000, 2),
+            "p99": round(percentile(ordered, 99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            "mean": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        },
+        "status_codes": statuses,
+        "memory_mb": {"rss_before": round(rss_before, 1), "rss_after": round(rss_mb(), 1), "peak_rss": round(peak_rss_mb(), 1)},
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    import server
+    from benchmarks.mock_upstreams import KINDS, MockUpstreams, Profile
+
+    # server configures INFO logging; a line per in-process request would dominate the run and its timings
+    logging.getLogger().setLevel(args.log_level)
+
+    latency, jitter, errors = parse_overrides(args.latency), parse_overrides(args.jitter), parse_overrides(args.error_rate)
+    profiles = {
+        kind: Profile(latency.get(kind, args.latency_ms), jitter.get(kind, args.jitter_ms), errors.get(kind, 0.0))
+        for kind in KINDS
+    }
+    mocks = MockUpstreams(profiles, seed=args.seed)
+    server.upstream.transport = mocks
+
+    if args.mongo == "mock":
+        from mongomock_motor import AsyncMongoMockClient
+        db = AsyncMongoMockClient()[os.environ["DB_NAME"]]
+        # Stores created at import keep their own reference to the database
+        server.db = server.price_history.db = server.token_metadata.db = server.snapshot_scheduler.db = db
+
+    app = server.app
+    transport = httpx.ASGITransport(app=app)
+    results: Dict[str, Any] = {}
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            # Measure a warm server, as traffic only reaches a pod once it reports ready
+            while True:
+                ready = await client.get("/api/ready")
+                if ready.status_code == 200:
+                    break
+                if ready.json()["failed"]:
+                    raise SystemExit(f"Startup failed in phase {ready.json()['failed']}")
+                await asyncio.sleep(0.1)
+            # Fixtures: users to log in as, and one user with a page of wallets
+            password = "BenchPass123"
+            emails = [f"bench_{i}@example.com" for i in range(args.users)]
+            tokens = []
+            for email in emails:
+                response = await client.post("/api/auth/register", json={"email": email, "password": password})
+                tokens.append(response.json()["access_token"])
+            headers = {"Authorization": f"Bearer {tokens[0]}"}
+            await client.post("/api/wallets/bulk", headers=headers, json={
+                "wallets": [{"name": f"Bench {i}"} for i in range(args.wallets)]
+            })
+
+            requests: Dict[str, Callable[[int], Awaitable[Any]]] = {
+                "balances_multi": lambda i: client.post("/api/balances/multi", json={
+                    chain: address_for(chain, i % args.address_pool) for chain in MULTI_CHAINS
+                }),
+                "prices": lambda i: client.get("/api/prices"),
+                "login": lambda i: client.post("/api/auth/login", json={"email": emails[i % len(emails)], "password": password}),
+                "wallets": lambda i: client.get("/api/wallets", headers=headers),
+            }
+
+            for name in args.scenarios:
+                if args.warmup:
+                    await drive(requests[name], args.concurrency, args.warmup)
+                results[name] = await drive(requests[name], args.concurrency, args.duration)
+                print(f"{name:>16}: {results[name]['throughput_rps']:>8} req/s  "
+                      f"p50 {results[name]['latency_ms']['p50']:>8} ms  "
+                      f"p95 {results[name]['latency_ms']['p95']:>8} ms  "
+                      f"p99 {results[name]['latency_ms']['p99']:>8} ms  "
+                      f"errors {results[name]['errors']}", flush=True)
+
+        if args.mongo != "mock":
+            await server.client.drop_database(os.environ["DB_NAME"])
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("compare", "output", "log_level")},
+        },
+        "scenarios": results,
+        "upstream": {"requests": mocks.requests, "injected_errors": mocks.errors},
+    }
+
+
+def compare(before_path: str, after_path: str, fail_over: float) -> int:
+    """Print per-scenario changes; non-zero exit when a regression exceeds fail_over percent"""
+    before = json.loads(Path(before_path).read_text())
+    after = json.loads(Path(after_path).read_text())
+    print(f"{before['meta']['commit']} -> {after['meta']['commit']}")
+    regressions = []
+    for name, new in after["scenarios"].items():
+        old = before["scenarios"].get(name)
+        if old is None:
+            continue
+        rows = [("throughput_rps", old["throughput_rps"], new["throughput_rps"], True)]
+        rows += [(f"{p} ms", old["latency_ms"][p], new["latency_ms"][p], False) for p in ("p50", "p95", "p99")]
+        rows.append(("peak_rss mb", old["memory_mb"]["peak_rss"], new["memory_mb"]["peak_rss"], False))
+        print(f"\n{name}")
+        for metric, a, b, higher_is_better in rows:
+            change = (b - a) / a * 100 if a else 0.0
+            worse = -change if higher_is_better else change
+            flag = "  REGRESSION" if fail_over and worse > fail_over else ""
+            if flag:
+                regressions.append(f"{name} {metric}")
+            print(f"  {metric:<16}{a:>12.2f}{b:>12.2f}{change:>+9.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds before each scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--users", type=int, default=20, help="registered users the login scenario cycles through")
+    parser.add_argument("--wallets", type=int, default=50, help="wallets owned by the wallet-listing user")
+    parser.add_argument("--address-pool", type=int, default=1000, help="distinct addresses per chain (lower = more cache hits)")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="default upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="default upstream latency std-dev")
+    parser.add_argument("--latency", action="append", metavar="KIND=MS", help="per-upstream latency, e.g. evm=120")
+    parser.add_argument("--jitter", action="append", metavar="KIND=MS")
+    parser.add_argument("--error-rate", action="append", metavar="KIND=RATE", help="e.g. coingecko=0.2")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo", choices=("url", "mock"), default="url")
+    parser.add_argument("--log-level", default="WARNING", choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    parser.add_argument("--output", default=None, help="result file (default benchmark-<commit>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"))
+    parser.add_argument("--fail-over", type=float, default=0.0, help="with --compare, exit 1 on regressions above this percent")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(*args.compare, args.fail_over))
+
+    load_dotenv(BACKEND_DIR / ".env")
+    os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    os.environ["DB_NAME"] = f"bench_{os.getpid()}"
+    # Background work that would skew the measurements or needs a real network
+    os.environ["XRPL_WS_ENABLED"] = "false"
+    os.environ["SNAPSHOTS_ENABLED"] = "false"
+    os.environ.setdefault("TRACE_EXPORTER", "")
+    sys.path.insert(0, str(BACKEND_DIR))
+
+    result = asyncio.run(run(args))
+    output = args.output or f"benchmark-{result['meta']['commit']}.json"
+    Path(output).write_text(json.dumps(result, indent=2))
+    print(f"\nWrote {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+In-process caches: a bounded TTL/LRU map, single-flight call coalescing
+and the balance cache built on top of them.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+BALANCE_CACHE_MAX_ENTRIES = int(os.environ.get("BALANCE_CACHE_MAX_ENTRIES", 50000))
+BALANCE_CACHE_TTL_BLOCKS = float(os.environ.get("BALANCE_CACHE_TTL_BLOCKS", 2))
+BALANCE_CACHE_MIN_TTL = float(os.environ.get("BALANCE_CACHE_MIN_TTL", 5))
+BALANCE_CACHE_MAX_TTL = float(os.environ.get("BALANCE_CACHE_MAX_TTL", 300))
+# Balances whose changes are pushed to us (XRPL account subscriptions) only need an occasional re-poll
+BALANCE_CACHE_PUSH_TTL = float(os.environ.get("BALANCE_CACHE_PUSH_TTL", 600))
+
+
+class TTLCache:
+    """LRU map with per-entry expiry and a hard cap on entry count"""
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_entry(self, key: Hashable) -> Optional[Tuple[Any, float, float]]:
+        """Return (value, stored_at, expires_at) even if expired, or None"""
+        entry = self._data.get(key)
+        if entry is not None:
+            self._data.move_to_end(key)
+        return entry
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.get_entry(key)
+        if entry is None or entry[2] < time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        now = time.time()
+        self._data[key] = (value, now, now + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0,
+        }
+
+
+class SingleFlight:
+    """Collapses concurrent calls for the same key into one in-flight call"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so a cancelled waiter does not cancel the shared call
+        return await asyncio.shield(future)
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+class BalanceCache:
+    """Balance responses keyed by (chain, address), TTL derived from block time"""
+
+    def __init__(self, chains: Dict[str, dict], max_entries: int = BALANCE_CACHE_MAX_ENTRIES):
+        self.chains = chains
+        self.entries = TTLCache(max_entries, BALANCE_CACHE_MIN_TTL)
+        self.flight = SingleFlight()
+        self.listeners: List[Callable[[str, str, dict], None]] = []
+        # (chain, address) -> True while balance changes for it are pushed, so polling can wait
+        self.pushed: Optional[Callable[[str, str], bool]] = None
+
+    def ttl_for(self, chain: str, address: Optional[str] = None) -> float:
+        if address is not None and self.pushed is not None and self.pushed(chain, address):
+            return BALANCE_CACHE_PUSH_TTL
+        block_time = self.chains.get(chain, {}).get("blockTime", 0)
+        return min(max(block_time * BALANCE_CACHE_TTL_BLOCKS, BALANCE_CACHE_MIN_TTL), BALANCE_CACHE_MAX_TTL)
+
+    @staticmethod
+    def key(chain: str, address: str) -> Tuple[str, str]:
+        # EVM addresses are case-insensitive; base58/XRPL addresses are not
+        return chain, address.lower() if address.startswith("0x") else address
+
+    async def get_or_fetch(self, chain: str, address: str,
+                           fetch: Callable[[], Awaitable[dict]]) -> dict:
+        key = self.key(chain, address)
+        value = self.entries.get(key)
+        if value is not None:
+            return self._tag(value, self.entries.get_entry(key)[1], stale=False)
+        return await self.flight.do(key, lambda: self._load(key, fetch))
+
+    async def _load(self, key: Tuple[str, str], fetch: Callable[[], Awaitable[dict]]) -> dict:
+        result = await fetch()
+        if "error" in result:
+            # Serve the last good value rather than a zero balance
+            entry = self.entries.get_entry(key)
+            if entry is not None:
+                return self._tag(entry[0], entry[1], stale=True)
+            return {**result, "cached_at": None, "stale": False}
+        self.put(key[0], key[1], result)
+        return self._tag(result, self.entries.get_entry(key)[1], stale=False)
+
+    def put(self, chain: str, address: str, result: dict):
+        self.entries.set(self.key(chain, address), result, self.ttl_for(chain, address))
+        for listener in self.listeners:
+            listener(chain, address, result)
+
+    def invalidate(self, chain: str, address: str):
+        self.entries.delete(self.key(chain, address))
+
+    @staticmethod
+    def _tag(value: dict, stored_at: float, stale: bool) -> dict:
+        cached_at = datetime.fromtimestamp(stored_at, timezone.utc).isoformat()
+        return {**value, "cached_at": cached_at, "stale": stale}
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.entries.stats(), "inflight": len(self.flight), "coalesced": self.flight.coalesced}
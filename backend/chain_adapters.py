@@ -0,0 +1,447 @@
+"""
+Chain adapters for native balance lookups.
+
+Every entry in SUPPORTED_CHAINS is bound to an adapter for its family
+(EVM, XRPL, Solana, Bitcoin, Tron), chosen from the config's `type` key,
+or EVM when it has a `chainId`. Adding a chain of an existing family is
+a config change only. Adapters convert base units with the chain's
+`decimals` and declare what the scheduler may do with them:
+
+- supports_batching: concurrent lookups are coalesced into batched RPC
+  calls, so they are not throttled per family
+- cacheable: results may be served from the balance cache
+- max_concurrency: upstream calls in flight for the whole family
+
+With an RpcRouter, each lookup is routed across the chain's endpoints;
+`probe` is the cheap call used for the router's health checks. Families
+with `supports_tokens` also read token balances: ERC-20 via one
+Multicall3 call, SPL via getTokenAccountsByOwner, XRPL trust lines via
+account_lines and TRC-20 via triggerconstantcontract.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional, Type
+
+from rpc_router import UpstreamError
+from tokens import (
+    BALANCE_OF, DECIMALS, DEFAULT_TOKENS, MULTICALL3_ADDRESS, SPL_SYMBOLS, SPL_TOKEN_PROGRAM, SYMBOL,
+    decode_aggregate3, decode_string, decode_uint, decode_xrpl_currency, encode_aggregate3, encode_call,
+    tron_address_param,
+)
+
+logger = logging.getLogger(__name__)
+
+CHAIN_FAMILY_CONCURRENCY = int(os.environ.get("CHAIN_FAMILY_CONCURRENCY", 16))
+XRPL_LINES_MAX_PAGES = int(os.environ.get("XRPL_LINES_MAX_PAGES", 10))
+# rippled errors meaning this server can't answer right now; another endpoint may
+XRPL_NODE_ERRORS = {
+    "tooBusy", "slowDown", "noNetwork", "noCurrent", "noClosed", "lgrNotFound", "amendmentBlocked",
+    "failedToForward", "internal",
+}
+
+
+class ChainAdapter:
+    """Native balance lookups for one configured chain"""
+
+    family = ""
+    supports_batching = False
+    supports_tokens = False
+    cacheable = True
+    max_concurrency: Optional[int] = CHAIN_FAMILY_CONCURRENCY
+
+    def __init__(self, chain: str, config: dict, upstream, rpc_batcher=None, xrpl_ws=None,
+                 rpc_router=None, token_metadata=None, semaphore: Optional[asyncio.Semaphore] = None):
+        self.chain = chain
+        self.config = config
+        self.upstream = upstream
+        self.rpc_batcher = rpc_batcher
+        self.xrpl_ws = xrpl_ws
+        self.rpc_router = rpc_router
+        self.token_metadata = token_metadata
+        self.semaphore = semaphore
+        self.url = config.get("httpRpc", config["rpc"])
+        self.symbol = config["symbol"]
+        self.scale = 10 ** config["decimals"]
+
+    def result(self, address: str, base_units: int = 0, error: Optional[str] = None) -> dict:
+        """Balance response with base units converted to whole coins"""
+        result = {"chain": self.chain, "address": address, "balance": base_units / self.scale, "symbol": self.symbol}
+        if error is not None:
+            result["error"] = error
+        return result
+
+    async def fetch_balance(self, address: str) -> dict:
+        try:
+            if self.semaphore is None:
+                return await self._route(address)
+            async with self.semaphore:
+                return await self._route(address)
+        except Exception as e:
+            logger.error(f"Error fetching {self.chain} balance: {e}")
+            return self.result(address, error=str(e))
+
+    async def fetch_tokens(self, address: str, tokens: List[str]) -> dict:
+        """Token balances for `tokens`, or the chain's defaults / everything held when empty"""
+        try:
+            if self.semaphore is None:
+                balances = await self._token_balances(address, tokens)
+            else:
+                async with self.semaphore:
+                    balances = await self._token_balances(address, tokens)
+            return {"chain": self.chain, "address": address, "tokens": balances}
+        except Exception as e:
+            logger.error(f"Error fetching {self.chain} token balances: {e}")
+            return {"chain": self.chain, "address": address, "tokens": [], "error": str(e)}
+
+    @staticmethod
+    def token(token: str, symbol: Optional[str], decimals: Optional[int], base_units) -> dict:
+        balance = base_units / 10 ** decimals if decimals is not None else base_units
+        return {"token": token, "symbol": symbol, "decimals": decimals, "balance": balance}
+
+    async def _call(self, fn):
+        """Run fn(url) against this chain's best endpoint"""
+        if self.rpc_router is None:
+            return await fn(self.url)
+        return await self.rpc_router.call(self.chain, fn)
+
+    async def _route(self, address: str) -> dict:
+        return await self._call(lambda url: self._fetch(address, url))
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        raise NotImplementedError
+
+    async def _token_balances(self, address: str, tokens: List[str]) -> List[dict]:
+        return []
+
+    async def probe(self, url: str):
+        raise NotImplementedError
+
+    @staticmethod
+    def _node_error(error) -> bool:
+        # JSON-RPC -32000..-32099 are node-side failures (rate limits, overload); try another endpoint
+        return isinstance(error, dict) and -32099 <= error.get("code", 0) <= -32000
+
+    @staticmethod
+    def _check(response):
+        if response.status_code >= 500 or response.status_code == 429:
+            raise UpstreamError(f"HTTP {response.status_code}")
+        return response
+
+
+class EvmAdapter(ChainAdapter):
+    family = "evm"
+    supports_batching = True
+    supports_tokens = True
+    max_concurrency = None
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        data = await self.rpc_batcher.call(url, "eth_getBalance", [address, "latest"])
+        if "result" in data:
+            return self.result(address, int(data["result"], 16))
+        elif "error" in data:
+            if self._node_error(data["error"]):
+                raise UpstreamError(str(data["error"]))
+            return self.result(address, error=str(data["error"]))
+        return self.result(address)
+
+    async def _multicall(self, calls: List[tuple]) -> List[tuple]:
+        """One eth_call to Multicall3 aggregate3 for all (target, callData) pairs"""
+        if not calls:
+            return []
+        target = self.config.get("multicall3", MULTICALL3_ADDRESS)
+        data = encode_aggregate3(calls)
+
+        async def call(url: str):
+            reply = await self.rpc_batcher.call(url, "eth_call", [{"to": target, "data": data}, "latest"])
+            if "error" in reply:
+                raise (UpstreamError if self._node_error(reply["error"]) else ValueError)(str(reply["error"]))
+            return decode_aggregate3(reply["result"])
+
+        return await self._call(call)
+
+    async def _token_metadata(self, tokens: List[str]) -> Dict[str, dict]:
+        metadata = await self.token_metadata.get_many(self.chain, tokens)
+        missing = [t for t in tokens if t not in metadata]
+        if missing:
+            results = await self._multicall([(t, DECIMALS) for t in missing] + [(t, SYMBOL) for t in missing])
+            found = {}
+            for i, token in enumerate(missing):
+                (decimals_ok, decimals), (symbol_ok, symbol) = results[i], results[len(missing) + i]
+                if decimals_ok and decode_uint(decimals) is not None:
+                    found[token] = {"decimals": decode_uint(decimals), "symbol": decode_string(symbol) if symbol_ok else None}
+            await self.token_metadata.put_many(self.chain, found)
+            metadata.update(found)
+        return metadata
+
+    async def _token_balances(self, address: str, tokens: List[str]) -> List[dict]:
+        tokens = [t.lower() for t in tokens or DEFAULT_TOKENS.get(self.chain, [])]
+        metadata = await self._token_metadata(tokens)
+        known = [t for t in tokens if t in metadata]
+        results = await self._multicall([(t, encode_call(BALANCE_OF, address)) for t in known])
+        balances = []
+        for token, (ok, data) in zip(known, results):
+            if ok and decode_uint(data) is not None:
+                balances.append(self.token(token, metadata[token]["symbol"], metadata[token]["decimals"], decode_uint(data)))
+        return balances
+
+    async def probe(self, url: str):
+        data = await self.rpc_batcher.call(url, "eth_blockNumber", [])
+        if "result" not in data:
+            raise UpstreamError(str(data.get("error")))
+
+
+class XrplAdapter(ChainAdapter):
+    family = "xrpl"
+    supports_tokens = True
+
+    async def _route(self, address: str) -> dict:
+        if self.xrpl_ws is not None and self.xrpl_ws.connected:
+            try:
+                data = await self.xrpl_ws.request("account_info", account=address, ledger_index="validated")
+                await self.xrpl_ws.track(address)
+                if "account_data" in data.get("result", {}):
+                    return self.result(address, int(data["result"]["account_data"]["Balance"]))
+                elif data.get("error") == "actNotFound":
+                    return self.result(address)
+            except Exception as e:
+                logger.warning(f"XRPL WebSocket lookup failed, falling back to HTTP: {e}")
+        return await super()._route(address)
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        response = await self.upstream.post(
+            url,
+            json={"method": "account_info", "params": [{"account": address, "ledger_index": "validated"}]},
+            timeout=10.0,
+        )
+        result = self._check(response).json().get("result", {})
+        if "account_data" in result:
+            return self.result(address, int(result["account_data"]["Balance"]))
+        elif result.get("error") == "actNotFound":
+            return self.result(address)
+        elif result.get("error") in XRPL_NODE_ERRORS:
+            raise UpstreamError(result["error"])
+        return self.result(address, error=str(result.get("error_message") or result.get("error") or "No account data"))
+
+    async def probe(self, url: str):
+        response = await self.upstream.post(url, json={"method": "server_info", "params": [{}]}, timeout=5.0)
+        self._check(response).raise_for_status()
+
+    async def _command(self, command: str, params: dict) -> dict:
+        """Result of a rippled command, over the WebSocket pool when it is up"""
+        if self.xrpl_ws is not None and self.xrpl_ws.connected:
+            try:
+                data = await self.xrpl_ws.request(command, **params)
+                if data.get("status") == "success":
+                    return data["result"]
+                elif data.get("error") == "actNotFound":
+                    return {}
+            except Exception as e:
+                logger.warning(f"XRPL WebSocket {command} failed, falling back to HTTP: {e}")
+
+        async def call(url: str):
+            response = await self.upstream.post(url, json={"method": command, "params": [params]}, timeout=10.0)
+            result = self._check(response).json().get("result", {})
+            if result.get("error") == "actNotFound":
+                return {}
+            if result.get("error") in XRPL_NODE_ERRORS:
+                raise UpstreamError(result["error"])
+            if result.get("status") != "success":
+                raise ValueError(result.get("error_message") or result.get("error"))
+            return result
+
+        return await self._call(call)
+
+    async def _token_balances(self, address: str, tokens: List[str]) -> List[dict]:
+        # Trust-line balances are decimal amounts already; tokens filters by issuer
+        balances, marker = [], None
+        for _ in range(XRPL_LINES_MAX_PAGES):
+            params = {"account": address, "ledger_index": "validated", "limit": 400}
+            if marker:
+                params["marker"] = marker
+            result = await self._command("account_lines", params)
+            for line in result.get("lines", []):
+                if tokens and line["account"] not in tokens:
+                    continue
+                balances.append(self.token(line["account"], decode_xrpl_currency(line["currency"]), None, float(line["balance"])))
+            marker = result.get("marker")
+            if not marker:
+                break
+        return balances
+
+
+class SolanaAdapter(ChainAdapter):
+    family = "solana"
+    supports_tokens = True
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        response = await self.upstream.post(
+            url,
+            json={"jsonrpc": "2.0", "id": 1, "method": "getBalance", "params": [address]},
+            timeout=10.0,
+        )
+        data = self._check(response).json()
+        if "result" in data and "value" in data["result"]:
+            return self.result(address, data["result"]["value"])
+        elif "error" in data:
+            if self._node_error(data["error"]):
+                raise UpstreamError(str(data["error"]))
+            return self.result(address, error=str(data["error"]))
+        return self.result(address, error="No balance in reply")
+
+    async def probe(self, url: str):
+        response = await self.upstream.post(url, json={"jsonrpc": "2.0", "id": 1, "method": "getHealth"}, timeout=5.0)
+        self._check(response).raise_for_status()
+
+    async def _token_balances(self, address: str, tokens: List[str]) -> List[dict]:
+        async def call(url: str):
+            response = await self.upstream.post(
+                url,
+                json={
+                    "jsonrpc": "2.0",
+                    "id": 1,
+                    "method": "getTokenAccountsByOwner",
+                    "params": [address, {"programId": SPL_TOKEN_PROGRAM}, {"encoding": "jsonParsed"}],
+                },
+                timeout=10.0,
+            )
+            data = self._check(response).json()
+            if "error" in data:
+                raise ValueError(str(data["error"]))
+            return data["result"]["value"]
+
+        held: Dict[str, List[int]] = {}  # mint -> [amount, decimals], summed across token accounts
+        for account in await self._call(call):
+            info = account["account"]["data"]["parsed"]["info"]
+            if tokens and info["mint"] not in tokens:
+                continue
+            entry = held.setdefault(info["mint"], [0, info["tokenAmount"]["decimals"]])
+            entry[0] += int(info["tokenAmount"]["amount"])
+
+        metadata = await self.token_metadata.get_many(self.chain, list(held))
+        found = {m: {"decimals": d, "symbol": SPL_SYMBOLS.get(m)} for m, (_, d) in held.items() if m not in metadata}
+        await self.token_metadata.put_many(self.chain, found)
+        metadata.update(found)
+        return [self.token(m, metadata[m]["symbol"], metadata[m]["decimals"], amount) for m, (amount, _) in held.items()]
+
+
+class BitcoinAdapter(ChainAdapter):
+    family = "bitcoin"
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        response = self._check(await self.upstream.get(f"{url}/address/{address}", timeout=10.0))
+        if response.status_code != 200:
+            return self.result(address, error=f"HTTP {response.status_code}")
+        chain_stats = response.json().get("chain_stats", {})
+        return self.result(address, chain_stats.get("funded_txo_sum", 0) - chain_stats.get("spent_txo_sum", 0))
+
+    async def probe(self, url: str):
+        response = await self.upstream.get(f"{url}/blocks/tip/height", timeout=5.0)
+        self._check(response).raise_for_status()
+
+
+class TronAdapter(ChainAdapter):
+    family = "tron"
+    supports_tokens = True
+
+    async def _fetch(self, address: str, url: str) -> dict:
+        response = self._check(await self.upstream.post(
+            f"{url}/wallet/getaccount",
+            json={"address": address, "visible": True},
+            timeout=10.0,
+        ))
+        if response.status_code != 200:
+            return self.result(address, error=f"HTTP {response.status_code}")
+        return self.result(address, response.json().get("balance", 0))
+
+    async def probe(self, url: str):
+        response = await self.upstream.post(f"{url}/wallet/getnowblock", timeout=5.0)
+        self._check(response).raise_for_status()
+
+    async def _trigger(self, owner: str, contract: str, selector: str, parameter: str = "") -> bytes:
+        async def call(url: str):
+            response = await self.upstream.post(
+                f"{url}/wallet/triggerconstantcontract",
+                json={
+                    "owner_address": owner,
+                    "contract_address": contract,
+                    "function_selector": selector,
+                    "parameter": parameter,
+                    "visible": True,
+                },
+                timeout=10.0,
+            )
+            data = self._check(response).json()
+            if not data.get("result", {}).get("result") or not data.get("constant_result"):
+                raise ValueError(f"{selector} failed on {contract}")
+            return bytes.fromhex(data["constant_result"][0])
+
+        return await self._call(call)
+
+    async def _token_balances(self, address: str, tokens: List[str]) -> List[dict]:
+        tokens = tokens or DEFAULT_TOKENS.get(self.chain, [])
+        metadata = await self.token_metadata.get_many(self.chain, tokens)
+        parameter = tron_address_param(address)
+
+        async def lookup(token: str) -> dict:
+            if token not in metadata:
+                decimals = decode_uint(await self._trigger(address, token, "decimals()"))
+                if decimals is None:
+                    raise ValueError(f"No decimals for {token}")
+                symbol = decode_string(await self._trigger(address, token, "symbol()"))
+                metadata[token] = {"decimals": decimals, "symbol": symbol}
+                await self.token_metadata.put_many(self.chain, {token: metadata[token]})
+            raw = await self._trigger(address, token, "balanceOf(address)", parameter)
+            return self.token(token, metadata[token]["symbol"], metadata[token]["decimals"], decode_uint(raw) or 0)
+
+        results = await asyncio.gather(*(lookup(t) for t in tokens), return_exceptions=True)
+        failed = [(t, r) for t, r in zip(tokens, results) if isinstance(r, Exception)]
+        for token, error in failed:
+            logger.warning(f"TRC-20 lookup failed for {token}: {error}")
+        # A reverting contract is skipped, but an upstream failure fails the whole lookup so callers
+        # keep the last good balances instead of reading the missing tokens as sold
+        upstream_errors = [e for _, e in failed if not isinstance(e, ValueError)]
+        if upstream_errors or (tokens and len(failed) == len(tokens)):
+            raise (upstream_errors or [failed[0][1]])[0]
+        return [r for r in results if not isinstance(r, Exception)]
+
+
+ADAPTER_FAMILIES: Dict[str, Type[ChainAdapter]] = {
+    cls.family: cls for cls in (EvmAdapter, XrplAdapter, SolanaAdapter, BitcoinAdapter, TronAdapter)
+}
+
+
+def chain_family(config: dict) -> Optional[str]:
+    if "type" in config:
+        return config["type"]
+    return "evm" if "chainId" in config else None
+
+
+def build_adapters(chains: Dict[str, dict], upstream, **deps) -> Dict[str, ChainAdapter]:
+    """One adapter per configured chain; chains of a family share its concurrency limit"""
+    semaphores: Dict[str, asyncio.Semaphore] = {}
+    adapters = {}
+    for chain, config in chains.items():
+        family = chain_family(config)
+        cls = ADAPTER_FAMILIES.get(family)
+        if cls is None:
+            logger.warning(f"No balance adapter for chain {chain} (type {family})")
+            continue
+        if cls.max_concurrency and family not in semaphores:
+            semaphores[family] = asyncio.Semaphore(cls.max_concurrency)
+        adapters[chain] = cls(chain, config, upstream, semaphore=semaphores.get(family), **deps)
+    return adapters
+
+
+def adapter_stats(adapters: Dict[str, ChainAdapter]) -> Dict[str, Any]:
+    families: Dict[str, Dict[str, Any]] = {}
+    for adapter in adapters.values():
+        family = families.setdefault(adapter.family, {
+            "chains": 0,
+            "supports_batching": adapter.supports_batching,
+            "supports_tokens": adapter.supports_tokens,
+            "cacheable": adapter.cacheable,
+            "max_concurrency": adapter.max_concurrency,
+        })
+        family["chains"] += 1
+    return families
@@ -0,0 +1,110 @@
+"""
+MongoDB index bootstrap and query-plan audit.
+
+`ensure_indexes` creates every index the server relies on; it is
+idempotent and runs at startup. `audit_queries` explains each query
+shape issued by server.py and reports whether it is served by an index.
+Run standalone with `python db_indexes.py [--audit]`.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# (collection, keys, options)
+REQUIRED_INDEXES = [
+    ("users", [("email", 1)], {"unique": True}),
+    ("users", [("id", 1)], {"unique": True}),
+    ("wallets", [("user_id", 1), ("id", 1)], {"unique": True}),
+    ("wallets", [("user_id", 1), ("created_at", 1), ("id", 1)], {}),
+    ("price_candles", [("coin_id", 1), ("bucket", 1)], {"unique": True}),
+    ("price_history_meta", [("coin_id", 1)], {"unique": True}),
+    ("token_metadata", [("chain", 1), ("token", 1)], {"unique": True}),
+    ("balance_snapshots", [("wallet_id", 1), ("bucket", 1)], {"unique": True}),
+    ("balance_rollups", [("wallet_id", 1), ("res", 1), ("t", 1)], {"unique": True}),
+]
+
+# Query shapes issued by server.py: (name, collection, filter, projection, sort)
+AUDITED_QUERIES = [
+    ("login / register", "users", {"email": "audit@example.com"}, None, None),
+    ("get_current_user", "users", {"id": "audit"}, {"_id": 0, "password": 0}, None),
+    ("get_wallets", "wallets", {"user_id": "audit"},
+     {"_id": 0, "id": 1, "name": 1, "addresses": 1, "created_at": 1, "is_imported": 1},
+     {"created_at": 1, "id": 1}),
+    ("wallet by id", "wallets", {"id": "audit", "user_id": "audit"}, None, None),
+    ("price history read", "price_candles", {"coin_id": "ripple", "bucket": {"$gte": 0}}, {"_id": 0}, {"bucket": 1}),
+    ("price history meta", "price_history_meta", {"coin_id": "ripple"}, {"_id": 0}, None),
+    ("token metadata", "token_metadata", {"chain": "ethereum", "token": {"$in": ["0x0"]}}, {"_id": 0, "chain": 0}, None),
+    ("portfolio history", "balance_rollups", {"wallet_id": "audit", "res": "hour", "t": {"$gte": 0, "$lte": 1}},
+     {"_id": 0, "t": 1, "symbols": 1, "balances": 1}, {"t": 1}),
+    ("snapshot resume", "balance_rollups", {"wallet_id": "audit", "res": "hour"}, {"_id": 0}, {"t": -1}),
+]
+
+
+async def ensure_indexes(db) -> List[str]:
+    created = []
+    for collection, keys, options in REQUIRED_INDEXES:
+        try:
+            created.append(await db[collection].create_index(keys, **options))
+        except Exception as e:
+            logger.error(f"Error creating index {collection}.{keys}: {e}")
+    return created
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[str]:
+    stages = [plan.get("stage")]
+    for child in [plan.get("inputStage")] + plan.get("inputStages", []):
+        if child:
+            stages.extend(_plan_stages(child))
+    return [s for s in stages if s]
+
+
+async def audit_queries(db) -> List[Dict[str, Any]]:
+    """Explain each audited query and classify it as covered, indexed or collscan"""
+    report = []
+    for name, collection, query, projection, sort in AUDITED_QUERIES:
+        command = {"find": collection, "filter": query}
+        if projection:
+            command["projection"] = projection
+        if sort:
+            command["sort"] = sort
+        try:
+            explain = await db.command("explain", command, verbosity="queryPlanner")
+        except Exception as e:
+            report.append({"query": name, "collection": collection, "status": "error", "error": str(e)})
+            continue
+
+        plan = explain["queryPlanner"]["winningPlan"]
+        stages = _plan_stages(plan.get("queryPlan", plan))  # SBE plans nest the tree
+        if "COLLSCAN" in stages:
+            status = "collscan"
+            logger.warning(f"Query '{name}' on {collection} is not index-covered (COLLSCAN)")
+        elif "FETCH" in stages:
+            status = "indexed"
+        else:
+            status = "covered"
+        report.append({"query": name, "collection": collection, "status": status, "stages": stages})
+    return report
+
+
+async def _main(audit: bool):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+    db = client[os.environ["DB_NAME"]]
+    print(f"Indexes: {await ensure_indexes(db)}")
+    if audit:
+        for row in await audit_queries(db):
+            print(f"{row['status']:>9}  {row['collection']:<20} {row['query']}  {row.get('stages', row.get('error'))}")
+    client.close()
+
+
+if __name__ == "__main__":
+    import sys
+    from pathlib import Path
+    from dotenv import load_dotenv
+
+    load_dotenv(Path(__file__).parent / ".env")
+    asyncio.run(_main("--audit" in sys.argv))
@@ -0,0 +1,48 @@
+"""
+Bounded-concurrency fan-out for per-chain upstream calls.
+
+Runs one job per key with at most `concurrency` in flight, a timeout per
+job and an overall deadline. Whatever finished by the deadline is
+returned; the rest are cancelled and reported as timed out.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+async def fan_out(
+    jobs: Dict[str, Callable[[], Awaitable[Any]]],
+    concurrency: int = 8,
+    job_timeout: float = 8.0,
+    deadline: float = 12.0,
+) -> Tuple[Dict[str, Any], List[str], Dict[str, str]]:
+    """Run jobs concurrently and return (results, timed_out, errors)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    results: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    timed_out: List[str] = []
+
+    async def run(key: str, job: Callable[[], Awaitable[Any]]):
+        async with semaphore:
+            try:
+                results[key] = await asyncio.wait_for(job(), timeout=job_timeout)
+            except asyncio.TimeoutError:
+                timed_out.append(key)
+            except Exception as e:
+                logger.error(f"Fan-out job {key} failed: {e}")
+                errors[key] = str(e)
+
+    tasks = {asyncio.create_task(run(key, job)): key for key, job in jobs.items()}
+    if not tasks:
+        return results, timed_out, errors
+
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+        timed_out.append(tasks[task])
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return results, timed_out, errors
@@ -0,0 +1,83 @@
+"""
+Password hashing off the event loop.
+
+bcrypt spends tens of milliseconds of CPU per hash/verify. Running it on
+a dedicated thread pool keeps the event loop responsive; the bcrypt
+extension releases the GIL while hashing, so throughput scales with the
+number of workers. The number of waiting jobs is bounded so a login
+storm is rejected early instead of queueing without limit.
+"""
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", os.cpu_count() or 4))
+BCRYPT_MAX_QUEUE = int(os.environ.get("BCRYPT_MAX_QUEUE", 256))
+
+
+class HasherBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    """Runs passlib hash/verify calls on a size-bounded thread pool"""
+
+    def __init__(self, context, workers: int = BCRYPT_WORKERS, max_queue: int = BCRYPT_MAX_QUEUE):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._run(self.context.verify, password, hashed)
+
+    async def _run(self, fn: Callable, *args) -> Any:
+        if self.in_flight - self.workers >= self.max_queue:
+            self.rejected += 1
+            raise HasherBusy("Password hashing queue is full")
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self.in_flight += 1
+        try:
+            result, waited, ran = await asyncio.get_running_loop().run_in_executor(self.executor, job)
+        finally:
+            self.in_flight -= 1
+
+        self.completed += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+        self.run_total += ran
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_total / self.completed * 1000, 2) if self.completed else 0,
+            "max_wait_ms": round(self.wait_max * 1000, 2),
+            "avg_run_ms": round(self.run_total / self.completed * 1000, 2) if self.completed else 0,
+        }
@@ -0,0 +1,190 @@
+"""
+Event-loop blocking detector and sampling profiler.
+
+A heartbeat coroutine stamps the time every LOOP_WATCHDOG_INTERVAL
+seconds. A watchdog thread checks the stamp; when it is older than
+LOOP_BLOCK_THRESHOLD_MS the loop is stuck in synchronous code, so the
+thread grabs the loop thread's current stack with sys._current_frames()
+and the task that was running. Each blocking episode is logged once with
+its full duration and kept in a short history.
+
+The heartbeat is also the process's one measure of scheduling delay:
+each beat reports how late it woke up to `listeners` (the Prometheus lag
+histogram), so metrics can run it without the watchdog thread.
+
+The profiler samples the loop thread's stack (or every thread's) on a
+timer thread and returns the counts in the collapsed-stack format read by
+flamegraph.pl, speedscope and similar tools. It only needs the loop's
+thread, recorded by attach() even when the heartbeat is not running.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+LOOP_BLOCK_THRESHOLD_MS = float(os.environ.get("LOOP_BLOCK_THRESHOLD_MS", 100))
+LOOP_WATCHDOG_INTERVAL = float(os.environ.get("LOOP_WATCHDOG_INTERVAL", 0.05))
+LOOP_BLOCK_HISTORY = int(os.environ.get("LOOP_BLOCK_HISTORY", 50))
+
+# Top frames of an event loop waiting for I/O; dropped from profiles unless asked for
+IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll"), ("selectors.py", "kqueue")}
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def collapse(frame) -> List[str]:
+    """Stack from the outermost frame down to `frame`"""
+    stack = []
+    while frame is not None:
+        stack.append(_frame_name(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class LoopMonitor:
+    """Watchdog thread reporting where the event loop blocks"""
+
+    def __init__(self, threshold_ms: float = LOOP_BLOCK_THRESHOLD_MS, interval: float = LOOP_WATCHDOG_INTERVAL,
+                 history: int = LOOP_BLOCK_HISTORY):
+        self.threshold = threshold_ms / 1000
+        self.interval = interval
+        self.events: deque = deque(maxlen=history)
+        self.blocks = 0
+        self.blocked_total = 0.0
+        self.current: Optional[Dict[str, Any]] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self._beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._profiling = threading.Lock()
+        # Called with the lag in seconds after every heartbeat
+        self.listeners: List[Callable[[float], None]] = []
+
+    def attach(self):
+        """Record the running loop and its thread, for the profiler"""
+        self.loop = asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+
+    def start(self, watchdog: bool = True):
+        if self._task is not None:
+            return
+        self.attach()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        if watchdog:
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - self._beat - self.interval)
+            for listener in self.listeners:
+                listener(lag)
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            now = time.monotonic()
+            # A beat is due every interval; anything beyond that is time the loop spent blocked
+            blocked = now - self._beat - self.interval
+            if blocked >= self.threshold:
+                if self.current is None:
+                    self.current = self._capture(now - blocked)
+                self.current["duration_ms"] = round(blocked * 1000, 1)
+            elif self.current is not None:
+                self._finish(self.current)
+                self.current = None
+
+    def _capture(self, started: float) -> Dict[str, Any]:
+        frame = sys._current_frames().get(self.loop_thread_id)
+        task = asyncio.current_task(self.loop)
+        return {
+            "at": time.time() - (time.monotonic() - started),
+            "duration_ms": 0.0,
+            "task": task.get_name() if task else None,
+            "coroutine": getattr(task.get_coro(), "__qualname__", None) if task else None,
+            "stack": collapse(frame) if frame is not None else [],
+        }
+
+    def _finish(self, event: Dict[str, Any]):
+        self.blocks += 1
+        self.blocked_total += event["duration_ms"] / 1000
+        self.events.append(event)
+        where = "\n  ".join(event["stack"][-12:])
+        logger.warning(f"Event loop blocked for {event['duration_ms']:.0f}ms in {event['coroutine']}:\n  {where}")
+
+    def recent(self) -> List[Dict[str, Any]]:
+        events = list(self.events)
+        if self.current is not None:
+            events.append({**self.current, "ongoing": True})
+        return events[::-1]
+
+    # ---- sampling profiler ----
+
+    @property
+    def profiling(self) -> bool:
+        return self._profiling.locked()
+
+    def profile(self, seconds: float, interval: float = 0.005, all_threads: bool = False,
+                include_idle: bool = False) -> str:
+        """Sample stacks for `seconds` and return collapsed stacks; blocks the calling thread"""
+        if self.loop_thread_id is None:
+            raise LookupError("Event loop not attached")
+        if not self._profiling.acquire(blocking=False):
+            raise RuntimeError("A profile is already running")
+        try:
+            own = threading.get_ident()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            counts: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own or (not all_threads and thread_id != self.loop_thread_id):
+                        continue
+                    if not include_idle and _is_idle(frame):
+                        continue
+                    stack = collapse(frame)
+                    if all_threads:
+                        stack.insert(0, names.get(thread_id, str(thread_id)))
+                    counts[";".join(stack)] += 1
+                time.sleep(interval)
+            return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+        finally:
+            self._profiling.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000,
+            "blocks": self.blocks,
+            "blocked_seconds": round(self.blocked_total, 3),
+            "blocked_now_ms": self.current["duration_ms"] if self.current else 0,
+            "profiling": self.profiling,
+        }
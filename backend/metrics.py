@@ -0,0 +1,276 @@
+"""
+Prometheus-style metrics.
+
+Counters, gauges and histograms live in one Registry rendered at /metrics
+in the text exposition format. Fixed label sets are bound once with
+`metric.labels(...)` and the child is kept by the caller, so the hot path
+is a plain attribute increment; per-host or per-route children cost one
+tuple-keyed dict lookup. Children are only updated
+from the event loop thread and need no locks; Mongo command events arrive
+on driver threads and are queued on a deque (atomic append) that is
+drained at scrape time.
+
+Values that other components already track (cache hit counts, pool sizes)
+are read by collectors at scrape time instead of being counted twice.
+"""
+import bisect
+import logging
+import os
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (name suffix, labels, value)
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Sample]]]]  # -> (name, type, help, samples)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.children: Dict[Tuple[str, ...], object] = {}
+
+    def labels(self, *values: str):
+        """Child for one label set; bind once and keep it"""
+        child = self.children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self.children[values] = self._child()
+        return child
+
+    def _child(self):
+        raise NotImplementedError
+
+    def samples(self) -> List[Sample]:
+        return [("", dict(zip(self.labelnames, values)), child.value) for values, child in self.children.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _child(self):
+        return _CounterChild()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _child(self):
+        return _GaugeChild()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.bounds = tuple(sorted(buckets))
+
+    def _child(self):
+        return _HistogramChild(self.bounds)
+
+    def samples(self) -> List[Sample]:
+        samples = []
+        for values, child in self.children.items():
+            labels = dict(zip(self.labelnames, values))
+            cumulative = 0
+            for bound, count in zip((*self.bounds, float("inf")), child.counts):
+                cumulative += count
+                samples.append(("_bucket", {**labels, "le": _number(bound)}, cumulative))
+            samples.append(("_sum", labels, child.sum))
+            samples.append(("_count", labels, child.count))
+        return samples
+
+
+class Registry:
+    """Metrics and scrape-time collectors rendered as Prometheus text"""
+
+    def __init__(self):
+        self.metrics: List[Metric] = []
+        self.collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def _add(self, metric: Metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        collected = []
+        for collect in self.collectors:
+            try:
+                collected.extend(collect())
+            except Exception as e:
+                logger.error(f"Error collecting metrics: {e}")
+        # Collectors run first so queued observations land in this scrape
+        families = [(m.name, m.kind, m.help, m.samples()) for m in self.metrics] + collected
+        lines = []
+        for name, kind, help, samples in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class RouteMetricsMiddleware:
+    """ASGI middleware timing each request by method, route template and status"""
+
+    def __init__(self, app, registry: Registry):
+        self.app = app
+        self.duration = registry.histogram(
+            "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+        )
+        self.in_progress = registry.gauge("http_requests_in_progress", "HTTP requests being handled").labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        self.in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_progress.dec()
+            # Route templates keep cardinality bounded; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.duration.labels(scope["method"], route, str(status)).observe(time.perf_counter() - started)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener; events are queued from driver threads and folded in at scrape"""
+
+    def __init__(self, registry: Registry, max_pending: int = 100_000):
+        self.duration = registry.histogram(
+            "mongo_command_duration_seconds", "MongoDB command latency", ("command", "outcome")
+        )
+        self.pending: deque = deque(maxlen=max_pending)
+        registry.collectors.append(self.collect)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.pending.append((event.command_name, "success", event.duration_micros))
+
+    def failed(self, event):
+        self.pending.append((event.command_name, "failure", event.duration_micros))
+
+    def collect(self):
+        while self.pending:
+            command, outcome, micros = self.pending.popleft()
+            self.duration.labels(command, outcome).observe(micros / 1e6)
+        return []
+
+
+class LoopLagMonitor:
+    """Records event loop scheduling delay; fed by the loop monitor's heartbeat"""
+
+    def __init__(self, registry: Registry):
+        self.lag = registry.histogram("event_loop_lag_seconds", "Event loop scheduling delay", buckets=LAG_BUCKETS).labels()
+        self.last = registry.gauge("event_loop_lag_last_seconds", "Most recent event loop delay").labels()
+
+    def observe(self, lag: float):
+        self.lag.observe(lag)
+        self.last.set(lag)
+
+
+def cache_collector(caches: Dict[str, Callable[[], dict]]) -> Collector:
+    """Hit/miss counters and sizes from each cache's stats()"""
+    def collect():
+        stats = {name: get() for name, get in caches.items()}
+        return [
+            ("cache_hits_total", "counter", "Cache hits", [("", {"cache": n}, s["hits"]) for n, s in stats.items()]),
+            ("cache_misses_total", "counter", "Cache misses", [("", {"cache": n}, s["misses"]) for n, s in stats.items()]),
+            ("cache_hit_ratio", "gauge", "Cache hit ratio since start", [("", {"cache": n}, s["hit_ratio"]) for n, s in stats.items()]),
+            ("cache_entries", "gauge", "Cached entries", [("", {"cache": n}, s["entries"]) for n, s in stats.items()]),
+        ]
+    return collect
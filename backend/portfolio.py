@@ -0,0 +1,141 @@
+"""
+Server-side portfolio valuation.
+
+A Portfolio holds one position per (chain, asset) and keeps per-chain,
+per-asset and grand totals. Changing one balance or one price revalues
+only the positions it touches and re-sums only the totals those
+positions belong to, so a refresh where little changed costs little.
+Totals are re-summed from the positions rather than adjusted by
+differences, so float error cannot build up and an asset whose last
+position goes away disappears instead of lingering at 1e-17.
+"""
+import math
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Priced at 1 USD without a ticker lookup
+STABLECOINS = {"usdt", "usdc", "usdc.e", "usdbc", "dai", "xdai", "busd", "tusd", "usdp", "fdusd", "pyusd"}
+
+# Wrapped and bridged symbols priced as their underlying asset
+PRICE_ALIASES = {"weth": "eth", "wbtc": "btc", "btcb": "btc", "wbnb": "bnb", "wmatic": "matic", "pol": "matic",
+                 "wavax": "avax", "wftm": "ftm", "wsol": "sol", "kaia": "klay"}
+
+Key = Tuple[str, str]
+
+
+def price_key(symbol: Optional[str]) -> str:
+    """Ticker key for an asset symbol"""
+    symbol = (symbol or "").lower()
+    return PRICE_ALIASES.get(symbol, symbol)
+
+
+def price_for(symbol: Optional[str], prices: Dict[str, float]) -> Optional[float]:
+    if not symbol:
+        return None
+    if symbol.lower() in STABLECOINS:
+        return 1.0
+    return prices.get(price_key(symbol))
+
+
+class Portfolio:
+    """Positions with incrementally maintained USD totals"""
+
+    def __init__(self):
+        self.positions: Dict[Key, dict] = {}
+        self.by_symbol: Dict[str, Set[Key]] = {}
+        self.by_chain: Dict[str, Set[Key]] = {}
+        self.prices: Dict[str, float] = {}
+        self.chain_totals: Dict[str, float] = {}
+        self.asset_totals: Dict[str, Dict[str, float]] = {}
+        self.total = 0.0
+        self.revalued = 0
+
+    def set_balance(self, chain: str, asset: str, symbol: Optional[str], balance: float):
+        key = (chain, asset)
+        position = self.positions.get(key)
+        if position is not None and position["balance"] == balance and position["symbol"] == symbol:
+            return
+        if position is not None:
+            self._remove(key)
+        self._add(key, symbol, balance)
+        self._retotal({chain}, {position["symbol"] if position else symbol, symbol})
+
+    def drop_missing(self, chain: str, assets: Set[str]):
+        """Remove positions on `chain` that are no longer held"""
+        removed = [self._remove(key) for key in list(self.by_chain.get(chain, ())) if key[1] not in assets]
+        if removed:
+            self._retotal({chain}, {position["symbol"] for position in removed})
+
+    def set_prices(self, prices: Dict[str, float]):
+        changed = {s for s, p in prices.items() if self.prices.get(s) != p}
+        changed |= self.prices.keys() - prices.keys()
+        self.prices = dict(prices)
+        if not changed:
+            return
+        chains: Set[str] = set()
+        symbols: Set[Optional[str]] = set()
+        for symbol in list(self.by_symbol):
+            if price_key(symbol) not in changed:
+                continue
+            for key in list(self.by_symbol.get(symbol, ())):
+                position = self._remove(key)
+                self._add(key, position["symbol"], position["balance"])
+                chains.add(key[0])
+                symbols.add(position["symbol"])
+        self._retotal(chains, symbols)
+
+    def _add(self, key: Key, symbol: Optional[str], balance: float):
+        price = price_for(symbol, self.prices)
+        usd = balance * price if price is not None else None
+        self.positions[key] = {"symbol": symbol, "balance": balance, "price": price, "usd": usd}
+        self.by_symbol.setdefault((symbol or "").lower(), set()).add(key)
+        self.by_chain.setdefault(key[0], set()).add(key)
+        self.revalued += 1
+
+    def _remove(self, key: Key) -> dict:
+        position = self.positions.pop(key)
+        self.by_symbol[(position["symbol"] or "").lower()].discard(key)
+        self.by_chain[key[0]].discard(key)
+        return position
+
+    def _retotal(self, chains: Set[str], symbols: Set[Optional[str]]):
+        """Re-sum the totals of the given chains and asset symbols from their positions"""
+        for chain in chains:
+            keys = self.by_chain.get(chain)
+            if keys:
+                self.chain_totals[chain] = math.fsum(self.positions[k]["usd"] or 0.0 for k in keys)
+            else:
+                self.by_chain.pop(chain, None)
+                self.chain_totals.pop(chain, None)
+        for symbol in symbols:
+            keys = self.by_symbol.get((symbol or "").lower())
+            name = (symbol or "?").upper()
+            if keys:
+                held = [self.positions[k] for k in keys]
+                self.asset_totals[name] = {
+                    "balance": math.fsum(p["balance"] for p in held),
+                    "usd": math.fsum(p["usd"] or 0.0 for p in held),
+                }
+            else:
+                self.by_symbol.pop((symbol or "").lower(), None)
+                self.asset_totals.pop(name, None)
+        self.total = math.fsum(self.chain_totals.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        chains: Dict[str, Dict[str, Any]] = {}
+        unpriced = []
+        for (chain, asset), position in self.positions.items():
+            entry = chains.setdefault(chain, {"usd": round(self.chain_totals.get(chain, 0.0), 2), "assets": []})
+            entry["assets"].append({
+                "asset": asset,
+                "symbol": position["symbol"],
+                "balance": position["balance"],
+                "price": position["price"],
+                "usd": round(position["usd"], 2) if position["usd"] is not None else None,
+            })
+            if position["price"] is None and position["balance"]:
+                unpriced.append(f"{chain}:{position['symbol'] or asset}")
+        assets = {
+            symbol: {"balance": totals["balance"], "usd": round(totals["usd"], 2)}
+            for symbol, totals in self.asset_totals.items() if totals["balance"]
+        }
+        return {"total_usd": round(self.total, 2), "chains": chains, "assets": assets, "unpriced": unpriced}
@@ -0,0 +1,180 @@
+"""
+Persistent price history.
+
+Hourly OHLC candles are stored per coin in MongoDB as one document per
+UTC day (`price_candles`), with the fetched coverage tracked in
+`price_history_meta`. Requests backfill only the ranges that are missing
+from storage and are answered from MongoDB, optionally downsampled.
+"""
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Dict, List, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3_600_000
+DAY_MS = 86_400_000
+
+# How far behind "now" stored history may lag before the tail is refetched
+PRICE_HISTORY_REFRESH = float(os.environ.get("PRICE_HISTORY_REFRESH", 300))
+# CoinGecko's market_chart/range answers with daily points past 90 days, so longer ranges are fetched in chunks
+PRICE_HISTORY_CHUNK_DAYS = int(os.environ.get("PRICE_HISTORY_CHUNK_DAYS", 90))
+
+Candle = Tuple[int, float, float, float, float]  # (hour_ms, open, high, low, close)
+
+
+def to_candles(points: List[List[float]]) -> List[Candle]:
+    """Aggregate [timestamp_ms, price] points into hourly candles"""
+    candles: Dict[int, List[float]] = {}
+    for ts, price in sorted(points):
+        hour = int(ts) // HOUR_MS * HOUR_MS
+        candle = candles.get(hour)
+        if candle is None:
+            candles[hour] = [price, price, price, price]
+        else:
+            candle[1] = max(candle[1], price)
+            candle[2] = min(candle[2], price)
+            candle[3] = price
+    return [(hour, *ohlc) for hour, ohlc in sorted(candles.items())]
+
+
+def chunks(start: int, end: int, size: int, newest_first: bool = False) -> List[Tuple[int, int]]:
+    """Split [start, end] into consecutive ranges no longer than size"""
+    if newest_first:
+        return [(max(t - size, start), t) for t in range(end, start, -size)]
+    return [(t, min(t + size, end)) for t in range(start, end, size)]
+
+
+def downsample(candles: List[Candle], max_points: int) -> List[Candle]:
+    """Merge consecutive candles so at most max_points remain"""
+    if max_points <= 0 or len(candles) <= max_points:
+        return candles
+    step = math.ceil(len(candles) / max_points)
+    merged = []
+    for i in range(0, len(candles), step):
+        group = candles[i:i + step]
+        merged.append((
+            group[0][0],
+            group[0][1],
+            max(c[2] for c in group),
+            min(c[3] for c in group),
+            group[-1][4],
+        ))
+    return merged
+
+
+class PriceHistoryStore:
+    """MongoDB-backed candle store with incremental CoinGecko backfill"""
+
+    def __init__(self, db, upstream, api_base: str):
+        self.db = db
+        self.upstream = upstream
+        self.api_base = api_base
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get_candles(self, coin_id: str, days: int, max_points: int = 0) -> List[Candle]:
+        now = int(time.time() * 1000)
+        start = now - days * DAY_MS
+
+        lock = self._locks.setdefault(coin_id, asyncio.Lock())
+        async with lock:
+            await self._backfill(coin_id, start, now)
+
+        candles = await self._read(coin_id, start, now)
+        return downsample(candles, max_points)
+
+    async def _backfill(self, coin_id: str, start: int, now: int):
+        # Coverage written before chunked fetching may hold daily points; "hourly" marks trustworthy coverage
+        meta = await self.db.price_history_meta.find_one({"coin_id": coin_id, "hourly": True}, {"_id": 0})
+        size = PRICE_HISTORY_CHUNK_DAYS * DAY_MS
+        # Each run extends coverage outwards from what is stored, so a failed chunk ends its run without a gap
+        if meta is None:
+            runs = [chunks(start, now, size, newest_first=True)]
+        else:
+            runs = []
+            if start < meta["from"] - HOUR_MS:
+                runs.append(chunks(start, meta["from"], size, newest_first=True))
+            if now - meta["to"] > PRICE_HISTORY_REFRESH * 1000:
+                runs.append(chunks(meta["to"], now, size))
+
+        for run in runs:
+            for range_start, range_end in run:
+                try:
+                    points = await self._fetch_range(coin_id, range_start, range_end)
+                except Exception as e:
+                    logger.error(f"Error backfilling {coin_id} price history: {e}")
+                    break
+                await self._store(coin_id, to_candles(points))
+                if meta is None:
+                    meta = {"from": range_start, "to": range_end, "hourly": True}
+                    update = {"$set": meta}
+                else:
+                    update = {"$min": {"from": range_start}, "$max": {"to": range_end}}
+                await self.db.price_history_meta.update_one({"coin_id": coin_id}, update, upsert=True)
+
+    async def _fetch_range(self, coin_id: str, start: int, end: int) -> List[List[float]]:
+        response = await self.upstream.get(
+            f"{self.api_base}/coins/{coin_id}/market_chart/range",
+            params={"vs_currency": "usd", "from": start // 1000, "to": end // 1000},
+            timeout=10.0,
+        )
+        if response.status_code != 200:
+            raise ValueError(f"CoinGecko returned HTTP {response.status_code}")
+        data = response.json()
+        if "prices" not in data:
+            raise ValueError(f"CoinGecko error: {data.get('status')}")
+        return data["prices"]
+
+    async def _store(self, coin_id: str, candles: List[Candle]):
+        if not candles:
+            return
+
+        by_bucket: Dict[int, Dict[int, Candle]] = {}
+        for candle in candles:
+            by_bucket.setdefault(candle[0] // DAY_MS * DAY_MS, {})[candle[0]] = candle
+
+        existing = self.db.price_candles.find(
+            {"coin_id": coin_id, "bucket": {"$in": list(by_bucket)}}, {"_id": 0}
+        )
+        async for doc in existing:
+            merged = by_bucket[doc["bucket"]]
+            for stored in zip(doc["t"], doc["o"], doc["h"], doc["l"], doc["c"]):
+                new = merged.get(stored[0])
+                if new is None:
+                    merged[stored[0]] = stored
+                else:
+                    # Keep the earliest open, widen the range, take the newest close
+                    merged[stored[0]] = (stored[0], stored[1], max(stored[2], new[2]), min(stored[3], new[3]), new[4])
+
+        ops = []
+        for bucket, merged in by_bucket.items():
+            rows = [merged[t] for t in sorted(merged)]
+            ops.append(UpdateOne(
+                {"coin_id": coin_id, "bucket": bucket},
+                {"$set": {
+                    "t": [r[0] for r in rows],
+                    "o": [r[1] for r in rows],
+                    "h": [r[2] for r in rows],
+                    "l": [r[3] for r in rows],
+                    "c": [r[4] for r in rows],
+                }},
+                upsert=True,
+            ))
+        await self.db.price_candles.bulk_write(ops, ordered=False)
+
+    async def _read(self, coin_id: str, start: int, end: int) -> List[Candle]:
+        cursor = self.db.price_candles.find(
+            {"coin_id": coin_id, "bucket": {"$gte": start // DAY_MS * DAY_MS, "$lte": end}},
+            {"_id": 0},
+        ).sort("bucket", 1)
+        candles = []
+        async for doc in cursor:
+            for row in zip(doc["t"], doc["o"], doc["h"], doc["l"], doc["c"]):
+                if start <= row[0] <= end:
+                    candles.append(row)
+        return candles
@@ -0,0 +1,84 @@
+"""
+Array-based price series helpers for /api/prices/history.
+
+Series are held as parallel NumPy arrays (int64 millisecond timestamps,
+float64 prices) and rendered as row objects, parallel JSON arrays or a
+raw little-endian Float64 frame.
+"""
+import json
+from datetime import datetime, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+BINARY_LAYOUT = "float64le;timestamps[n];prices[n]"
+
+
+def from_candles(candles: List[tuple]) -> Series:
+    """Close-price series from (hour_ms, open, high, low, close) candles"""
+    if not candles:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+    data = np.asarray(candles, dtype=np.float64)
+    return data[:, 0].astype(np.int64), data[:, 4]
+
+
+def mock_series(base_price: float, days: int, rng: np.random.Generator = None) -> Series:
+    """Random walk of hourly prices within +/-20% of base_price"""
+    rng = rng or np.random.default_rng()
+    n = days * 24
+    now = datetime.now(timezone.utc).timestamp() * 1000
+    timestamps = (now - (n - np.arange(n)) * 3_600_000).astype(np.int64)
+    walk = base_price * rng.uniform(0.9, 0.95) * np.cumprod(1 + rng.uniform(-0.02, 0.02, n))
+    prices = np.round(np.clip(walk, base_price * 0.8, base_price * 1.2), 4)
+    return timestamps, prices
+
+
+def thin(series: Series, max_points: int) -> Series:
+    """Keep every k-th point so at most max_points remain"""
+    timestamps, prices = series
+    if max_points <= 0 or timestamps.size <= max_points:
+        return series
+    step = -(-timestamps.size // max_points)
+    return timestamps[::step], prices[::step]
+
+
+def series_stats(prices: np.ndarray) -> Dict[str, float]:
+    """Min/max/mean and return aggregates over a price array"""
+    if prices.size == 0:
+        return {}
+    returns = np.diff(prices) / prices[:-1] if prices.size > 1 else np.empty(0)
+    return {
+        "min": float(prices.min()),
+        "max": float(prices.max()),
+        "mean": float(prices.mean()),
+        "first": float(prices[0]),
+        "last": float(prices[-1]),
+        "change_pct": float((prices[-1] / prices[0] - 1) * 100) if prices[0] else 0.0,
+        "mean_return": float(returns.mean()) if returns.size else 0.0,
+        "volatility": float(returns.std()) if returns.size else 0.0,
+    }
+
+
+def to_rows(series: Series) -> List[dict]:
+    timestamps, prices = series
+    return [{"timestamp": t, "price": p} for t, p in zip(timestamps.tolist(), prices.tolist())]
+
+
+def to_columns(series: Series) -> Dict[str, list]:
+    timestamps, prices = series
+    return {"timestamps": timestamps.tolist(), "prices": prices.tolist()}
+
+
+def to_binary(series: Series) -> bytes:
+    timestamps, prices = series
+    return np.concatenate([timestamps.astype("<f8"), prices.astype("<f8")]).tobytes()
+
+
+def binary_headers(series: Series, source: str, stats: bool = False) -> Dict[str, str]:
+    """X-Series-* headers describing a to_binary() frame"""
+    headers = {"X-Series-Length": str(series[0].size), "X-Series-Layout": BINARY_LAYOUT, "X-Series-Source": source}
+    if stats:
+        headers["X-Series-Stats"] = json.dumps(series_stats(series[1]))
+    return headers
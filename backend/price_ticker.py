@@ -0,0 +1,123 @@
+"""
+Background price refresher.
+
+Polls the price source on a fixed interval and keeps the latest snapshot
+in memory so /api/prices and swap quotes never wait on CoinGecko. Rate
+limit responses back off exponentially with jitter.
+"""
+import asyncio
+import logging
+import math
+import os
+import random
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRICE_REFRESH_INTERVAL = float(os.environ.get("PRICE_REFRESH_INTERVAL", 60))
+PRICE_MAX_BACKOFF = float(os.environ.get("PRICE_MAX_BACKOFF", 600))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delay-seconds or HTTP-date), None if absent or unusable"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)
+        seconds = when.timestamp() - time.time()
+    return seconds if math.isfinite(seconds) and seconds > 0 else None
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: Optional[float] = None):
+        super().__init__(f"Rate limited (retry after {retry_after}s)")
+        self.retry_after = retry_after
+
+
+class PriceTicker:
+    """Keeps an in-memory price snapshot fresh from a background task"""
+
+    def __init__(self, fetch: Callable[[], Awaitable[Tuple[Dict[str, float], Dict[str, float]]]],
+                 fallback: Dict[str, float], interval: float = PRICE_REFRESH_INTERVAL,
+                 max_backoff: float = PRICE_MAX_BACKOFF):
+        self.fetch = fetch
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self.prices = dict(fallback)
+        self.changes: Dict[str, float] = {}
+        self.source = "fallback"
+        self.updated_at: Optional[float] = None
+        self.rate_limited = 0
+        self.failures = 0
+        self.listeners: List[Callable[[Dict[str, float], Dict[str, float]], None]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def refresh(self):
+        prices, changes = await self.fetch()
+        self.prices = {**self.prices, **prices}
+        self.changes = changes
+        self.source = "coingecko"
+        self.updated_at = time.time()
+        for listener in self.listeners:
+            listener(self.prices, self.changes)
+
+    async def _run(self):
+        backoff_attempt = 0
+        while True:
+            delay = self.interval
+            try:
+                await self.refresh()
+                backoff_attempt = 0
+            except RateLimited as e:
+                self.rate_limited += 1
+                backoff_attempt += 1
+                backoff = min(self.max_backoff, self.interval * 2 ** backoff_attempt)
+                delay = max(backoff * random.uniform(0.5, 1.0), e.retry_after or 0)
+                logger.warning(f"Price source rate limited, retrying in {delay:.0f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Error refreshing prices: {e}")
+            await asyncio.sleep(delay)
+
+    def snapshot(self) -> dict:
+        age = round(time.time() - self.updated_at, 1) if self.updated_at else None
+        return {
+            "prices": self.prices,
+            "changes": self.changes,
+            "source": self.source,
+            "updated_at": datetime.fromtimestamp(self.updated_at, timezone.utc).isoformat() if self.updated_at else None,
+            "age": age,
+            "stale": age is None or age > self.interval * 3,
+        }
+
+    def stats(self) -> dict:
+        snapshot = self.snapshot()
+        return {
+            "source": snapshot["source"],
+            "age": snapshot["age"],
+            "interval": self.interval,
+            "rate_limited": self.rate_limited,
+            "failures": self.failures,
+        }
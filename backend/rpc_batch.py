@@ -0,0 +1,153 @@
+"""
+JSON-RPC request batching.
+
+Calls to the same RPC endpoint that arrive within a short coalescing
+window are sent as a single JSON-RPC batch array, and the responses are
+routed back to their callers by `id`.
+
+A single error object in reply to a batch is a node-side failure (rate
+limit, overload) when its code is in the server-error range and is handed
+to every queued caller. Any other non-array reply means the endpoint does
+not take batches; its calls are sent one by one for RPC_UNBATCHED_TTL
+seconds before batching is tried again.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+RPC_BATCH_WINDOW = float(os.environ.get("RPC_BATCH_WINDOW_MS", 5)) / 1000
+RPC_BATCH_MAX_SIZE = int(os.environ.get("RPC_BATCH_MAX_SIZE", 50))
+RPC_UNBATCHED_TTL = float(os.environ.get("RPC_UNBATCHED_TTL", 600))
+
+
+class RpcBatcher:
+    """Coalesces JSON-RPC calls per endpoint into batch requests"""
+
+    def __init__(self, upstream, window: float = RPC_BATCH_WINDOW,
+                 max_size: int = RPC_BATCH_MAX_SIZE, timeout: float = 10.0, unbatched_ttl: float = RPC_UNBATCHED_TTL):
+        self.upstream = upstream
+        self.window = window
+        self.max_size = max_size
+        self.timeout = timeout
+        self.unbatched_ttl = unbatched_ttl
+        self._ids = itertools.count(1)
+        self._pending: Dict[str, List[Tuple[dict, asyncio.Future]]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._unbatched: Dict[str, float] = {}  # endpoint that rejected batch arrays -> when to retry batching
+        self._tasks: set = set()
+        self._stats = {"calls": 0, "batches": 0, "batched_calls": 0, "fallbacks": 0}
+
+    async def call(self, url: str, method: str, params: list) -> dict:
+        """Queue a call and return its raw JSON-RPC response object"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+        self._stats["calls"] += 1
+
+        queue = self._pending.setdefault(url, [])
+        queue.append((payload, future))
+        if len(queue) >= self.max_size:
+            self._flush_now(url)
+        elif url not in self._timers:
+            self._timers[url] = loop.call_later(self.window, self._flush_now, url)
+
+        return await future
+
+    def _flush_now(self, url: str):
+        timer = self._timers.pop(url, None)
+        if timer is not None:
+            timer.cancel()
+        queue = self._pending.pop(url, [])
+        if queue:
+            task = asyncio.create_task(self._send(url, queue))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, url: str, queue: List[Tuple[dict, asyncio.Future]]):
+        try:
+            if len(queue) == 1 or self._is_unbatched(url):
+                await asyncio.gather(*(self._send_single(url, payload, future) for payload, future in queue))
+                return
+
+            self._stats["batches"] += 1
+            self._stats["batched_calls"] += len(queue)
+            response = await self.upstream.post(url, json=[payload for payload, _ in queue], timeout=self.timeout)
+            self._check(response)
+            data = response.json()
+
+            if isinstance(data, dict) and self._node_error(data.get("error")):
+                # Rate limited or overloaded: every queued call gets the error, batching stays on
+                for payload, future in queue:
+                    if not future.done():
+                        future.set_result({"jsonrpc": "2.0", "id": payload["id"], "error": data["error"]})
+                return
+
+            if not isinstance(data, list):
+                # Endpoint does not accept batches; remember for a while and resend one by one
+                logger.warning(f"RPC endpoint rejected batch request, falling back: {url}")
+                self._unbatched[url] = time.monotonic() + self.unbatched_ttl
+                self._stats["fallbacks"] += 1
+                await asyncio.gather(*(self._send_single(url, payload, future) for payload, future in queue))
+                return
+
+            by_id = {item.get("id"): item for item in data if isinstance(item, dict)}
+            for payload, future in queue:
+                if future.done():
+                    continue
+                item = by_id.get(payload["id"])
+                if item is None:
+                    future.set_exception(RpcBatchError(f"No response for id {payload['id']}"))
+                else:
+                    future.set_result(item)
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+
+    async def _send_single(self, url: str, payload: dict, future: asyncio.Future):
+        try:
+            response = await self.upstream.post(url, json=payload, timeout=self.timeout)
+            self._check(response)
+            if not future.done():
+                future.set_result(response.json())
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+
+    def _is_unbatched(self, url: str) -> bool:
+        until = self._unbatched.get(url)
+        if until is None:
+            return False
+        if time.monotonic() >= until:
+            del self._unbatched[url]
+            return False
+        return True
+
+    @staticmethod
+    def _node_error(error) -> bool:
+        # JSON-RPC -32000..-32099 are server-side failures, not a refusal to batch
+        return isinstance(error, dict) and -32099 <= error.get("code", 0) <= -32000
+
+    @staticmethod
+    def _check(response):
+        # Overloaded or failing nodes are errors, not JSON-RPC replies (or batch rejections)
+        if response.status_code >= 500 or response.status_code == 429:
+            raise RpcBatchError(f"HTTP {response.status_code}")
+
+    def stats(self) -> Dict[str, Any]:
+        batched, batches = self._stats["batched_calls"], self._stats["batches"]
+        return {
+            **self._stats,
+            "unbatched_endpoints": len(self._unbatched),
+            "pending": sum(len(q) for q in self._pending.values()),
+            "calls_per_batch": round(batched / batches, 2) if batches else None,
+        }
+
+
+class RpcBatchError(Exception):
+    pass
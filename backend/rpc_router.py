@@ -0,0 +1,230 @@
+"""
+Latency-aware routing across a chain's RPC endpoints.
+
+Each chain's endpoints are its `rpc` (or `httpRpc`) URL plus any
+`rpcFallbacks`. Every endpoint keeps an EWMA of its response time and a
+window of recent latencies. A call goes to the fastest healthy endpoint.
+If it has not answered by that endpoint's latency percentile, the call
+is hedged to the next endpoint, and if it fails it moves on to the next
+one. Only endpoint faults (UpstreamError, timeouts, transport errors)
+fail over; any other exception is the request's fault and is raised at
+once without touching endpoint health. After RPC_BREAKER_THRESHOLD consecutive failures the endpoint's
+circuit opens for RPC_BREAKER_COOLDOWN seconds; a background probe
+closes it again once the endpoint answers.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
+
+import httpx
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+RPC_EWMA_ALPHA = float(os.environ.get("RPC_EWMA_ALPHA", 0.2))
+# Below the server's per-chain timeout, so a hung endpoint times out and counts towards its circuit
+# before the whole lookup is cancelled
+RPC_ATTEMPT_TIMEOUT = float(os.environ.get("RPC_ATTEMPT_TIMEOUT", 5))
+RPC_MAX_ATTEMPTS = int(os.environ.get("RPC_MAX_ATTEMPTS", 3))
+RPC_HEDGE_PERCENTILE = float(os.environ.get("RPC_HEDGE_PERCENTILE", 95))
+RPC_HEDGE_MIN_DELAY = float(os.environ.get("RPC_HEDGE_MIN_DELAY", 0.05))
+RPC_HEDGE_DEFAULT_DELAY = float(os.environ.get("RPC_HEDGE_DEFAULT_DELAY", 1.0))
+RPC_BREAKER_THRESHOLD = int(os.environ.get("RPC_BREAKER_THRESHOLD", 5))
+RPC_BREAKER_COOLDOWN = float(os.environ.get("RPC_BREAKER_COOLDOWN", 30))
+RPC_HEALTH_INTERVAL = float(os.environ.get("RPC_HEALTH_INTERVAL", 30))
+
+T = TypeVar("T")
+
+
+class UpstreamError(Exception):
+    """The endpoint, not the request, is at fault (5xx, rate limit, server-side RPC error)"""
+
+
+ENDPOINT_FAULTS = (UpstreamError, asyncio.TimeoutError, httpx.TransportError)
+
+
+class Endpoint:
+    """Latency and failure bookkeeping for one RPC URL"""
+
+    def __init__(self, url: str, alpha: float = RPC_EWMA_ALPHA, window: int = 100):
+        self.url = url
+        self.alpha = alpha
+        self.ewma: Optional[float] = None
+        self.latencies: deque = deque(maxlen=window)
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < RPC_BREAKER_COOLDOWN else "half_open"
+
+    def score(self) -> float:
+        """Expected latency in seconds; unmeasured endpoints get the default hedge delay"""
+        latency = RPC_HEDGE_DEFAULT_DELAY if self.ewma is None else self.ewma
+        return latency * (1 + self.failures)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.latencies) < 10:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def record_success(self, latency: float):
+        self.requests += 1
+        self.latencies.append(latency)
+        self.ewma = latency if self.ewma is None else self.alpha * latency + (1 - self.alpha) * self.ewma
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, threshold: int = RPC_BREAKER_THRESHOLD):
+        self.requests += 1
+        self.errors += 1
+        self.failures += 1
+        if self.failures >= threshold or self.state == "half_open":
+            if self.opened_at is None:
+                logger.warning(f"Circuit opened for RPC endpoint {self.url}")
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.percentile(95)
+        return {
+            "url": self.url,
+            "state": self.state,
+            "ewma_ms": round(self.ewma * 1000, 1) if self.ewma is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "score_ms": round(self.score() * 1000, 1),
+            "consecutive_failures": self.failures,
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+class RpcRouter:
+    """Routes calls to the best endpoint of a chain with hedging and failover"""
+
+    def __init__(self, chains: Dict[str, dict], attempt_timeout: float = RPC_ATTEMPT_TIMEOUT,
+                 max_attempts: int = RPC_MAX_ATTEMPTS):
+        self.attempt_timeout = attempt_timeout
+        self.max_attempts = max_attempts
+        self.endpoints: Dict[str, List[Endpoint]] = {}
+        for chain, config in chains.items():
+            urls = [config.get("httpRpc", config["rpc"]), *config.get("rpcFallbacks", [])]
+            self.endpoints[chain] = [Endpoint(url) for url in urls if url.startswith("http")]
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"calls": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+        # Called with (chain, "success" or "failure", seconds) after every routed call
+        self.listeners: List[Callable[[str, str, float], None]] = []
+
+    def ranked(self, chain: str) -> List[Endpoint]:
+        """Closed circuits by score, then half-open, then open as a last resort"""
+        order = {"closed": 0, "half_open": 1, "open": 2}
+        return sorted(self.endpoints.get(chain, []), key=lambda e: (order[e.state], e.score()))
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        delay = endpoint.percentile(RPC_HEDGE_PERCENTILE)
+        return RPC_HEDGE_DEFAULT_DELAY if delay is None else max(delay, RPC_HEDGE_MIN_DELAY)
+
+    async def call(self, chain: str, fn: Callable[[str], Awaitable[T]]) -> T:
+        """Run fn(url) against the chain's endpoints until one succeeds"""
+        with span(f"rpc {chain}", chain=chain):
+            return await self._call(chain, fn)
+
+    async def _call(self, chain: str, fn: Callable[[str], Awaitable[T]]) -> T:
+        candidates = self.ranked(chain)[:self.max_attempts]
+        if not candidates:
+            raise UpstreamError(f"No RPC endpoints for {chain}")
+        self._stats["calls"] += 1
+        started = time.monotonic()
+        outcome = "failure"
+
+        primary = candidates.pop(0)
+        pending: Dict[asyncio.Task, Endpoint] = {}
+        pending[asyncio.create_task(self._attempt(primary, fn))] = primary
+        hedged = False
+        last_error: Optional[BaseException] = None
+        try:
+            while pending:
+                timeout = self.hedge_delay(primary) if candidates and not hedged else None
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is slower than it usually is; race the next endpoint
+                    hedged = True
+                    self._stats["hedges"] += 1
+                    endpoint = candidates.pop(0)
+                    pending[asyncio.create_task(self._attempt(endpoint, fn))] = endpoint
+                    continue
+                for task in done:
+                    endpoint = pending.pop(task)
+                    if task.exception() is None:
+                        if endpoint is not primary:
+                            self._stats["hedge_wins" if hedged else "failovers"] += 1
+                        outcome = "success"
+                        return task.result()
+                    last_error = task.exception()
+                    if not isinstance(last_error, ENDPOINT_FAULTS):
+                        # The request itself is bad; another endpoint would reject it too
+                        raise last_error
+                if not pending and candidates:
+                    endpoint = candidates.pop(0)
+                    pending[asyncio.create_task(self._attempt(endpoint, fn))] = endpoint
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+            for listener in self.listeners:
+                listener(chain, outcome, time.monotonic() - started)
+
+    async def _attempt(self, endpoint: Endpoint, fn: Callable[[str], Awaitable[T]]) -> T:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(fn(endpoint.url), timeout=self.attempt_timeout)
+        except ENDPOINT_FAULTS:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(time.monotonic() - started)
+        return result
+
+    # ---- health probes ----
+
+    def start(self, probe: Callable[[str, str], Awaitable[Any]], interval: float = RPC_HEALTH_INTERVAL,
+              delay: float = 0.0):
+        if self._task is None:
+            self._task = asyncio.create_task(self._probe_loop(probe, interval, delay))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def probe_all(self, probe: Callable[[str, str], Awaitable[Any]]):
+        """Probe each endpoint whose circuit is not open once"""
+        # Single-endpoint chains are probed too, so their circuits close again without waiting for traffic
+        checks = [
+            self._attempt(endpoint, lambda url, chain=chain: probe(chain, url))
+            for chain, endpoints in self.endpoints.items()
+            for endpoint in endpoints if endpoint.state != "open"
+        ]
+        await asyncio.gather(*checks, return_exceptions=True)
+
+    async def _probe_loop(self, probe: Callable[[str, str], Awaitable[Any]], interval: float, delay: float):
+        await asyncio.sleep(delay)
+        while True:
+            await self.probe_all(probe)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        states = [e.state for endpoints in self.endpoints.values() for e in endpoints]
+        return {**self._stats, "endpoints": len(states), "open_circuits": states.count("open")}
+
+    def endpoint_stats(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Per-endpoint scores, best first"""
+        return {chain: [e.stats() for e in self.ranked(chain)] for chain in self.endpoints}
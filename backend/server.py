@@ -1,42 +1,97 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from startup import StartupReport
+# Created before the heavy imports so the startup report covers them
+startup_report = StartupReport()
+
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 import os
+import json
+import asyncio
+import base64
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, EmailStr, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timezone, timedelta
-import httpx
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 import secrets
+from upstream import UpstreamClient
+from fanout import fan_out
+from rpc_batch import RpcBatcher
+from cache import BalanceCache, TTLCache
+from price_ticker import PriceTicker, RateLimited, parse_retry_after
+from price_history import PriceHistoryStore
+from hashing import PasswordHasher, HasherBusy
+from db_indexes import ensure_indexes, audit_queries
+from xrpl_ws import XRPLWebSocketPool
+from chain_adapters import build_adapters, adapter_stats
+from rpc_router import RPC_ATTEMPT_TIMEOUT, RPC_HEALTH_INTERVAL, RpcRouter
+from tokens import TokenMetadataStore
+from portfolio import Portfolio, price_key
+from snapshots import SnapshotScheduler, read_rollups, value_series
+from swap_quotes import SWAP_DEFAULT_SLIPPAGE_BPS, QuoteError, SwapQuoter
+from loop_monitor import LoopMonitor
+from tracing import TracingMiddleware, span, trace_database, tracer
+from metrics import METRICS_ENABLED, LoopLagMonitor, MongoCommandMetrics, Registry, RouteMetricsMiddleware, cache_collector
+from stream_hub import StreamHub, STREAM_MAX_ADDRESSES
+from contextlib import asynccontextmanager
+
+startup_report.mark("imports")
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+metrics_registry = Registry()
+mongo_metrics = MongoCommandMetrics(metrics_registry)
+# Connections open during the warm-up, not at import; the warm-up fills the pool up to MONGO_MIN_POOL_SIZE
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 4))
+client = AsyncIOMotorClient(
+    mongo_url,
+    connect=False,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    event_listeners=[mongo_metrics] if METRICS_ENABLED else [],
+)
+db = trace_database(client[os.environ['DB_NAME']])
+# Explain every known query shape at startup and warn about collection scans
+MONGO_INDEX_AUDIT = os.environ.get('MONGO_INDEX_AUDIT', 'false').lower() == 'true'
 
 # JWT Configuration
 SECRET_KEY = os.environ.get('JWT_SECRET', secrets.token_urlsafe(32))
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+# Embed the user's profile claims in the token so auth can skip Mongo entirely
+JWT_EMBED_USER_CLAIMS = os.environ.get('JWT_EMBED_USER_CLAIMS', 'false').lower() == 'true'
+
+# Shared secret for /api/admin routes (sent as X-Admin-Token); admin routes are disabled when unset
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Authenticated-user cache, keyed by user id
+user_cache = TTLCache(
+    int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000)),
+    float(os.environ.get('USER_CACHE_TTL', 30)),
+)
+USER_CLAIM_FIELDS = ("id", "email", "name", "created_at")
 
-# Password hashing
+# Shared upstream HTTP pools (RPC nodes, price APIs)
+upstream = UpstreamClient()
+rpc_batcher = RpcBatcher(upstream)
+
+# Password hashing (bcrypt runs on a worker pool, off the event loop)
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(pwd_context)
 
 # Security
 security = HTTPBearer()
 
-# Create the main app
-app = FastAPI(title="XRP Nexus Terminal API")
-
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
@@ -44,41 +99,52 @@ api_router = APIRouter(prefix="/api")
 ANKR_RPC = "https://rpc.ankr.com/multichain/0cfff9adf111f64126dd12eb6139946c3b67d7d06e30c8d65ff0e08fa5200997"
 COINGECKO_API = "https://api.coingecko.com/api/v3"
 
+# Multi-chain balance fan-out limits (seconds)
+BALANCE_FANOUT_CONCURRENCY = int(os.environ.get('BALANCE_FANOUT_CONCURRENCY', 8))
+BALANCE_CHAIN_TIMEOUT = float(os.environ.get('BALANCE_CHAIN_TIMEOUT', 8.0))
+BALANCE_REQUEST_DEADLINE = float(os.environ.get('BALANCE_REQUEST_DEADLINE', 12.0))
+
 # Supported chains configuration
 SUPPORTED_CHAINS = {
     # EVM Chains
-    "ethereum": {"chainId": 1, "name": "Ethereum", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/eth", "explorer": "https://etherscan.io"},
-    "bsc": {"chainId": 56, "name": "BNB Chain", "symbol": "BNB", "decimals": 18, "rpc": f"{ANKR_RPC}/bsc", "explorer": "https://bscscan.com"},
-    "polygon": {"chainId": 137, "name": "Polygon", "symbol": "MATIC", "decimals": 18, "rpc": f"{ANKR_RPC}/polygon", "explorer": "https://polygonscan.com"},
-    "avalanche": {"chainId": 43114, "name": "Avalanche", "symbol": "AVAX", "decimals": 18, "rpc": f"{ANKR_RPC}/avalanche", "explorer": "https://snowtrace.io"},
-    "arbitrum": {"chainId": 42161, "name": "Arbitrum", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/arbitrum", "explorer": "https://arbiscan.io"},
-    "optimism": {"chainId": 10, "name": "Optimism", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/optimism", "explorer": "https://optimistic.etherscan.io"},
-    "fantom": {"chainId": 250, "name": "Fantom", "symbol": "FTM", "decimals": 18, "rpc": f"{ANKR_RPC}/fantom", "explorer": "https://ftmscan.com"},
-    "cronos": {"chainId": 25, "name": "Cronos", "symbol": "CRO", "decimals": 18, "rpc": "https://evm.cronos.org", "explorer": "https://cronoscan.com"},
-    "gnosis": {"chainId": 100, "name": "Gnosis", "symbol": "xDAI", "decimals": 18, "rpc": f"{ANKR_RPC}/gnosis", "explorer": "https://gnosisscan.io"},
-    "celo": {"chainId": 42220, "name": "Celo", "symbol": "CELO", "decimals": 18, "rpc": f"{ANKR_RPC}/celo", "explorer": "https://celoscan.io"},
-    "moonbeam": {"chainId": 1284, "name": "Moonbeam", "symbol": "GLMR", "decimals": 18, "rpc": f"{ANKR_RPC}/moonbeam", "explorer": "https://moonscan.io"},
-    "base": {"chainId": 8453, "name": "Base", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/base", "explorer": "https://basescan.org"},
-    "linea": {"chainId": 59144, "name": "Linea", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/linea", "explorer": "https://lineascan.build"},
-    "zksync": {"chainId": 324, "name": "zkSync Era", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/zksync_era", "explorer": "https://explorer.zksync.io"},
-    "scroll": {"chainId": 534352, "name": "Scroll", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/scroll", "explorer": "https://scrollscan.com"},
-    "mantle": {"chainId": 5000, "name": "Mantle", "symbol": "MNT", "decimals": 18, "rpc": "https://rpc.mantle.xyz", "explorer": "https://explorer.mantle.xyz"},
-    "metis": {"chainId": 1088, "name": "Metis", "symbol": "METIS", "decimals": 18, "rpc": "https://andromeda.metis.io", "explorer": "https://andromeda-explorer.metis.io"},
-    "aurora": {"chainId": 1313161554, "name": "Aurora", "symbol": "ETH", "decimals": 18, "rpc": "https://mainnet.aurora.dev", "explorer": "https://explorer.aurora.dev"},
-    "klaytn": {"chainId": 8217, "name": "Klaytn", "symbol": "KLAY", "decimals": 18, "rpc": "https://public-en.node.kaia.io", "explorer": "https://klaytnscope.com"},
-    "harmony": {"chainId": 1666600000, "name": "Harmony", "symbol": "ONE", "decimals": 18, "rpc": "https://api.harmony.one", "explorer": "https://explorer.harmony.one"},
-    "kcc": {"chainId": 321, "name": "KCC", "symbol": "KCS", "decimals": 18, "rpc": "https://rpc-mainnet.kcc.network", "explorer": "https://explorer.kcc.io"},
-    "okx": {"chainId": 66, "name": "OKX Chain", "symbol": "OKT", "decimals": 18, "rpc": "https://exchainrpc.okex.org", "explorer": "https://www.oklink.com/okc"},
-    "boba": {"chainId": 288, "name": "Boba", "symbol": "ETH", "decimals": 18, "rpc": "https://mainnet.boba.network", "explorer": "https://bobascan.com"},
-    "canto": {"chainId": 7700, "name": "Canto", "symbol": "CANTO", "decimals": 18, "rpc": "https://canto.gravitychain.io", "explorer": "https://cantoscan.com"},
-    "zkfair": {"chainId": 42766, "name": "ZKFair", "symbol": "USDC", "decimals": 18, "rpc": "https://rpc.zkfair.io", "explorer": "https://scan.zkfair.io"},
+    "ethereum": {"chainId": 1, "name": "Ethereum", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/eth", "explorer": "https://etherscan.io", "blockTime": 12, "rpcFallbacks": ["https://ethereum-rpc.publicnode.com", "https://cloudflare-eth.com"]},
+    "bsc": {"chainId": 56, "name": "BNB Chain", "symbol": "BNB", "decimals": 18, "rpc": f"{ANKR_RPC}/bsc", "explorer": "https://bscscan.com", "blockTime": 3, "rpcFallbacks": ["https://bsc-dataseed.bnbchain.org", "https://bsc-rpc.publicnode.com"]},
+    "polygon": {"chainId": 137, "name": "Polygon", "symbol": "MATIC", "decimals": 18, "rpc": f"{ANKR_RPC}/polygon", "explorer": "https://polygonscan.com", "blockTime": 2, "rpcFallbacks": ["https://polygon-rpc.com", "https://polygon-bor-rpc.publicnode.com"]},
+    "avalanche": {"chainId": 43114, "name": "Avalanche", "symbol": "AVAX", "decimals": 18, "rpc": f"{ANKR_RPC}/avalanche", "explorer": "https://snowtrace.io", "blockTime": 2, "rpcFallbacks": ["https://api.avax.network/ext/bc/C/rpc"]},
+    "arbitrum": {"chainId": 42161, "name": "Arbitrum", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/arbitrum", "explorer": "https://arbiscan.io", "blockTime": 0.25, "rpcFallbacks": ["https://arb1.arbitrum.io/rpc"]},
+    "optimism": {"chainId": 10, "name": "Optimism", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/optimism", "explorer": "https://optimistic.etherscan.io", "blockTime": 2, "rpcFallbacks": ["https://mainnet.optimism.io"]},
+    "fantom": {"chainId": 250, "name": "Fantom", "symbol": "FTM", "decimals": 18, "rpc": f"{ANKR_RPC}/fantom", "explorer": "https://ftmscan.com", "blockTime": 1},
+    "cronos": {"chainId": 25, "name": "Cronos", "symbol": "CRO", "decimals": 18, "rpc": "https://evm.cronos.org", "explorer": "https://cronoscan.com", "blockTime": 6, "rpcFallbacks": ["https://cronos-evm-rpc.publicnode.com"]},
+    "gnosis": {"chainId": 100, "name": "Gnosis", "symbol": "xDAI", "decimals": 18, "rpc": f"{ANKR_RPC}/gnosis", "explorer": "https://gnosisscan.io", "blockTime": 5},
+    "celo": {"chainId": 42220, "name": "Celo", "symbol": "CELO", "decimals": 18, "rpc": f"{ANKR_RPC}/celo", "explorer": "https://celoscan.io", "blockTime": 5},
+    "moonbeam": {"chainId": 1284, "name": "Moonbeam", "symbol": "GLMR", "decimals": 18, "rpc": f"{ANKR_RPC}/moonbeam", "explorer": "https://moonscan.io", "blockTime": 6},
+    "base": {"chainId": 8453, "name": "Base", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/base", "explorer": "https://basescan.org", "blockTime": 2, "rpcFallbacks": ["https://mainnet.base.org"]},
+    "linea": {"chainId": 59144, "name": "Linea", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/linea", "explorer": "https://lineascan.build", "blockTime": 2},
+    "zksync": {"chainId": 324, "name": "zkSync Era", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/zksync_era", "explorer": "https://explorer.zksync.io", "blockTime": 1},
+    "scroll": {"chainId": 534352, "name": "Scroll", "symbol": "ETH", "decimals": 18, "rpc": f"{ANKR_RPC}/scroll", "explorer": "https://scrollscan.com", "blockTime": 3},
+    "mantle": {"chainId": 5000, "name": "Mantle", "symbol": "MNT", "decimals": 18, "rpc": "https://rpc.mantle.xyz", "explorer": "https://explorer.mantle.xyz", "blockTime": 2},
+    "metis": {"chainId": 1088, "name": "Metis", "symbol": "METIS", "decimals": 18, "rpc": "https://andromeda.metis.io", "explorer": "https://andromeda-explorer.metis.io", "blockTime": 4},
+    "aurora": {"chainId": 1313161554, "name": "Aurora", "symbol": "ETH", "decimals": 18, "rpc": "https://mainnet.aurora.dev", "explorer": "https://explorer.aurora.dev", "blockTime": 1},
+    "klaytn": {"chainId": 8217, "name": "Klaytn", "symbol": "KLAY", "decimals": 18, "rpc": "https://public-en.node.kaia.io", "explorer": "https://klaytnscope.com", "blockTime": 1},
+    "harmony": {"chainId": 1666600000, "name": "Harmony", "symbol": "ONE", "decimals": 18, "rpc": "https://api.harmony.one", "explorer": "https://explorer.harmony.one", "blockTime": 2},
+    "kcc": {"chainId": 321, "name": "KCC", "symbol": "KCS", "decimals": 18, "rpc": "https://rpc-mainnet.kcc.network", "explorer": "https://explorer.kcc.io", "blockTime": 3},
+    "okx": {"chainId": 66, "name": "OKX Chain", "symbol": "OKT", "decimals": 18, "rpc": "https://exchainrpc.okex.org", "explorer": "https://www.oklink.com/okc", "blockTime": 3},
+    "boba": {"chainId": 288, "name": "Boba", "symbol": "ETH", "decimals": 18, "rpc": "https://mainnet.boba.network", "explorer": "https://bobascan.com", "blockTime": 2},
+    "canto": {"chainId": 7700, "name": "Canto", "symbol": "CANTO", "decimals": 18, "rpc": "https://canto.gravitychain.io", "explorer": "https://cantoscan.com", "blockTime": 6},
+    "zkfair": {"chainId": 42766, "name": "ZKFair", "symbol": "USDC", "decimals": 18, "rpc": "https://rpc.zkfair.io", "explorer": "https://scan.zkfair.io", "blockTime": 3},
     # Non-EVM
-    "xrp": {"name": "XRP Ledger", "symbol": "XRP", "decimals": 6, "type": "xrpl", "rpc": "wss://xrplcluster.com", "explorer": "https://xrpscan.com"},
-    "solana": {"name": "Solana", "symbol": "SOL", "decimals": 9, "type": "solana", "rpc": f"{ANKR_RPC}/solana", "explorer": "https://solscan.io"},
-    "bitcoin": {"name": "Bitcoin", "symbol": "BTC", "decimals": 8, "type": "bitcoin", "rpc": "https://blockstream.info/api", "explorer": "https://blockstream.info"},
-    "tron": {"name": "Tron", "symbol": "TRX", "decimals": 6, "type": "tron", "rpc": "https://api.trongrid.io", "explorer": "https://tronscan.org"},
+    "xrp": {"name": "XRP Ledger", "symbol": "XRP", "decimals": 6, "type": "xrpl", "rpc": "wss://xrplcluster.com", "httpRpc": "https://xrplcluster.com", "explorer": "https://xrpscan.com", "blockTime": 4, "rpcFallbacks": ["https://s1.ripple.com:51234", "https://s2.ripple.com:51234"]},
+    "solana": {"name": "Solana", "symbol": "SOL", "decimals": 9, "type": "solana", "rpc": f"{ANKR_RPC}/solana", "explorer": "https://solscan.io", "blockTime": 0.4, "rpcFallbacks": ["https://api.mainnet-beta.solana.com"]},
+    "bitcoin": {"name": "Bitcoin", "symbol": "BTC", "decimals": 8, "type": "bitcoin", "rpc": "https://blockstream.info/api", "explorer": "https://blockstream.info", "blockTime": 600, "rpcFallbacks": ["https://mempool.space/api"]},
+    "tron": {"name": "Tron", "symbol": "TRX", "decimals": 6, "type": "tron", "rpc": "https://api.trongrid.io", "explorer": "https://tronscan.org", "blockTime": 3},
 }
 
+# Balance responses cached per (chain, address), TTL scaled by blockTime
+balance_cache = BalanceCache(SUPPORTED_CHAINS)
+
+# Max wallets accepted by one /wallets/bulk request
+WALLET_BULK_MAX = int(os.environ.get('WALLET_BULK_MAX', 1000))
+
 # Fallback prices
 FALLBACK_PRICES = {
     "xrp": 2.35, "eth": 3450.0, "btc": 98500.0, "sol": 185.0,
@@ -116,6 +182,15 @@ class WalletImport(BaseModel):
     name: str
     mnemonic: str
 
+class WalletBulkItem(BaseModel):
+    name: str
+    mnemonic: Optional[str] = None  # Encrypted on the frontend
+    addresses: Dict[str, str] = {}
+    is_imported: bool = False
+
+class WalletBulkCreate(BaseModel):
+    wallets: List[WalletBulkItem] = Field(..., min_length=1, max_length=WALLET_BULK_MAX)
+
 class WalletResponse(BaseModel):
     id: str
     name: str
@@ -130,13 +205,21 @@ class PasswordUpdate(BaseModel):
 class ProfileUpdate(BaseModel):
     name: Optional[str] = None
 
+class TokenBalanceRequest(BaseModel):
+    addresses: Dict[str, str]
+    tokens: Dict[str, List[str]] = {}  # chain -> token contracts/mints/issuers; defaults when omitted
+
+class PortfolioRequest(BaseModel):
+    addresses: Dict[str, str]
+    include_tokens: bool = True
+
 # ===================== AUTH HELPERS =====================
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -144,6 +227,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def user_token_claims(user: dict) -> dict:
+    claims = {"sub": user["id"]}
+    if JWT_EMBED_USER_CLAIMS:
+        claims["usr"] = {field: user.get(field) for field in USER_CLAIM_FIELDS}
+    return claims
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -159,10 +248,23 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise credentials_exception
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+    claims = payload.get("usr")
+    if JWT_EMBED_USER_CLAIMS and claims and claims.get("id") == user_id:
+        return dict(claims)
+    
+    user = user_cache.get(user_id)
     if user is None:
-        raise credentials_exception
-    return user
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+        if user is None:
+            raise credentials_exception
+        user_cache.set(user_id, user)
+    return dict(user)
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
 
 # ===================== AUTH ROUTES =====================
 
@@ -179,7 +281,7 @@ async def register(user_data: UserCreate):
     user = {
         "id": user_id,
         "email": user_data.email.lower(),
-        "password": get_password_hash(user_data.password),
+        "password": await get_password_hash(user_data.password),
         "name": user_data.name or user_data.email.split("@")[0],
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
@@ -187,7 +289,7 @@ async def register(user_data: UserCreate):
     await db.users.insert_one(user)
     
     # Create token
-    access_token = create_access_token(data={"sub": user_id})
+    access_token = create_access_token(data=user_token_claims(user))
     
     return TokenResponse(
         access_token=access_token,
@@ -203,10 +305,10 @@ async def register(user_data: UserCreate):
 async def login(credentials: UserLogin):
     """Login user"""
     user = await db.users.find_one({"email": credentials.email.lower()})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
-    access_token = create_access_token(data={"sub": user["id"]})
+    access_token = create_access_token(data=user_token_claims(user))
     
     return TokenResponse(
         access_token=access_token,
@@ -237,20 +339,26 @@ async def update_profile(data: ProfileUpdate, current_user: dict = Depends(get_c
     
     if update_data:
         await db.users.update_one({"id": current_user["id"]}, {"$set": update_data})
+        user_cache.delete(current_user["id"])
     
-    return {"success": True, "message": "Profile updated"}
+    result = {"success": True, "message": "Profile updated"}
+    if JWT_EMBED_USER_CLAIMS:
+        # Embedded claims are now outdated; hand back a token with the new profile
+        result["access_token"] = create_access_token(data=user_token_claims({**current_user, **update_data}))
+    return result
 
 @api_router.put("/auth/password")
 async def update_password(data: PasswordUpdate, current_user: dict = Depends(get_current_user)):
     """Update user password"""
     user = await db.users.find_one({"id": current_user["id"]})
-    if not verify_password(data.current_password, user["password"]):
+    if not await verify_password(data.current_password, user["password"]):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
     await db.users.update_one(
         {"id": current_user["id"]},
-        {"$set": {"password": get_password_hash(data.new_password)}}
+        {"$set": {"password": await get_password_hash(data.new_password)}}
     )
+    user_cache.delete(current_user["id"])
     
     return {"success": True, "message": "Password updated"}
 
@@ -319,21 +427,99 @@ async def import_wallet(data: WalletImport, current_user: dict = Depends(get_cur
         is_imported=True
     )
 
-@api_router.get("/wallets", response_model=List[WalletResponse])
-async def get_wallets(current_user: dict = Depends(get_current_user)):
-    """Get all user's wallets"""
-    wallets = await db.wallets.find(
-        {"user_id": current_user["id"]},
-        {"_id": 0, "encrypted_mnemonic": 0}
-    ).to_list(100)
-    
-    return [WalletResponse(
-        id=w["id"],
-        name=w["name"],
-        addresses=w.get("addresses", {}),
-        created_at=w["created_at"],
-        is_imported=w.get("is_imported", False)
-    ) for w in wallets]
+WALLET_LIST_PROJECTION = {"_id": 0, "id": 1, "name": 1, "addresses": 1, "created_at": 1, "is_imported": 1}
+
+def encode_wallet_cursor(wallet: dict) -> str:
+    raw = json.dumps([wallet["created_at"], wallet["id"]]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_wallet_cursor(cursor: str) -> dict:
+    try:
+        created_at, wallet_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"$or": [
+        {"created_at": {"$gt": created_at}},
+        {"created_at": created_at, "id": {"$gt": wallet_id}},
+    ]}
+
+def wallet_row(w: dict) -> dict:
+    return {
+        "id": w["id"],
+        "name": w["name"],
+        "addresses": w.get("addresses", {}),
+        "created_at": w["created_at"],
+        "is_imported": w.get("is_imported", False),
+    }
+
+@api_router.post("/wallets/bulk")
+async def bulk_create_wallets(data: WalletBulkCreate, current_user: dict = Depends(get_current_user)):
+    """Create or import many wallets, with their addresses, in one insert"""
+    created_at = datetime.now(timezone.utc).isoformat()
+    docs = [{
+        "id": str(uuid.uuid4()),
+        "user_id": current_user["id"],
+        "name": item.name,
+        "encrypted_mnemonic": item.mnemonic,
+        "addresses": item.addresses,
+        "created_at": created_at,
+        "is_imported": item.is_imported,
+    } for item in data.wallets]
+    
+    failed = {}
+    try:
+        await db.wallets.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+    
+    results = []
+    for i, doc in enumerate(docs):
+        if i in failed:
+            results.append({"index": i, "success": False, "error": failed[i]})
+        else:
+            results.append({"index": i, "success": True, "wallet": wallet_row(doc)})
+    
+    return {"created": len(docs) - len(failed), "failed": len(failed), "results": results}
+
+# Rows are built by wallet_row and returned directly, so the response is documented rather than validated
+WALLET_LIST_RESPONSES = {200: {
+    "model": List[WalletResponse],
+    "description": "One page of wallets, or every wallet as NDJSON with `stream=true`",
+    "headers": {"X-Next-Cursor": {
+        "description": "Cursor for the next page; absent on the last page and when streaming",
+        "schema": {"type": "string"},
+    }},
+    "content": {"application/x-ndjson": {"schema": {"type": "string", "description": "One WalletResponse per line"}}},
+}}
+
+@api_router.get("/wallets", responses=WALLET_LIST_RESPONSES)
+async def get_wallets(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    current_user: dict = Depends(get_current_user),
+):
+    """Get user's wallets, oldest first. Pass X-Next-Cursor back as `cursor` for the next page,
+    or `stream=true` for every wallet as NDJSON"""
+    query = {"user_id": current_user["id"]}
+    if cursor:
+        query.update(decode_wallet_cursor(cursor))
+    
+    wallets = db.wallets.find(query, WALLET_LIST_PROJECTION).sort([("created_at", 1), ("id", 1)])
+    
+    if stream:
+        async def ndjson():
+            async for w in wallets.batch_size(500):
+                yield json.dumps(wallet_row(w)) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    page = await wallets.limit(limit + 1).to_list(limit + 1)
+    headers = {}
+    if len(page) > limit:
+        page = page[:limit]
+        headers["X-Next-Cursor"] = encode_wallet_cursor(page[-1])
+    
+    return JSONResponse([wallet_row(w) for w in page], headers=headers)
 
 @api_router.delete("/wallets/{wallet_id}")
 async def delete_wallet(wallet_id: str, current_user: dict = Depends(get_current_user)):
@@ -341,6 +527,9 @@ async def delete_wallet(wallet_id: str, current_user: dict = Depends(get_current
     result = await db.wallets.delete_one({"id": wallet_id, "user_id": current_user["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Wallet not found")
+    await db.balance_snapshots.delete_many({"wallet_id": wallet_id})
+    await db.balance_rollups.delete_many({"wallet_id": wallet_id})
+    snapshot_scheduler.forget(wallet_id)
     return {"success": True}
 
 # ===================== BLOCKCHAIN ROUTES =====================
@@ -350,288 +539,438 @@ async def get_supported_chains():
     """Get list of supported chains"""
     return {"chains": SUPPORTED_CHAINS}
 
+def on_xrpl_balance(address: str, balance_drops: int):
+    """Ledger-stream push: refresh the cached balance without polling"""
+    balance_cache.put("xrp", address, chain_adapters["xrp"].result(address, balance_drops))
+
+def on_xrpl_lost(addresses: List[str]):
+    """Pushes stopped (socket dropped or account swept); poll these balances again"""
+    for address in addresses:
+        balance_cache.invalidate("xrp", address)
+
+
+# Long-lived XRPL WebSocket pool; account lookups subscribe the account
+xrpl_ws = XRPLWebSocketPool(
+    os.environ.get('XRPL_WS_URL', SUPPORTED_CHAINS["xrp"]["rpc"]),
+    on_balance=on_xrpl_balance,
+    on_lost=on_xrpl_lost,
+)
+# Subscribed accounts are kept current by pushes, so their cached balances outlive the block-time TTL
+balance_cache.pushed = lambda chain, address: chain == "xrp" and xrpl_ws.is_live(address)
+XRPL_WS_ENABLED = os.environ.get('XRPL_WS_ENABLED', 'true').lower() == 'true'
+
+# Latency-scored routing across each chain's rpc + rpcFallbacks endpoints
+# An attempt must give up before fan_out cancels the chain, or its failure is never recorded
+rpc_router = RpcRouter(SUPPORTED_CHAINS, attempt_timeout=min(RPC_ATTEMPT_TIMEOUT, BALANCE_CHAIN_TIMEOUT * 0.75))
+
+# Token decimals/symbols, looked up once and kept forever
+token_metadata = TokenMetadataStore(db)
+token_balance_cache = TTLCache(int(os.environ.get('TOKEN_CACHE_MAX_ENTRIES', 20000)), 30)
+
+# Balance adapters, one per configured chain
+chain_adapters = build_adapters(
+    SUPPORTED_CHAINS, upstream,
+    rpc_batcher=rpc_batcher, xrpl_ws=xrpl_ws, rpc_router=rpc_router, token_metadata=token_metadata,
+)
+
+async def get_balance(chain: str, address: str):
+    adapter = chain_adapters[chain]
+    if chain == "xrp":
+        # Cache hits count as lookups, so the subscription is not swept as idle
+        xrpl_ws.touch(address)
+    with span(f"balance {chain}", chain=chain):
+        if not adapter.cacheable:
+            return await adapter.fetch_balance(address)
+        return await balance_cache.get_or_fetch(chain, address, lambda: adapter.fetch_balance(address))
+
 @api_router.post("/balance/evm")
 async def get_evm_balance(chain: str, address: str):
     """Get native balance for EVM chain"""
     if chain not in SUPPORTED_CHAINS:
         raise HTTPException(status_code=400, detail="Unsupported chain")
     
-    chain_config = SUPPORTED_CHAINS[chain]
-    if "chainId" not in chain_config:
+    if chain_adapters[chain].family != "evm":
         raise HTTPException(status_code=400, detail="Not an EVM chain")
     
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                chain_config["rpc"],
-                json={
-                    "jsonrpc": "2.0",
-                    "method": "eth_getBalance",
-                    "params": [address, "latest"],
-                    "id": 1
-                }
-            )
-            data = response.json()
-            
-            if "result" in data:
-                balance_wei = int(data["result"], 16)
-                balance = balance_wei / (10 ** chain_config["decimals"])
-                return {
-                    "chain": chain,
-                    "address": address,
-                    "balance": balance,
-                    "symbol": chain_config["symbol"]
-                }
-            else:
-                return {"chain": chain, "address": address, "balance": 0, "symbol": chain_config["symbol"]}
-    except Exception as e:
-        logging.error(f"Error fetching {chain} balance: {e}")
-        return {"chain": chain, "address": address, "balance": 0, "symbol": chain_config["symbol"], "error": str(e)}
+    return await get_balance(chain, address)
 
 @api_router.post("/balance/xrp")
 async def get_xrp_balance(address: str):
     """Get XRP balance from XRPL"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                "https://xrplcluster.com",
-                json={
-                    "method": "account_info",
-                    "params": [{
-                        "account": address,
-                        "ledger_index": "validated"
-                    }]
-                }
-            )
-            data = response.json()
-            
-            if "result" in data and "account_data" in data["result"]:
-                balance_drops = int(data["result"]["account_data"]["Balance"])
-                balance = balance_drops / 1_000_000  # Convert drops to XRP
-                return {"chain": "xrp", "address": address, "balance": balance, "symbol": "XRP"}
-            else:
-                return {"chain": "xrp", "address": address, "balance": 0, "symbol": "XRP"}
-    except Exception as e:
-        logging.error(f"Error fetching XRP balance: {e}")
-        return {"chain": "xrp", "address": address, "balance": 0, "symbol": "XRP", "error": str(e)}
+    return await get_balance("xrp", address)
 
 @api_router.post("/balance/solana")
 async def get_solana_balance(address: str):
     """Get SOL balance"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                f"{ANKR_RPC}/solana",
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "getBalance",
-                    "params": [address]
-                }
-            )
-            data = response.json()
-            
-            if "result" in data and "value" in data["result"]:
-                balance_lamports = data["result"]["value"]
-                balance = balance_lamports / 1_000_000_000  # Convert lamports to SOL
-                return {"chain": "solana", "address": address, "balance": balance, "symbol": "SOL"}
-            else:
-                return {"chain": "solana", "address": address, "balance": 0, "symbol": "SOL"}
-    except Exception as e:
-        logging.error(f"Error fetching SOL balance: {e}")
-        return {"chain": "solana", "address": address, "balance": 0, "symbol": "SOL", "error": str(e)}
+    return await get_balance("solana", address)
 
 @api_router.post("/balance/bitcoin")
 async def get_bitcoin_balance(address: str):
     """Get BTC balance from Blockstream"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get(f"https://blockstream.info/api/address/{address}")
-            if response.status_code == 200:
-                data = response.json()
-                # Balance in satoshis
-                funded = data.get("chain_stats", {}).get("funded_txo_sum", 0)
-                spent = data.get("chain_stats", {}).get("spent_txo_sum", 0)
-                balance_sats = funded - spent
-                balance = balance_sats / 100_000_000  # Convert to BTC
-                return {"chain": "bitcoin", "address": address, "balance": balance, "symbol": "BTC"}
-            else:
-                return {"chain": "bitcoin", "address": address, "balance": 0, "symbol": "BTC"}
-    except Exception as e:
-        logging.error(f"Error fetching BTC balance: {e}")
-        return {"chain": "bitcoin", "address": address, "balance": 0, "symbol": "BTC", "error": str(e)}
+    return await get_balance("bitcoin", address)
 
 @api_router.post("/balance/tron")
 async def get_tron_balance(address: str):
     """Get TRX balance"""
-    try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.post(
-                "https://api.trongrid.io/wallet/getaccount",
-                json={"address": address, "visible": True}
-            )
-            if response.status_code == 200:
-                data = response.json()
-                balance_sun = data.get("balance", 0)
-                balance = balance_sun / 1_000_000  # Convert sun to TRX
-                return {"chain": "tron", "address": address, "balance": balance, "symbol": "TRX"}
-            else:
-                return {"chain": "tron", "address": address, "balance": 0, "symbol": "TRX"}
-    except Exception as e:
-        logging.error(f"Error fetching TRX balance: {e}")
-        return {"chain": "tron", "address": address, "balance": 0, "symbol": "TRX", "error": str(e)}
+    return await get_balance("tron", address)
+
+def balance_job(chain: str, address: str):
+    """Cached balance lookup for one chain, or None if the chain is unknown"""
+    if chain not in chain_adapters:
+        return None
+    return lambda: get_balance(chain, address)
 
 @api_router.post("/balances/multi")
 async def get_multi_chain_balances(addresses: Dict[str, str]):
     """Get balances for multiple chains at once"""
-    results = {}
+    jobs = {}
     
     for chain, address in addresses.items():
         if not address:
             continue
-            
-        try:
-            if chain == "xrp":
-                result = await get_xrp_balance(address)
-            elif chain == "solana":
-                result = await get_solana_balance(address)
-            elif chain == "bitcoin":
-                result = await get_bitcoin_balance(address)
-            elif chain == "tron":
-                result = await get_tron_balance(address)
-            elif chain in SUPPORTED_CHAINS and "chainId" in SUPPORTED_CHAINS.get(chain, {}):
-                result = await get_evm_balance(chain, address)
-            else:
-                result = {"chain": chain, "balance": 0}
-            
-            results[chain] = result
-        except Exception as e:
-            logging.error(f"Error fetching {chain} balance: {e}")
-            results[chain] = {"chain": chain, "balance": 0, "error": str(e)}
+        job = balance_job(chain, address)
+        if job is not None:
+            jobs[chain] = job
+    
+    results, timed_out, errors = await fan_out(
+        jobs,
+        concurrency=BALANCE_FANOUT_CONCURRENCY,
+        job_timeout=BALANCE_CHAIN_TIMEOUT,
+        deadline=BALANCE_REQUEST_DEADLINE,
+    )
+    
+    balances = {}
+    for chain, address in addresses.items():
+        if not address:
+            continue
+        if chain in results:
+            balances[chain] = results[chain]
+        elif chain in timed_out:
+            balances[chain] = {"chain": chain, "address": address, "balance": 0, "error": "timeout", "timed_out": True}
+        elif chain in errors:
+            balances[chain] = {"chain": chain, "balance": 0, "error": errors[chain]}
+        else:
+            balances[chain] = {"chain": chain, "balance": 0}
+    
+    return {"balances": balances, "timed_out": timed_out}
+
+async def get_token_balances_for(chain: str, address: str, tokens: List[str]):
+    key = (*BalanceCache.key(chain, address), tuple(sorted(tokens)))
+    cached = token_balance_cache.get(key)
+    if cached is not None:
+        return cached
+    with span(f"tokens {chain}", chain=chain):
+        result = await chain_adapters[chain].fetch_tokens(address, tokens)
+    if "error" not in result:
+        token_balance_cache.set(key, result, balance_cache.ttl_for(chain))
+    return result
+
+@api_router.post("/balances/tokens")
+async def get_token_balances(request: TokenBalanceRequest):
+    """Get ERC-20 / SPL / TRC-20 / XRPL trust-line balances for multiple chains at once"""
+    jobs = {}
+    
+    for chain, address in request.addresses.items():
+        adapter = chain_adapters.get(chain)
+        if not address or adapter is None or not adapter.supports_tokens:
+            continue
+        tokens = request.tokens.get(chain, [])
+        jobs[chain] = lambda chain=chain, address=address, tokens=tokens: get_token_balances_for(chain, address, tokens)
+    
+    results, timed_out, errors = await fan_out(
+        jobs,
+        concurrency=BALANCE_FANOUT_CONCURRENCY,
+        job_timeout=BALANCE_CHAIN_TIMEOUT,
+        deadline=BALANCE_REQUEST_DEADLINE,
+    )
     
-    return {"balances": results}
+    balances = dict(results)
+    for chain in timed_out:
+        balances[chain] = {"chain": chain, "address": request.addresses[chain], "tokens": [], "error": "timeout", "timed_out": True}
+    for chain, error in errors.items():
+        balances[chain] = {"chain": chain, "address": request.addresses[chain], "tokens": [], "error": error}
+    
+    return {"balances": balances, "timed_out": timed_out}
 
 # ===================== PRICE ROUTES =====================
 
+# CoinGecko ids polled by the ticker, keyed by our price symbol
+PRICE_COINS = {
+    "xrp": "ripple", "eth": "ethereum", "btc": "bitcoin", "sol": "solana",
+    "bnb": "binancecoin", "matic": "matic-network", "avax": "avalanche-2", "ftm": "fantom",
+    "trx": "tron", "one": "harmony", "cro": "crypto-com-chain", "celo": "celo",
+    "glmr": "moonbeam", "mnt": "mantle", "metis": "metis-token", "klay": "kaia",
+    "kcs": "kucoin-shares", "okt": "oec-token", "canto": "canto"
+}
+
+async def fetch_coingecko_prices():
+    """Fetch current prices and 24h changes from CoinGecko"""
+    response = await upstream.get(
+        f"{COINGECKO_API}/simple/price",
+        params={
+            "ids": ",".join(PRICE_COINS.values()),
+            "vs_currencies": "usd",
+            "include_24hr_change": "true"
+        },
+        timeout=5.0
+    )
+    
+    if response.status_code == 429:
+        raise RateLimited(parse_retry_after(response.headers.get("retry-after")))
+    if response.status_code != 200:
+        raise ValueError(f"CoinGecko returned HTTP {response.status_code}")
+    
+    data = response.json()
+    
+    if "status" in data:
+        if data["status"].get("error_code") == 429:
+            raise RateLimited()
+        raise ValueError(f"CoinGecko error: {data['status']}")
+    
+    prices = {}
+    for symbol, coin_id in PRICE_COINS.items():
+        price = data.get(coin_id, {}).get("usd", FALLBACK_PRICES.get(symbol))
+        if price is not None:
+            prices[symbol] = price
+    
+    changes = {symbol: data.get(coin_id, {}).get("usd_24h_change", 0) for symbol, coin_id in PRICE_COINS.items()}
+    
+    return prices, changes
+
+# Latest price snapshot, refreshed in the background
+price_ticker = PriceTicker(fetch_coingecko_prices, FALLBACK_PRICES)
+
 @api_router.get("/prices")
 async def get_prices():
     """Get current prices for supported cryptocurrencies"""
-    try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{COINGECKO_API}/simple/price",
-                params={
-                    "ids": "ripple,ethereum,bitcoin,solana,binancecoin,matic-network,avalanche-2,fantom,tron,harmony",
-                    "vs_currencies": "usd",
-                    "include_24hr_change": "true"
-                }
-            )
-            
-            if response.status_code != 200:
-                return {"prices": FALLBACK_PRICES, "changes": {}, "source": "fallback"}
-            
-            data = response.json()
-            
-            if "status" in data:
-                return {"prices": FALLBACK_PRICES, "changes": {}, "source": "fallback"}
-            
-            prices = {
-                "xrp": data.get("ripple", {}).get("usd", FALLBACK_PRICES["xrp"]),
-                "eth": data.get("ethereum", {}).get("usd", FALLBACK_PRICES["eth"]),
-                "btc": data.get("bitcoin", {}).get("usd", FALLBACK_PRICES["btc"]),
-                "sol": data.get("solana", {}).get("usd", FALLBACK_PRICES["sol"]),
-                "bnb": data.get("binancecoin", {}).get("usd", FALLBACK_PRICES["bnb"]),
-                "matic": data.get("matic-network", {}).get("usd", FALLBACK_PRICES["matic"]),
-                "avax": data.get("avalanche-2", {}).get("usd", FALLBACK_PRICES.get("avax", 35)),
-                "ftm": data.get("fantom", {}).get("usd", FALLBACK_PRICES.get("ftm", 0.45)),
-                "trx": data.get("tron", {}).get("usd", FALLBACK_PRICES.get("trx", 0.25)),
-                "one": data.get("harmony", {}).get("usd", FALLBACK_PRICES.get("one", 0.015)),
-            }
-            
-            changes = {
-                "xrp": data.get("ripple", {}).get("usd_24h_change", 0),
-                "eth": data.get("ethereum", {}).get("usd_24h_change", 0),
-                "btc": data.get("bitcoin", {}).get("usd_24h_change", 0),
-                "sol": data.get("solana", {}).get("usd_24h_change", 0),
-                "bnb": data.get("binancecoin", {}).get("usd_24h_change", 0),
-            }
-            
-            return {"prices": prices, "changes": changes, "source": "coingecko"}
-    except Exception as e:
-        logging.error(f"Error fetching prices: {e}")
-        return {"prices": FALLBACK_PRICES, "changes": {}, "source": "fallback"}
+    return price_ticker.snapshot()
+
+# Coins with stored price history, keyed by our price symbol
+PRICE_HISTORY_COINS = {
+    "xrp": "ripple", "eth": "ethereum", "btc": "bitcoin",
+    "sol": "solana", "bnb": "binancecoin", "matic": "matic-network"
+}
+
+price_history = PriceHistoryStore(db, upstream, COINGECKO_API)
 
 @api_router.get("/prices/history/{coin_id}")
-async def get_price_history(coin_id: str, days: int = 7):
-    """Get price history for a coin"""
-    coin_map = {
-        "xrp": "ripple", "eth": "ethereum", "btc": "bitcoin",
-        "sol": "solana", "bnb": "binancecoin", "matic": "matic-network"
-    }
+async def get_price_history(
+    coin_id: str,
+    days: int = 7,
+    points: int = 500,
+    fmt: str = Query("rows", alias="format"),
+    stats: bool = False,
+):
+    """Get price history for a coin as rows, columnar arrays or a binary Float64 frame"""
+    # numpy is only needed here; importing it lazily keeps it out of the cold start
+    import price_series
+    
+    if fmt not in ("rows", "columnar", "binary"):
+        raise HTTPException(status_code=400, detail="Unsupported format")
     
-    gecko_id = coin_map.get(coin_id.lower(), "ripple")
+    days = max(1, min(days, 365))
+    gecko_id = PRICE_HISTORY_COINS.get(coin_id.lower(), "ripple")
     
     try:
-        async with httpx.AsyncClient(timeout=5.0) as client:
-            response = await client.get(
-                f"{COINGECKO_API}/coins/{gecko_id}/market_chart",
-                params={"vs_currency": "usd", "days": days}
-            )
-            
-            if response.status_code != 200:
-                return generate_mock_history(coin_id, days)
-            
-            data = response.json()
-            
-            if "status" in data or "prices" not in data:
-                return generate_mock_history(coin_id, days)
-            
-            prices = [{"timestamp": p[0], "price": p[1]} for p in data.get("prices", [])]
-            return {"coin_id": coin_id, "prices": prices, "days": days}
+        candles = await price_history.get_candles(gecko_id, days, max_points=points)
     except Exception as e:
-        logging.error(f"Error fetching price history: {e}")
-        return generate_mock_history(coin_id, days)
-
-def generate_mock_history(coin_id: str, days: int):
-    import random
-    base_price = FALLBACK_PRICES.get(coin_id.lower(), 2.35)
-    now = datetime.now(timezone.utc).timestamp() * 1000
-    prices = []
-    current = base_price * random.uniform(0.9, 0.95)
-    
-    for i in range(days * 24):
-        timestamp = now - ((days * 24 - i) * 3600000)
-        volatility = random.uniform(-0.02, 0.02)
-        current = current * (1 + volatility)
-        current = max(current, base_price * 0.8)
-        current = min(current, base_price * 1.2)
-        prices.append({"timestamp": timestamp, "price": round(current, 4)})
-    
-    return {"coin_id": coin_id, "prices": prices, "days": days}
+        logging.error(f"Error reading price history: {e}")
+        candles = []
+    
+    if candles:
+        series, source = price_series.from_candles(candles), "store"
+    else:
+        base_price = FALLBACK_PRICES.get(coin_id.lower(), 2.35)
+        series, source = price_series.thin(price_series.mock_series(base_price, days), points), "mock"
+    
+    if fmt == "binary":
+        headers = price_series.binary_headers(series, source, stats)
+        return Response(price_series.to_binary(series), media_type="application/octet-stream", headers=headers)
+    
+    result = {"coin_id": coin_id, "days": days, "source": source}
+    if fmt == "columnar":
+        result.update(price_series.to_columns(series))
+    else:
+        result["prices"] = price_series.to_rows(series)
+    if stats:
+        result["stats"] = price_series.series_stats(series[1])
+    return JSONResponse(result)
+
+# ===================== PORTFOLIO ROUTES =====================
+
+# Portfolios kept between requests, so a refresh only revalues what changed
+portfolio_cache = TTLCache(
+    int(os.environ.get('PORTFOLIO_CACHE_MAX_ENTRIES', 10000)),
+    float(os.environ.get('PORTFOLIO_CACHE_TTL', 900)),
+)
+
+async def fetch_holdings(addresses: Dict[str, str], include_tokens: bool = True):
+    """Native (keyed by chain) and token (keyed "chain:tokens") balance lookups through the caches"""
+    jobs = {chain: balance_job(chain, address) for chain, address in addresses.items()}
+    if include_tokens:
+        for chain, address in addresses.items():
+            if chain_adapters[chain].supports_tokens:
+                jobs[f"{chain}:tokens"] = lambda chain=chain, address=address: get_token_balances_for(chain, address, [])
+    
+    return await fan_out(
+        jobs,
+        concurrency=BALANCE_FANOUT_CONCURRENCY,
+        job_timeout=BALANCE_CHAIN_TIMEOUT,
+        deadline=BALANCE_REQUEST_DEADLINE,
+    )
+
+@api_router.post("/portfolio")
+async def get_portfolio(request: PortfolioRequest):
+    """Per-chain, per-asset and total USD value from cached balances and the price snapshot"""
+    addresses = {chain: address for chain, address in request.addresses.items() if address and chain in chain_adapters}
+    results, timed_out, errors = await fetch_holdings(addresses, request.include_tokens)
+    
+    key = (tuple(sorted(BalanceCache.key(c, a) for c, a in addresses.items())), request.include_tokens)
+    portfolio = portfolio_cache.get(key)
+    if portfolio is None:
+        portfolio = Portfolio()
+        portfolio_cache.set(key, portfolio)
+    
+    prices = price_ticker.snapshot()
+    portfolio.set_prices(prices["prices"])
+    # Failed lookups keep the position from the previous refresh
+    for chain in addresses:
+        native = results.get(chain)
+        if native is not None and "error" not in native:
+            portfolio.set_balance(chain, "native", native.get("symbol"), native["balance"])
+        tokens = results.get(f"{chain}:tokens")
+        if tokens is not None and "error" not in tokens:
+            for token in tokens["tokens"]:
+                portfolio.set_balance(chain, token["token"], token["symbol"], token["balance"])
+            portfolio.drop_missing(chain, {"native", *(t["token"] for t in tokens["tokens"])})
+    
+    return {
+        **portfolio.snapshot(),
+        "prices_updated_at": prices["updated_at"],
+        "prices_stale": prices["stale"],
+        "timed_out": timed_out,
+        "errors": sorted(set(errors) | {c for c, r in results.items() if isinstance(r, dict) and "error" in r}),
+    }
+
+async def collect_wallet_holdings(wallet: dict):
+    """Snapshot collector: (holdings by "chain:asset", chains whose lookup failed)"""
+    addresses = {c: a for c, a in (wallet.get("addresses") or {}).items() if a and c in chain_adapters}
+    results, _, _ = await fetch_holdings(addresses)
+    holdings, failed = {}, set()
+    for chain in addresses:
+        native = results.get(chain)
+        if native is None or "error" in native:
+            failed.add(chain)
+        elif native["balance"]:
+            holdings[f"{chain}:native"] = (native.get("symbol"), native["balance"])
+        tokens = results.get(f"{chain}:tokens")
+        if tokens is not None and "error" not in tokens:
+            for token in tokens["tokens"]:
+                if token["balance"]:
+                    holdings[f"{chain}:{token['token']}"] = (token["symbol"], token["balance"])
+        elif chain_adapters[chain].supports_tokens:
+            failed.add(chain)
+    return holdings, failed
+
+# Periodic per-wallet balance snapshots feeding /portfolio/history
+SNAPSHOTS_ENABLED = os.environ.get('SNAPSHOTS_ENABLED', 'true').lower() == 'true'
+snapshot_scheduler = SnapshotScheduler(db, collect_wallet_holdings)
+
+@api_router.get("/portfolio/history")
+async def get_portfolio_history(
+    wallet_id: str,
+    days: int = 30,
+    resolution: Optional[str] = None,
+    current_user: dict = Depends(get_current_user),
+):
+    """Portfolio USD value over time from hourly/daily balance rollups and stored price history"""
+    days = max(1, min(days, 365))
+    resolution = resolution or ("hour" if days <= 7 else "day")
+    if resolution not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="Unsupported resolution")
+    
+    wallet = await db.wallets.find_one({"id": wallet_id, "user_id": current_user["id"]}, {"_id": 0, "id": 1})
+    if not wallet:
+        raise HTTPException(status_code=404, detail="Wallet not found")
+    
+    end = int(datetime.now(timezone.utc).timestamp() * 1000)
+    rollups = await read_rollups(db, wallet_id, resolution, end - days * 86_400_000, end)
+    
+    symbols = {price_key(s) for rollup in rollups for s in rollup["symbols"]} & PRICE_HISTORY_COINS.keys()
+    candles = await asyncio.gather(
+        *(price_history.get_candles(PRICE_HISTORY_COINS[s], days) for s in symbols), return_exceptions=True
+    )
+    closes = {}
+    for symbol, rows in zip(symbols, candles):
+        if isinstance(rows, Exception):
+            logging.error(f"Error reading price history for {symbol}: {rows}")
+            continue
+        closes[symbol] = ([c[0] for c in rows], [c[4] for c in rows])
+    
+    points, unpriced = value_series(rollups, closes, resolution)
+    return {"wallet_id": wallet_id, "resolution": resolution, "points": points, "unpriced": unpriced}
+
+# ===================== STREAM ROUTES =====================
+
+# Pushes balance and price changes to connected clients over SSE
+stream_hub = StreamHub(balance_job, price_ticker.snapshot, concurrency=BALANCE_FANOUT_CONCURRENCY)
+balance_cache.listeners.append(stream_hub.on_balance)
+price_ticker.listeners.append(stream_hub.on_prices)
+
+@api_router.get("/stream")
+async def stream_updates(addresses: str = Query(..., description="Comma-separated chain:address pairs")):
+    """Server-sent balance and price updates for the given addresses"""
+    pairs = []
+    for item in addresses.split(","):
+        chain, _, address = item.strip().partition(":")
+        if not address:
+            continue
+        if chain not in SUPPORTED_CHAINS:
+            raise HTTPException(status_code=400, detail=f"Unsupported chain: {chain}")
+        pairs.append((chain, address))
+    if not pairs:
+        raise HTTPException(status_code=400, detail="No addresses given")
+    if len(pairs) > STREAM_MAX_ADDRESSES:
+        raise HTTPException(status_code=400, detail=f"At most {STREAM_MAX_ADDRESSES} addresses per stream")
+    
+    return StreamingResponse(
+        stream_hub.events(pairs),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 # ===================== SWAP ROUTES =====================
 
+# Quotes are priced from the ticker snapshot and never wait on upstream
+swap_quoter = SwapQuoter(price_ticker.prices)
+price_ticker.listeners.append(swap_quoter.on_prices)
+
 @api_router.post("/swap/quote")
-async def get_swap_quote(from_chain: str, to_chain: str, from_token: str, to_token: str, amount: str):
-    """Get swap quote - simulated for now"""
-    prices_data = await get_prices()
-    prices = prices_data.get("prices", FALLBACK_PRICES)
-    
-    from_price = prices.get(from_token.lower(), 1.0)
-    to_price = prices.get(to_token.lower(), 1.0)
+async def get_swap_quote(
+    from_chain: str,
+    to_chain: str,
+    from_token: str,
+    to_token: str,
+    amount: str,
+    slippage_bps: int = SWAP_DEFAULT_SLIPPAGE_BPS,
+):
+    """Get a swap quote to XRP over the cheapest supported route"""
+    if to_chain.lower() != "xrp" or to_token.lower() != "xrp":
+        raise HTTPException(status_code=400, detail="Swaps are only quoted to XRP")
     
-    from_amount = float(amount)
-    from_value = from_amount * from_price
-    to_amount = from_value / to_price * 0.995  # 0.5% slippage
+    try:
+        quote = swap_quoter.quote(from_chain, from_token, amount, slippage_bps)
+    except QuoteError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
+    native = SUPPORTED_CHAINS.get(from_chain.lower(), {}).get("symbol", from_token.upper())
     return {
         "from_token": from_token,
         "to_token": to_token,
         "from_amount": amount,
-        "to_amount": str(round(to_amount, 6)),
-        "exchange_rate": round(to_amount / from_amount, 6) if from_amount > 0 else 0,
-        "gas_estimate": "0.001 " + from_token.upper(),
-        "provider": "XRP DEX" if "xrp" in [from_token.lower(), to_token.lower()] else "1inch",
+        **quote,
+        "gas_estimate": f"0.001 {native}",
+        "prices_stale": price_ticker.snapshot()["stale"],
     }
 
 # ===================== STATUS =====================
@@ -644,22 +983,237 @@ async def root():
 async def health():
     return {"status": "healthy", "timestamp": datetime.now(timezone.utc).isoformat()}
 
-# Include the router
-app.include_router(api_router)
+@api_router.get("/ready")
+async def ready():
+    """Readiness: 503 with the startup report until the Mongo and upstream pools are warm"""
+    report = startup_report.as_dict()
+    return JSONResponse(report, status_code=200 if report["ready"] else 503)
+
+@api_router.get("/stats")
+async def stats():
+    """Internal pool and cache statistics"""
+    return {
+        "upstream": upstream.stats(),
+        "rpc_batch": rpc_batcher.stats(),
+        "balance_cache": balance_cache.stats(),
+        "price_ticker": price_ticker.stats(),
+        "password_hasher": password_hasher.stats(),
+        "user_cache": user_cache.stats(),
+        "xrpl_ws": xrpl_ws.stats(),
+        "chain_adapters": adapter_stats(chain_adapters),
+        "rpc_router": rpc_router.stats(),
+        "token_cache": token_balance_cache.stats(),
+        "token_metadata": len(token_metadata),
+        "portfolio_cache": portfolio_cache.stats(),
+        "snapshots": snapshot_scheduler.stats(),
+        "swap_quotes": swap_quoter.stats(),
+        "stream": stream_hub.stats(),
+        "tracing": tracer.stats(),
+        "loop_monitor": loop_monitor.stats(),
+        "startup": startup_report.as_dict(),
+    }
+
+# ===================== ADMIN ROUTES =====================
+
+@api_router.get("/admin/rpc-endpoints")
+async def get_rpc_endpoints(_: None = Depends(require_admin)):
+    """RPC endpoint health and latency scores, best first per chain"""
+    return {"chains": rpc_router.endpoint_stats()}
+
+# Watchdog for synchronous code stalling the event loop
+loop_monitor = LoopMonitor()
+LOOP_MONITOR_ENABLED = os.environ.get('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+
+@api_router.get("/admin/loop-blocks")
+async def get_loop_blocks(_: None = Depends(require_admin)):
+    """Recent event-loop blocking episodes with the stack that was running, newest first"""
+    return {**loop_monitor.stats(), "events": loop_monitor.recent()}
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_credentials=True,
-    allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
-    allow_methods=["*"],
-    allow_headers=["*"],
+@api_router.get("/admin/profile")
+async def get_profile(
+    seconds: float = Query(10, ge=0.1, le=60),
+    interval_ms: float = Query(5, ge=1, le=100),
+    all_threads: bool = False,
+    include_idle: bool = False,
+    _: None = Depends(require_admin),
+):
+    """Sample stacks for N seconds and return them as collapsed stacks for flamegraph tools"""
+    try:
+        collapsed = await asyncio.to_thread(loop_monitor.profile, seconds, interval_ms / 1000, all_threads, include_idle)
+    except LookupError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        collapsed,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="profile-{int(seconds)}s.collapsed"'},
+    )
+
+# ===================== METRICS =====================
+
+upstream_latency = metrics_registry.histogram(
+    "upstream_request_duration_seconds", "Upstream HTTP latency by host", ("host", "status")
+)
+rpc_latency = metrics_registry.histogram(
+    "rpc_call_duration_seconds", "Routed RPC call latency by chain, including hedges and failover", ("chain", "outcome")
 )
+loop_lag = LoopLagMonitor(metrics_registry)
+
+def collect_upstream_metrics():
+    hosts = upstream.stats()["hosts"]
+    hasher = password_hasher.stats()
+    return [
+        ("upstream_requests_in_flight", "gauge", "Upstream requests awaiting a response",
+         [("", {"host": h}, s["in_flight"]) for h, s in hosts.items()]),
+        ("upstream_connections_total", "counter", "Upstream requests by connection reuse",
+         [("", {"host": h, "connection": kind}, s[f"{kind}_connections"]) for h, s in hosts.items() for kind in ("new", "reused")]),
+        ("password_hash_queue_depth", "gauge", "bcrypt jobs waiting for a worker", [("", {}, hasher["queue_depth"])]),
+        ("password_hash_wait_seconds_total", "counter", "Time bcrypt jobs spent queued", [("", {}, password_hasher.wait_total)]),
+        ("password_hash_run_seconds_total", "counter", "Time spent hashing", [("", {}, password_hasher.run_total)]),
+        ("password_hash_completed_total", "counter", "Completed bcrypt jobs", [("", {}, hasher["completed"])]),
+    ]
+
+def collect_loop_metrics():
+    return [
+        ("event_loop_blocks_total", "counter", "Event loop blocking episodes over the threshold",
+         [("", {}, loop_monitor.blocks)]),
+        ("event_loop_blocked_seconds_total", "counter", "Time the event loop spent blocked",
+         [("", {}, loop_monitor.blocked_total)]),
+    ]
+
+
+# With metrics off nothing is observed on the hot path or collected
+if METRICS_ENABLED:
+    upstream.listeners.append(lambda host, status, seconds: upstream_latency.labels(host, status).observe(seconds))
+    rpc_router.listeners.append(lambda chain, outcome, seconds: rpc_latency.labels(chain, outcome).observe(seconds))
+    loop_monitor.listeners.append(loop_lag.observe)
+    metrics_registry.collectors.append(collect_upstream_metrics)
+    metrics_registry.collectors.append(collect_loop_metrics)
+    metrics_registry.collectors.append(cache_collector({
+        "balance": balance_cache.stats,
+        "user": user_cache.stats,
+        "token_balance": token_balance_cache.stats,
+        "portfolio": portfolio_cache.stats,
+    }))
+
+async def metrics():
+    """Prometheus text exposition"""
+    return Response(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+async def hasher_busy_handler(request, exc: HasherBusy):
+    return JSONResponse(status_code=503, content={"detail": "Server busy, try again"}, headers={"Retry-After": "1"})
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+# ===================== STARTUP =====================
+
+# Upstream pools are probed for at most this long before the pod reports ready
+WARMUP_PROBE_TIMEOUT = float(os.environ.get('WARMUP_PROBE_TIMEOUT', 5.0))
+MONGO_CONNECT_RETRY_MAX = float(os.environ.get('MONGO_CONNECT_RETRY_MAX', 10.0))
+
+def probe_endpoint(chain: str, url: str):
+    return chain_adapters[chain].probe(url)
+
+async def warm_mongo():
+    """Ping until Mongo answers, then fill the connection pool with concurrent pings"""
+    delay = 0.5
+    while True:
+        try:
+            await db.command("ping")
+            break
+        except Exception as e:
+            logger.warning(f"Mongo not reachable yet ({e}); retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MONGO_CONNECT_RETRY_MAX)
+    await asyncio.gather(*(db.command("ping") for _ in range(MONGO_MIN_POOL_SIZE)))
+
+async def warm_up():
+    """Open the upstream and Mongo pools, then mark the pod ready"""
+    phase = "upstream_pools"
+    try:
+        with startup_report.phase("upstream_pools"):
+            upstream.open([COINGECKO_API, *(e.url for endpoints in rpc_router.endpoints.values() for e in endpoints)])
+            # One request per endpoint completes the TLS handshakes and seeds the router's latency scores
+            try:
+                await asyncio.wait_for(rpc_router.probe_all(probe_endpoint), WARMUP_PROBE_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Upstream warm-up probes still running after {WARMUP_PROBE_TIMEOUT}s")
+        phase = "mongo"
+        with startup_report.phase("mongo"):
+            await warm_mongo()
+        phase = "indexes"
+        with startup_report.phase("indexes"):
+            await ensure_indexes(db)
+            if MONGO_INDEX_AUDIT:
+                for row in await audit_queries(db):
+                    logger.info(f"Query plan audit: {row}")
+        if SNAPSHOTS_ENABLED:
+            snapshot_scheduler.start()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        logger.exception("Startup warm-up failed")
+        startup_report.set_failed(phase)
+        return
+    startup_report.set_ready()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    with startup_report.phase("background_tasks"):
+        price_ticker.start()
+        stream_hub.start()
+        # The warm-up probes every endpoint once, so the health loop starts one interval later
+        rpc_router.start(probe_endpoint, delay=RPC_HEALTH_INTERVAL)
+        # One heartbeat feeds the lag histogram and the blocking watchdog; the profiler only needs attach()
+        if METRICS_ENABLED or LOOP_MONITOR_ENABLED:
+            loop_monitor.start(watchdog=LOOP_MONITOR_ENABLED)
+        else:
+            loop_monitor.attach()
+        if XRPL_WS_ENABLED:
+            await xrpl_ws.start()
+    # Serve liveness right away; /api/ready turns green when the warm-up finishes
+    warmup = asyncio.create_task(warm_up())
+    try:
+        yield
+    finally:
+        warmup.cancel()
+        await asyncio.gather(warmup, return_exceptions=True)
+        await price_ticker.stop()
+        await stream_hub.stop()
+        await rpc_router.stop()
+        await snapshot_scheduler.stop()
+        await loop_monitor.stop()
+        await xrpl_ws.stop()
+        client.close()
+        await upstream.close()
+        password_hasher.shutdown()
+
+def create_app() -> FastAPI:
+    app = FastAPI(title="XRP Nexus Terminal API", lifespan=lifespan)
+    if METRICS_ENABLED:
+        app.add_api_route("/metrics", metrics, include_in_schema=False)
+    app.include_router(api_router)
+    app.add_exception_handler(HasherBusy, hasher_busy_handler)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_credentials=True,
+        allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Pagination cursor and the binary price series metadata, readable by cross-origin clients
+        expose_headers=["X-Next-Cursor", "X-Series-Length", "X-Series-Layout", "X-Series-Source", "X-Series-Stats"],
+    )
+    if METRICS_ENABLED:
+        app.add_middleware(RouteMetricsMiddleware, registry=metrics_registry)
+    if tracer.enabled:
+        app.add_middleware(TracingMiddleware)
+    return app
+
+
+app = create_app()
+startup_report.mark("app")
@@ -0,0 +1,237 @@
+"""
+Periodic wallet balance snapshots and portfolio value history.
+
+A background scheduler walks all wallets every SNAPSHOT_INTERVAL seconds,
+collects their holdings through the balance caches and writes, with one
+bulk_write per collection per batch of wallets:
+
+- `balance_snapshots`: one document per wallet per UTC day. `t` holds the
+  snapshot times and `d` the matching entries, each listing only the
+  assets whose balance changed since the previous snapshot as
+  [asset, symbol, balance]. The first entry of a day is complete, so
+  every day document decodes on its own.
+- `balance_rollups`: the holdings at the end of each hour and each day
+  (`res` "hour" / "day"), as parallel asset/symbol/balance arrays.
+
+History queries read only the rollups and join them with stored hourly
+price candles.
+
+Only one process takes snapshots at a time: before each run the scheduler
+takes or renews a lease document in `scheduler_leases`, and replicas that
+do not hold it skip the run.
+"""
+import asyncio
+import bisect
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from fanout import fan_out
+from portfolio import price_for, price_key
+from price_history import DAY_MS, HOUR_MS
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", 900))
+SNAPSHOT_BATCH_SIZE = int(os.environ.get("SNAPSHOT_BATCH_SIZE", 200))
+SNAPSHOT_CONCURRENCY = int(os.environ.get("SNAPSHOT_CONCURRENCY", 16))
+# How long a replica keeps the snapshot lease without renewing it; defaults to two intervals
+SNAPSHOT_LEASE_TTL = float(os.environ.get("SNAPSHOT_LEASE_TTL", 2 * SNAPSHOT_INTERVAL))
+
+Holdings = Dict[str, Tuple[Optional[str], float]]  # asset ("chain:token") -> (symbol, balance)
+Collector = Callable[[dict], Awaitable[Tuple[Holdings, Set[str]]]]  # wallet -> (holdings, failed chains)
+
+RESOLUTIONS = {"hour": HOUR_MS, "day": DAY_MS}
+
+
+class SnapshotScheduler:
+    """Writes delta-encoded snapshots and hourly/daily rollups for every wallet"""
+
+    def __init__(self, db, collect: Collector, interval: float = SNAPSHOT_INTERVAL,
+                 batch_size: int = SNAPSHOT_BATCH_SIZE, concurrency: int = SNAPSHOT_CONCURRENCY,
+                 lease_ttl: float = SNAPSHOT_LEASE_TTL):
+        self.db = db
+        self.collect = collect
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease_ttl = lease_ttl
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.leader = False
+        self.state: Dict[str, Tuple[int, Holdings]] = {}  # wallet_id -> (day bucket, last holdings)
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"runs": 0, "skipped_runs": 0, "wallets": 0, "entries": 0, "unchanged": 0, "last_run_ms": None}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self.leader:
+            # Hand over right away instead of making the other replicas wait out the lease
+            try:
+                await self.db.scheduler_leases.delete_one({"_id": "snapshots", "holder": self.holder})
+            except Exception as e:
+                logger.warning(f"Could not release the snapshot lease: {e}")
+            self.leader = False
+
+    async def acquire_lease(self) -> bool:
+        """Take or renew the snapshot lease; False while another replica holds it"""
+        now_ms = int(time.time() * 1000)
+        try:
+            await self.db.scheduler_leases.update_one(
+                {"_id": "snapshots", "$or": [{"holder": self.holder}, {"expires_at": {"$lt": now_ms}}]},
+                {"$set": {"holder": self.holder, "expires_at": now_ms + int(self.lease_ttl * 1000)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # The lease exists and is held by a live replica
+            acquired = False
+        else:
+            acquired = True
+        if acquired and not self.leader:
+            # Another replica may have written snapshots since; resume from the stored rollups
+            self.state.clear()
+        self.leader = acquired
+        return acquired
+
+    async def _run(self):
+        while True:
+            try:
+                if await self.acquire_lease():
+                    await self.run_once()
+                else:
+                    self._stats["skipped_runs"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error taking balance snapshots: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self, now_ms: Optional[int] = None):
+        started = time.perf_counter()
+        now_ms = now_ms or int(time.time() * 1000)
+        batch = []
+        async for wallet in self.db.wallets.find({}, {"_id": 0, "id": 1, "user_id": 1, "addresses": 1}):
+            batch.append(wallet)
+            if len(batch) >= self.batch_size:
+                await self._snapshot_batch(batch, now_ms)
+                batch = []
+        if batch:
+            await self._snapshot_batch(batch, now_ms)
+        self._stats["runs"] += 1
+        self._stats["last_run_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    async def _snapshot_batch(self, wallets: List[dict], now_ms: int):
+        jobs = {w["id"]: (lambda w=w: self.collect(w)) for w in wallets}
+        results, _, _ = await fan_out(jobs, concurrency=self.concurrency, job_timeout=30, deadline=120)
+
+        day = now_ms // DAY_MS * DAY_MS
+        snapshot_ops, rollup_ops = [], []
+        for wallet in wallets:
+            if wallet["id"] not in results:
+                continue
+            holdings, failed = results[wallet["id"]]
+            previous_day, previous = await self._previous(wallet["id"])
+            # Chains that failed this round keep their last known balances
+            holdings = {**{a: v for a, v in previous.items() if a.split(":", 1)[0] in failed}, **holdings}
+
+            if previous_day != day:
+                changes = [[a, s, b] for a, (s, b) in holdings.items()]
+            else:
+                changes = [[a, s, b] for a, (s, b) in holdings.items() if previous.get(a) != (s, b)]
+                changes += [[a, s, 0] for a, (s, _) in previous.items() if a not in holdings]
+            self.state[wallet["id"]] = (day, holdings)
+            self._stats["wallets"] += 1
+
+            if not changes and previous_day == day:
+                self._stats["unchanged"] += 1
+            else:
+                self._stats["entries"] += 1
+                snapshot_ops.append(UpdateOne(
+                    {"wallet_id": wallet["id"], "bucket": day},
+                    {"$push": {"t": now_ms, "d": changes}, "$setOnInsert": {"user_id": wallet["user_id"]}},
+                    upsert=True,
+                ))
+
+            assets = sorted(holdings)
+            rollup = {
+                "user_id": wallet["user_id"],
+                "assets": assets,
+                "symbols": [holdings[a][0] for a in assets],
+                "balances": [holdings[a][1] for a in assets],
+                "updated_at": now_ms,
+            }
+            for res, size in RESOLUTIONS.items():
+                rollup_ops.append(UpdateOne(
+                    {"wallet_id": wallet["id"], "res": res, "t": now_ms // size * size},
+                    {"$set": rollup},
+                    upsert=True,
+                ))
+
+        if snapshot_ops:
+            await self.db.balance_snapshots.bulk_write(snapshot_ops, ordered=False)
+        if rollup_ops:
+            await self.db.balance_rollups.bulk_write(rollup_ops, ordered=False)
+
+    async def _previous(self, wallet_id: str) -> Tuple[Optional[int], Holdings]:
+        if wallet_id in self.state:
+            return self.state[wallet_id]
+        # Cold start: resume from the latest rollup; the next day entry is written in full
+        doc = await self.db.balance_rollups.find_one(
+            {"wallet_id": wallet_id, "res": "hour"}, {"_id": 0}, sort=[("t", -1)]
+        )
+        if doc is None:
+            return None, {}
+        return None, {a: (s, b) for a, s, b in zip(doc["assets"], doc["symbols"], doc["balances"])}
+
+    def forget(self, wallet_id: str):
+        self.state.pop(wallet_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "tracked_wallets": len(self.state), "interval": self.interval, "leader": self.leader}
+
+
+async def read_rollups(db, wallet_id: str, res: str, start: int, end: int) -> List[dict]:
+    cursor = db.balance_rollups.find(
+        {"wallet_id": wallet_id, "res": res, "t": {"$gte": start // RESOLUTIONS[res] * RESOLUTIONS[res], "$lte": end}},
+        {"_id": 0, "t": 1, "symbols": 1, "balances": 1},
+    ).sort("t", 1)
+    return [doc async for doc in cursor]
+
+
+def value_series(rollups: List[dict], closes: Dict[str, Tuple[List[int], List[float]]],
+                 res: str) -> Tuple[List[dict], List[str]]:
+    """Portfolio USD value per rollup period, priced at the last close within the period"""
+    period = RESOLUTIONS[res]
+    points, unpriced = [], set()
+    for rollup in rollups:
+        period_end = rollup["t"] + period - 1
+        prices = {}
+        for symbol in set(rollup["symbols"]):
+            key = price_key(symbol)
+            if key in closes:
+                times, values = closes[key]
+                i = bisect.bisect_right(times, period_end) - 1
+                if i >= 0:
+                    prices[key] = values[i]
+        value = 0.0
+        for symbol, balance in zip(rollup["symbols"], rollup["balances"]):
+            price = price_for(symbol, prices)
+            if price is None:
+                if balance:
+                    unpriced.add(symbol or "?")
+                continue
+            value += balance * price
+        points.append({"timestamp": rollup["t"], "value": round(value, 2)})
+    return points, sorted(unpriced)
@@ -0,0 +1,71 @@
+"""
+Startup phase timing and readiness.
+
+The server creates one StartupReport before its heavy imports. Import
+time is split into sequential phases with mark(); lifespan work is timed
+with the phase() context manager. When the background warm-up (Mongo
+pool, indexes, upstream pools) finishes, set_ready() records the total
+time to ready and logs a one-line breakdown, and the readiness probe
+starts passing.
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupReport:
+    """Per-phase startup durations and the ready flag"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases: List[Dict[str, Any]] = []
+        self.ready = False
+        self.ready_ms: Optional[float] = None
+        self.failed: Optional[str] = None
+
+    def _record(self, name: str, seconds: float, error: Optional[str] = None):
+        phase = {"name": name, "ms": round(seconds * 1000, 1)}
+        if error is not None:
+            phase["error"] = error
+        self.phases.append(phase)
+
+    def mark(self, name: str):
+        """Close a phase that began at the previous mark (or at creation)"""
+        now = time.perf_counter()
+        self._record(name, now - self._last_mark)
+        self._last_mark = now
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            self._record(name, time.perf_counter() - started, error=f"{type(e).__name__}: {e}")
+            raise
+        self._record(name, time.perf_counter() - started)
+
+    def set_failed(self, phase: str):
+        self.failed = phase
+        logger.error(f"Startup failed in phase {phase}: {self.summary()}")
+
+    def set_ready(self):
+        self.ready = True
+        self.ready_ms = round((time.perf_counter() - self.started) * 1000, 1)
+        logger.info(f"Ready in {self.ready_ms:.0f}ms: {self.summary()}")
+
+    def summary(self) -> str:
+        return ", ".join(f"{p['name']} {p['ms']:.0f}ms" + (" (failed)" if "error" in p else "") for p in self.phases)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "ready_ms": self.ready_ms,
+            "failed": self.failed,
+            "uptime_s": round(time.perf_counter() - self.started, 1),
+            "phases": list(self.phases),
+        }
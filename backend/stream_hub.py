@@ -0,0 +1,204 @@
+"""
+Server-push hub for /api/stream.
+
+Each connected session registers the (chain, address) pairs it wants.
+Subscriptions are reference-counted per pair, so a background refresher
+polls every distinct pair once per interval no matter how many sessions
+watch it; balance cache writes (including XRPL ledger-stream pushes) and
+price ticker refreshes are fanned out to subscribed sessions, and only
+values that actually changed are sent.
+"""
+import asyncio
+import json
+import logging
+import os
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from cache import BalanceCache
+from fanout import fan_out
+
+logger = logging.getLogger(__name__)
+
+STREAM_REFRESH_INTERVAL = float(os.environ.get("STREAM_REFRESH_INTERVAL", 15))
+STREAM_HEARTBEAT = float(os.environ.get("STREAM_HEARTBEAT", 15))
+STREAM_QUEUE_SIZE = int(os.environ.get("STREAM_QUEUE_SIZE", 256))
+STREAM_MAX_ADDRESSES = int(os.environ.get("STREAM_MAX_ADDRESSES", 64))
+
+Key = Tuple[str, str]
+
+
+class StreamSession:
+    """One connected client: its subscriptions and a bounded outbound queue"""
+
+    def __init__(self, keys: Set[Key], queue_size: int = STREAM_QUEUE_SIZE):
+        self.keys = keys
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def send(self, event: str, data: dict):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait((event, data))
+        except asyncio.QueueFull:
+            # A client this far behind reconnects and gets a fresh snapshot
+            self.overflowed = True
+            self.close()
+
+    def close(self):
+        """Drop anything queued and end the event stream"""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class StreamHub:
+    """Shares one backend subscription per (chain, address) across sessions"""
+
+    def __init__(self, fetch_balance: Callable[[str, str], Optional[Callable[[], Awaitable[dict]]]],
+                 prices: Callable[[], dict], refresh_interval: float = STREAM_REFRESH_INTERVAL,
+                 heartbeat: float = STREAM_HEARTBEAT, concurrency: int = 8, queue_size: int = STREAM_QUEUE_SIZE):
+        self.fetch_balance = fetch_balance
+        self.prices = prices
+        self.refresh_interval = refresh_interval
+        self.heartbeat = heartbeat
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.sessions: Set[StreamSession] = set()
+        self.subscribers: Dict[Key, Set[StreamSession]] = {}
+        self.balances: Dict[Key, dict] = {}  # last value pushed per tracked key
+        self.last_prices: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._refreshing: Set[asyncio.Task] = set()
+        self._stats = {"balance_events": 0, "price_events": 0, "refreshes": 0, "overflows": 0}
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for session in list(self.sessions):
+            session.close()
+
+    # ---- sessions ----
+
+    def connect(self, pairs: Iterable[Key]) -> StreamSession:
+        keys = {BalanceCache.key(chain, address) for chain, address in pairs}
+        session = StreamSession(keys, self.queue_size)
+        self.sessions.add(session)
+        new_keys = []
+        for key in keys:
+            if key not in self.subscribers:
+                self.subscribers[key] = set()
+                new_keys.append(key)
+            self.subscribers[key].add(session)
+
+        snapshot = self.prices()
+        session.send("prices", {"prices": snapshot["prices"], "changes": snapshot["changes"]})
+        for key in keys:
+            if key in self.balances:
+                session.send("balance", self.balances[key])
+        if new_keys:
+            task = asyncio.create_task(self._refresh(new_keys))
+            self._refreshing.add(task)
+            task.add_done_callback(self._refreshing.discard)
+        return session
+
+    def disconnect(self, session: StreamSession):
+        self.sessions.discard(session)
+        for key in session.keys:
+            subscribers = self.subscribers.get(key)
+            if subscribers is None:
+                continue
+            subscribers.discard(session)
+            if not subscribers:
+                del self.subscribers[key]
+                self.balances.pop(key, None)
+
+    async def events(self, pairs: Iterable[Key]) -> AsyncIterator[str]:
+        """SSE frames for a new session, with keep-alive comments while idle"""
+        # Subscribing on first iteration, inside the try, means a response closed before it starts
+        # streaming never leaves a subscription behind
+        session = self.connect(pairs)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    item = await asyncio.wait_for(session.queue.get(), timeout=self.heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    if session.overflowed:
+                        self._stats["overflows"] += 1
+                    return
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.disconnect(session)
+
+    # ---- publishing ----
+
+    def on_balance(self, chain: str, address: str, result: dict):
+        """Balance cache listener: push the value if it changed"""
+        key = BalanceCache.key(chain, address)
+        subscribers = self.subscribers.get(key)
+        if not subscribers or "error" in result:
+            return
+        previous = self.balances.get(key)
+        if previous is not None and previous.get("balance") == result.get("balance"):
+            return
+        event = {"chain": chain, "address": address, "balance": result.get("balance", 0), "symbol": result.get("symbol")}
+        self.balances[key] = event
+        self._stats["balance_events"] += 1
+        for session in list(subscribers):
+            session.send("balance", event)
+
+    def on_prices(self, prices: Dict[str, float], changes: Dict[str, float]):
+        """Price ticker listener: broadcast only the symbols whose price moved"""
+        moved = {symbol: price for symbol, price in prices.items() if self.last_prices.get(symbol) != price}
+        self.last_prices = dict(prices)
+        if not moved or not self.sessions:
+            return
+        event = {"prices": moved, "changes": {s: changes[s] for s in moved if s in changes}}
+        self._stats["price_events"] += 1
+        for session in list(self.sessions):
+            session.send("prices", event)
+
+    # ---- refresher ----
+
+    async def _refresh(self, keys: Iterable[Key]):
+        jobs = {}
+        for chain, address in keys:
+            job = self.fetch_balance(chain, address)
+            if job is not None:
+                jobs[f"{chain}:{address}"] = job
+        if not jobs:
+            return
+        self._stats["refreshes"] += 1
+        results, _, _ = await fan_out(jobs, concurrency=self.concurrency)
+        # Cache hits do not pass through the listener, so publish the results too
+        for result in results.values():
+            if isinstance(result, dict) and "chain" in result and "address" in result:
+                self.on_balance(result["chain"], result["address"], result)
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            if not self.subscribers:
+                continue
+            try:
+                await self._refresh(list(self.subscribers))
+            except Exception as e:
+                logger.error(f"Error refreshing streamed balances: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "sessions": len(self.sessions),
+            "tracked_addresses": len(self.subscribers),
+        }
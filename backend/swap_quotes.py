@@ -0,0 +1,187 @@
+"""
+Swap quotes to XRP.
+
+Supported trades form a graph of (chain, token) nodes joined by DEX and
+bridge hops, each with a fee in basis points. A quote walks the fewest-hop
+route (cheapest on ties) from the source token to XRP on the XRP Ledger.
+Routes depend only on the graph, so they are computed once per
+(from_chain, from_token); rates come from an in-memory Decimal copy of the
+price ticker snapshot, refreshed when the ticker updates. All amount
+arithmetic is Decimal and outputs are rounded down to the target's
+precision.
+"""
+from decimal import ROUND_DOWN, Decimal, InvalidOperation, localcontext
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from portfolio import STABLECOINS, price_key
+
+Node = Tuple[str, str]  # (chain, token symbol)
+
+XRP: Node = ("xrp", "xrp")
+XRP_PRECISION = Decimal("0.000001")  # one drop
+
+SWAP_DEFAULT_SLIPPAGE_BPS = 50
+# Larger amounts are not meaningful trades and would overflow the quote arithmetic
+SWAP_MAX_AMOUNT = Decimal("1e15")
+# Enough significant digits for SWAP_MAX_AMOUNT worth of the priciest token quantized to one drop
+QUOTE_PRECISION = 50
+BPS = Decimal(10_000)
+
+
+class QuoteError(ValueError):
+    """The quote request cannot be priced or routed"""
+
+
+class Hop(NamedTuple):
+    source: Node
+    target: Node
+    provider: str
+    fee_bps: int
+
+
+def _dex(chain: str, native: str, tokens: List[str], provider: str, fee_bps: int) -> List[Hop]:
+    return [Hop((chain, t), (chain, native), provider, fee_bps) for t in tokens]
+
+
+def _bridge(chain: str, tokens: List[str], provider: str, fee_bps: int) -> List[Hop]:
+    return [Hop((chain, t), ("xrp", t), provider, fee_bps) for t in tokens]
+
+
+# Pairs are tradable in both directions
+SWAP_PAIRS: List[Hop] = [
+    # On-chain DEX pools against each chain's native asset
+    *_dex("ethereum", "eth", ["usdt", "usdc", "wbtc"], "1inch", 30),
+    *_dex("arbitrum", "eth", ["usdt", "usdc"], "1inch", 30),
+    *_dex("optimism", "eth", ["usdc"], "1inch", 30),
+    *_dex("base", "eth", ["usdc"], "1inch", 30),
+    *_dex("bsc", "bnb", ["usdt", "usdc"], "1inch", 25),
+    *_dex("polygon", "matic", ["usdt", "usdc"], "1inch", 30),
+    *_dex("avalanche", "avax", ["usdt", "usdc"], "1inch", 30),
+    *_dex("solana", "sol", ["usdc", "usdt"], "Jupiter", 25),
+    *_dex("tron", "trx", ["usdt"], "SunSwap", 30),
+    # Bridges onto XRP Ledger issued assets
+    *_bridge("ethereum", ["eth", "usdc", "usdt"], "Axelar", 10),
+    *_bridge("arbitrum", ["usdc"], "Axelar", 10),
+    *_bridge("optimism", ["usdc"], "Axelar", 10),
+    *_bridge("base", ["usdc"], "Axelar", 10),
+    *_bridge("bsc", ["usdc"], "Axelar", 10),
+    *_bridge("polygon", ["usdc"], "Axelar", 10),
+    *_bridge("avalanche", ["usdc"], "Axelar", 10),
+    *_bridge("solana", ["usdc"], "Wormhole", 10),
+    *_bridge("tron", ["usdt"], "GateHub", 20),
+    *_bridge("bitcoin", ["btc"], "GateHub", 20),
+    # XRP Ledger order books
+    *_dex("xrp", "xrp", ["usdc", "usdt", "btc", "eth"], "XRP DEX", 20),
+]
+
+
+class SwapQuoter:
+    """Quotes swaps into XRP from memoized routes and a Decimal price snapshot"""
+
+    def __init__(self, prices: Dict[str, float], pairs: List[Hop] = SWAP_PAIRS, target: Node = XRP):
+        self.target = target
+        self.graph: Dict[Node, List[Hop]] = {}
+        for hop in pairs:
+            self.graph.setdefault(hop.source, []).append(hop)
+            self.graph.setdefault(hop.target, []).append(Hop(hop.target, hop.source, hop.provider, hop.fee_bps))
+        self.routes: Dict[Node, Optional[Tuple[Hop, ...]]] = {}
+        self.prices: Dict[str, Decimal] = {}
+        self.quotes = 0
+        self.set_prices(prices)
+
+    def set_prices(self, prices: Dict[str, float]):
+        self.prices = {symbol: Decimal(str(price)) for symbol, price in prices.items() if price}
+
+    def on_prices(self, prices: Dict[str, float], changes: Dict[str, float]):
+        self.set_prices(prices)
+
+    def route(self, chain: str, token: str) -> Optional[Tuple[Hop, ...]]:
+        """Fewest-hop route to the target, cheapest among equals; None when unreachable"""
+        start = (chain.lower(), token.lower())
+        if start not in self.routes:
+            self.routes[start] = self._search(start)
+        return self.routes[start]
+
+    def _search(self, start: Node) -> Optional[Tuple[Hop, ...]]:
+        if start == self.target:
+            return ()
+        if start not in self.graph:
+            return None
+        # Breadth-first by hop count, keeping the lowest cumulative fee per node within a level
+        reached: Dict[Node, Tuple[int, Optional[Hop]]] = {start: (0, None)}
+        frontier = [start]
+        while frontier and self.target not in reached:
+            level: Dict[Node, Tuple[int, Hop]] = {}
+            for node in frontier:
+                fee = reached[node][0]
+                for hop in self.graph[node]:
+                    if hop.target in reached:
+                        continue
+                    if hop.target not in level or fee + hop.fee_bps < level[hop.target][0]:
+                        level[hop.target] = (fee + hop.fee_bps, hop)
+            reached.update(level)
+            frontier = list(level)
+        if self.target not in reached:
+            return None
+        hops = []
+        node = self.target
+        while node != start:
+            hop = reached[node][1]
+            hops.append(hop)
+            node = hop.source
+        return tuple(reversed(hops))
+
+    def price(self, token: str) -> Decimal:
+        if token in STABLECOINS:
+            return Decimal(1)
+        price = self.prices.get(price_key(token))
+        if price is None:
+            raise QuoteError(f"No price for {token.upper()}")
+        return price
+
+    def quote(self, from_chain: str, from_token: str, amount: str,
+              slippage_bps: int = SWAP_DEFAULT_SLIPPAGE_BPS) -> Dict[str, Any]:
+        try:
+            from_amount = Decimal(amount)
+        except InvalidOperation:
+            raise QuoteError("Invalid amount")
+        if not from_amount.is_finite() or from_amount <= 0:
+            raise QuoteError("Amount must be positive")
+        if from_amount > SWAP_MAX_AMOUNT:
+            raise QuoteError("Amount too large")
+        if not 0 <= slippage_bps < BPS:
+            raise QuoteError("Invalid slippage")
+
+        route = self.route(from_chain, from_token)
+        if route is None:
+            raise QuoteError(f"No route from {from_token.upper()} on {from_chain} to XRP")
+
+        try:
+            with localcontext() as ctx:
+                ctx.prec = QUOTE_PRECISION
+                value = from_amount
+                for hop in route:
+                    value = value * self.price(hop.source[1]) / self.price(hop.target[1])
+                    value = value * (BPS - hop.fee_bps) / BPS
+                to_amount = value.quantize(XRP_PRECISION, rounding=ROUND_DOWN)
+                min_amount = (value * (BPS - slippage_bps) / BPS).quantize(XRP_PRECISION, rounding=ROUND_DOWN)
+                exchange_rate = (value / from_amount).quantize(XRP_PRECISION, rounding=ROUND_DOWN)
+        except InvalidOperation:
+            raise QuoteError("Amount cannot be quoted")
+        self.quotes += 1
+
+        return {
+            "to_amount": str(to_amount),
+            "min_to_amount": str(min_amount),
+            "exchange_rate": float(exchange_rate),
+            "fee_bps": sum(hop.fee_bps for hop in route),
+            "provider": " + ".join(dict.fromkeys(hop.provider for hop in route)) or "XRP DEX",
+            "route": [
+                {"from": f"{h.source[0]}:{h.source[1].upper()}", "to": f"{h.target[0]}:{h.target[1].upper()}",
+                 "provider": h.provider, "fee_bps": h.fee_bps}
+                for h in route
+            ],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {"quotes": self.quotes, "routes": len(self.routes), "pairs": len(self.graph), "prices": len(self.prices)}
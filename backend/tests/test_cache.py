@@ -0,0 +1,96 @@
+"""
+TTL/LRU cache, single-flight and balance cache tests with fake fetchers
+"""
+import asyncio
+
+from cache import BALANCE_CACHE_PUSH_TTL, BalanceCache, SingleFlight, TTLCache
+
+CHAINS = {"xrp": {"blockTime": 4}, "ethereum": {"blockTime": 12}}
+
+
+def untagged(result):
+    return {k: v for k, v in result.items() if k not in ("cached_at", "stale")}
+
+
+def test_pushed_balances_get_the_long_ttl():
+    cache = BalanceCache(CHAINS)
+    cache.pushed = lambda chain, address: chain == "xrp" and address == "rLive"
+    assert cache.ttl_for("xrp", "rLive") == BALANCE_CACHE_PUSH_TTL
+    assert cache.ttl_for("xrp", "rPolled") == cache.ttl_for("xrp") < BALANCE_CACHE_PUSH_TTL
+
+    cache.put("xrp", "rLive", {"balance": 1.0})
+    _, stored_at, expires_at = cache.entries.get_entry(cache.key("xrp", "rLive"))
+    assert round(expires_at - stored_at) == BALANCE_CACHE_PUSH_TTL
+
+
+def test_ttl_cache_expires_and_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+    cache.set("short", 4, ttl=-1)
+    assert cache.get("short") is None
+    # Expired entries stay readable for stale fallbacks
+    assert cache.get_entry("short")[0] == 4
+
+
+def test_single_flight_shares_one_call_and_survives_a_cancelled_waiter():
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def run():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("key", fetch))
+        second = asyncio.create_task(flight.do("key", fetch))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, flight
+
+    value, flight = asyncio.run(run())
+    assert value == "value" and len(calls) == 1
+    assert flight.coalesced == 1 and len(flight) == 0
+
+
+def test_balance_cache_serves_hits_and_falls_back_to_stale_on_errors():
+    replies = [{"chain": "ethereum", "balance": 1.5}, {"chain": "ethereum", "balance": 0, "error": "HTTP 503"}]
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return replies[len(calls) - 1]
+
+    async def run():
+        cache = BalanceCache(CHAINS)
+        first = await cache.get_or_fetch("ethereum", "0xABC", fetch)
+        hit = await cache.get_or_fetch("ethereum", "0xabc", fetch)
+        cache.entries.set(cache.key("ethereum", "0xabc"), untagged(first), ttl=-1)
+        stale = await cache.get_or_fetch("ethereum", "0xabc", fetch)
+        return first, hit, stale
+
+    first, hit, stale = asyncio.run(run())
+    assert first["stale"] is False and first["cached_at"] == hit["cached_at"]
+    assert len(calls) == 2
+    # The failed refresh serves the last good balance, not a zero
+    assert stale["balance"] == 1.5 and stale["stale"] is True
+
+
+def test_balance_cache_does_not_store_errors():
+    async def fetch():
+        return {"chain": "ethereum", "balance": 0, "error": "timeout"}
+
+    async def run():
+        cache = BalanceCache(CHAINS)
+        result = await cache.get_or_fetch("ethereum", "0xabc", fetch)
+        return cache, result
+
+    cache, result = asyncio.run(run())
+    assert result["error"] == "timeout" and result["cached_at"] is None
+    assert len(cache.entries) == 0
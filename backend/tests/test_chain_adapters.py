@@ -0,0 +1,80 @@
+"""
+Chain adapter error handling tests against canned upstream replies
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from chain_adapters import SolanaAdapter, TronAdapter, XrplAdapter
+from rpc_router import UpstreamError
+
+XRP = {"name": "XRP Ledger", "symbol": "XRP", "decimals": 6, "type": "xrpl", "rpc": "https://xrpl.test"}
+SOLANA = {"name": "Solana", "symbol": "SOL", "decimals": 9, "type": "solana", "rpc": "https://solana.test"}
+TRON = {"name": "Tron", "symbol": "TRX", "decimals": 6, "type": "tron", "rpc": "https://tron.test"}
+TRON_ADDRESS = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+
+
+class FakeUpstream:
+    """Answers every POST with the same JSON body"""
+
+    def __init__(self, body, status=200):
+        self.body = body
+        self.status = status
+
+    async def post(self, url, **kwargs):
+        return httpx.Response(self.status, json=self.body)
+
+
+class FakeMetadata:
+    def __init__(self, metadata=None):
+        self.metadata = metadata or {}
+
+    async def get_many(self, chain, tokens):
+        return {t: self.metadata[t] for t in tokens if t in self.metadata}
+
+    async def put_many(self, chain, found):
+        self.metadata.update(found)
+
+
+def fetch(adapter_cls, config, body):
+    adapter = adapter_cls(config["symbol"].lower(), config, FakeUpstream(body))
+    return asyncio.run(adapter._fetch("addr", config["rpc"]))
+
+
+def test_xrpl_missing_account_is_a_real_zero():
+    result = fetch(XrplAdapter, XRP, {"result": {"error": "actNotFound", "status": "error"}})
+    assert result["balance"] == 0 and "error" not in result
+
+
+def test_xrpl_node_errors_raise_for_failover():
+    with pytest.raises(UpstreamError):
+        fetch(XrplAdapter, XRP, {"result": {"error": "tooBusy", "status": "error"}})
+
+
+def test_xrpl_request_errors_are_reported():
+    result = fetch(XrplAdapter, XRP, {"result": {"error": "actMalformed", "error_message": "Account malformed.", "status": "error"}})
+    assert result["error"] == "Account malformed."
+
+
+def test_solana_error_replies_are_not_zero_balances():
+    with pytest.raises(UpstreamError):
+        fetch(SolanaAdapter, SOLANA, {"jsonrpc": "2.0", "id": 1, "error": {"code": -32005, "message": "Node is behind"}})
+    result = fetch(SolanaAdapter, SOLANA, {"jsonrpc": "2.0", "id": 1, "error": {"code": -32602, "message": "Invalid param"}})
+    assert "Invalid param" in result["error"]
+    assert fetch(SolanaAdapter, SOLANA, {"jsonrpc": "2.0", "id": 1, "result": {"value": 0}}) == {
+        "chain": "sol", "address": "addr", "balance": 0.0, "symbol": "SOL",
+    }
+
+
+def tron_tokens(status):
+    metadata = FakeMetadata({"TUSDT": {"decimals": 6, "symbol": "USDT"}})
+    body = {"error": "busy"} if status != 200 else {"result": {"result": True}, "constant_result": ["00" * 31 + "64"]}
+    adapter = TronAdapter("tron", TRON, FakeUpstream(body, status), token_metadata=metadata)
+    return asyncio.run(adapter.fetch_tokens(TRON_ADDRESS, ["TUSDT"]))
+
+
+def test_tron_token_failures_are_errors_not_empty_holdings():
+    assert tron_tokens(200)["tokens"][0]["balance"] == 0.0001
+    failed = tron_tokens(503)
+    assert failed["tokens"] == [] and "error" in failed
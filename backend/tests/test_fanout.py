@@ -0,0 +1,59 @@
+"""
+Fan-out timeout, deadline, concurrency and error partitioning tests with fake jobs
+"""
+import asyncio
+
+from fanout import fan_out
+
+
+def job(delay=0.0, result=None, error=None, log=None):
+    async def run():
+        if log is not None:
+            log.append(1)
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return result
+    return run
+
+
+def test_results_timeouts_and_errors_are_partitioned():
+    jobs = {
+        "fast": job(result=1),
+        "slow": job(delay=1, result=2),
+        "broken": job(error=ValueError("bad address")),
+    }
+    results, timed_out, errors = asyncio.run(fan_out(jobs, job_timeout=0.05, deadline=1))
+    assert results == {"fast": 1}
+    assert timed_out == ["slow"]
+    assert errors == {"broken": "bad address"}
+
+
+def test_deadline_cancels_jobs_that_queued_for_a_slot():
+    started = []
+    jobs = {f"job{i}": job(delay=0.1, result=i, log=started) for i in range(4)}
+    results, timed_out, errors = asyncio.run(fan_out(jobs, concurrency=2, job_timeout=1, deadline=0.15))
+    # The second pair only got a slot after the first finished and was cancelled at the deadline
+    assert results == {"job0": 0, "job1": 1}
+    assert len(started) == 4
+    assert sorted(timed_out) == ["job2", "job3"]
+    assert errors == {}
+
+
+def test_concurrency_is_bounded():
+    in_flight, peak = [0], [0]
+
+    def tracked():
+        async def run():
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+            await asyncio.sleep(0.01)
+            in_flight[0] -= 1
+        return run
+
+    results, _, _ = asyncio.run(fan_out({str(i): tracked() for i in range(10)}, concurrency=3))
+    assert len(results) == 10 and peak[0] == 3
+
+
+def test_no_jobs():
+    assert asyncio.run(fan_out({})) == ({}, [], {})
@@ -0,0 +1,84 @@
+"""
+Event-loop watchdog and sampling profiler tests
+"""
+import asyncio
+import time
+
+import pytest
+
+from loop_monitor import LoopMonitor
+
+
+def blocking_call(seconds):
+    started = time.monotonic()
+    while time.monotonic() - started < seconds:
+        pass
+
+
+def test_blocking_episode_records_stack():
+    monitor = LoopMonitor(threshold_ms=50, interval=0.01)
+
+    async def run():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        blocking_call(0.2)
+        await asyncio.sleep(0.1)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor.blocks == 1
+    event = monitor.events[0]
+    assert event["duration_ms"] >= 100
+    assert event["stack"][-1].startswith("blocking_call")
+
+
+def test_profile_returns_collapsed_stacks():
+    monitor = LoopMonitor()
+
+    async def run():
+        monitor.start()
+        profile = asyncio.get_running_loop().run_in_executor(None, monitor.profile, 0.3, 0.005)
+        await asyncio.sleep(0.05)
+        blocking_call(0.15)
+        collapsed = await profile
+        await monitor.stop()
+        return collapsed
+
+    collapsed = asyncio.run(run())
+    lines = collapsed.splitlines()
+    assert any("blocking_call" in line for line in lines)
+    stack, count = lines[0].rsplit(" ", 1)
+    assert ";" in stack and int(count) > 0
+
+
+def test_profile_needs_an_attached_loop():
+    monitor = LoopMonitor()
+    with pytest.raises(LookupError):
+        monitor.profile(0.01)
+
+    async def run():
+        # Attached without the heartbeat or watchdog, as when the monitor is disabled
+        monitor.attach()
+        profile = asyncio.get_running_loop().run_in_executor(None, monitor.profile, 0.2, 0.005)
+        await asyncio.sleep(0.02)
+        blocking_call(0.1)
+        return await profile
+
+    assert "blocking_call" in asyncio.run(run())
+
+
+def test_heartbeat_reports_lag_to_listeners():
+    monitor = LoopMonitor(interval=0.01)
+    lags = []
+    monitor.listeners.append(lags.append)
+
+    async def run():
+        monitor.start(watchdog=False)
+        await asyncio.sleep(0.05)
+        blocking_call(0.1)
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(run())
+    assert monitor._thread is None
+    assert max(lags) >= 0.08
@@ -0,0 +1,53 @@
+"""
+Metrics registry and route middleware tests
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import MongoCommandMetrics, Registry, RouteMetricsMiddleware
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("upstream_seconds", "Upstream latency", ("host",), buckets=(0.1, 1.0))
+    child = latency.labels("rpc.ankr.com")
+    for value in (0.05, 0.5, 5.0):
+        child.observe(value)
+
+    text = registry.render()
+    assert "# TYPE upstream_seconds histogram" in text
+    assert 'upstream_seconds_bucket{host="rpc.ankr.com",le="0.1"} 1' in text
+    assert 'upstream_seconds_bucket{host="rpc.ankr.com",le="1.0"} 2' in text
+    assert 'upstream_seconds_bucket{host="rpc.ankr.com",le="+Inf"} 3' in text
+    assert 'upstream_seconds_count{host="rpc.ankr.com"} 3' in text
+
+
+def test_mongo_events_are_folded_in_at_scrape():
+    registry = Registry()
+    listener = MongoCommandMetrics(registry)
+
+    class Event:
+        command_name = "find"
+        duration_micros = 2500
+
+    listener.succeeded(Event())
+    assert 'mongo_command_duration_seconds_count{command="find",outcome="success"} 1' in registry.render()
+
+
+def test_middleware_labels_by_route_template():
+    registry = Registry()
+    app = FastAPI()
+
+    @app.get("/wallets/{wallet_id}")
+    async def wallet(wallet_id: str):
+        return {"id": wallet_id}
+
+    app.add_middleware(RouteMetricsMiddleware, registry=registry)
+    client = TestClient(app)
+    client.get("/wallets/a")
+    client.get("/wallets/b")
+    client.get("/missing")
+
+    text = registry.render()
+    assert 'route="/wallets/{wallet_id}",status="200",le="+Inf"} 2' in text
+    assert 'route="unmatched",status="404"' in text
@@ -0,0 +1,56 @@
+"""
+Portfolio incremental valuation tests
+"""
+from portfolio import Portfolio
+
+
+def test_balances_and_prices_update_totals_incrementally():
+    portfolio = Portfolio()
+    portfolio.set_prices({"xrp": 2.0, "eth": 3000.0})
+    portfolio.set_balance("xrp", "native", "XRP", 10)
+    portfolio.set_balance("ethereum", "native", "ETH", 0.5)
+    portfolio.set_balance("ethereum", "0xa0b8", "USDC", 100)
+    snapshot = portfolio.snapshot()
+    assert snapshot["total_usd"] == 1620.0
+    assert snapshot["chains"]["ethereum"]["usd"] == 1600.0
+    assert snapshot["assets"]["USDC"] == {"balance": 100, "usd": 100.0}
+
+    # Only the XRP position is revalued on an XRP price move
+    revalued = portfolio.revalued
+    portfolio.set_prices({"xrp": 3.0, "eth": 3000.0})
+    assert portfolio.revalued == revalued + 1
+    assert portfolio.snapshot()["total_usd"] == 1630.0
+
+
+def test_removing_balances_returns_exactly_to_zero():
+    portfolio = Portfolio()
+    portfolio.set_prices({"xrp": 0.7})
+    portfolio.set_balance("xrp", "wallet-a", "XRP", 0.1)
+    portfolio.set_balance("xrp", "wallet-b", "XRP", 0.2)
+    portfolio.set_balance("xrp", "wallet-a", "XRP", 0)
+    portfolio.set_balance("xrp", "wallet-b", "XRP", 0)
+    assert portfolio.asset_totals["XRP"] == {"balance": 0.0, "usd": 0.0}
+    assert portfolio.total == 0.0
+    assert portfolio.snapshot()["assets"] == {}
+
+    portfolio.drop_missing("xrp", set())
+    assert portfolio.positions == {} and portfolio.asset_totals == {} and portfolio.chain_totals == {}
+    assert portfolio.snapshot() == {"total_usd": 0.0, "chains": {}, "assets": {}, "unpriced": []}
+
+
+def test_many_updates_do_not_accumulate_error():
+    portfolio = Portfolio()
+    portfolio.set_prices({"xrp": 0.1})
+    for i in range(1000):
+        portfolio.set_balance("xrp", "native", "XRP", i * 0.1)
+    portfolio.set_balance("xrp", "native", "XRP", 0.3)
+    assert portfolio.asset_totals["XRP"]["balance"] == 0.3
+    assert portfolio.total == 0.3 * 0.1
+
+
+def test_symbol_change_moves_the_position_between_assets():
+    portfolio = Portfolio()
+    portfolio.set_balance("polygon", "native", "MATIC", 5)
+    portfolio.set_balance("polygon", "native", "POL", 5)
+    assert set(portfolio.asset_totals) == {"POL"}
+    assert portfolio.snapshot()["unpriced"] == ["polygon:POL"]
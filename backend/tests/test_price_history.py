@@ -0,0 +1,50 @@
+"""
+Price history backfill tests with a fake CoinGecko
+"""
+import asyncio
+
+import httpx
+import pytest
+
+from price_history import DAY_MS, HOUR_MS, PriceHistoryStore, chunks
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+class FakeCoinGecko:
+    """Hourly points for any range, recording the ranges asked for"""
+
+    def __init__(self, fail_after=None):
+        self.ranges = []
+        self.fail_after = fail_after
+
+    async def get(self, url, params=None, **kwargs):
+        start, end = params["from"] * 1000, params["to"] * 1000
+        if self.fail_after is not None and len(self.ranges) >= self.fail_after:
+            return httpx.Response(429, json={})
+        self.ranges.append((start, end))
+        return httpx.Response(200, json={"prices": [[t, 2.0] for t in range(start - start % HOUR_MS, end, HOUR_MS)]})
+
+
+def test_chunks_cover_the_range():
+    assert chunks(0, 10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert chunks(0, 10, 4, newest_first=True) == [(6, 10), (2, 6), (0, 2)]
+
+
+def test_long_backfill_is_fetched_in_hourly_chunks():
+    upstream = FakeCoinGecko()
+    store = PriceHistoryStore(mongomock_motor.AsyncMongoMockClient()["test"], upstream, "https://gecko.test")
+    candles = asyncio.run(store.get_candles("ripple", 365))
+    assert len(upstream.ranges) == 5
+    assert all(end - start <= 90 * DAY_MS for start, end in upstream.ranges)
+    # Hourly points for the whole year, not one a day
+    assert len(candles) > 300 * 24
+
+
+def test_failed_chunk_leaves_no_coverage_gap():
+    db = mongomock_motor.AsyncMongoMockClient()["test"]
+    store = PriceHistoryStore(db, FakeCoinGecko(fail_after=2), "https://gecko.test")
+    asyncio.run(store.get_candles("ripple", 365))
+    meta = asyncio.run(db.price_history_meta.find_one({"coin_id": "ripple"}))
+    # Newest two chunks stored; coverage stops where fetching failed
+    assert meta["to"] - meta["from"] == 180 * DAY_MS
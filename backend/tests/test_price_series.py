@@ -0,0 +1,60 @@
+"""
+Price series encoder tests: rows, columns and the binary frame against its headers
+"""
+import json
+
+import numpy as np
+
+import price_series
+
+CANDLES = [
+    (1_700_000_000_000 + i * 3_600_000, 0, 0, 0, price)
+    for i, price in enumerate([2.0, 2.5, 2.25, 3.0, 2.4])
+]
+
+
+def decode(body: bytes, headers: dict):
+    """Read a binary frame using only what the headers say about it"""
+    assert headers["X-Series-Layout"] == "float64le;timestamps[n];prices[n]"
+    n = int(headers["X-Series-Length"])
+    values = np.frombuffer(body, dtype="<f8")
+    assert values.size == 2 * n
+    return values[:n].astype(np.int64), values[n:]
+
+
+def test_binary_frame_round_trips_through_its_headers():
+    series = price_series.from_candles(CANDLES)
+    headers = price_series.binary_headers(series, "store", stats=True)
+    timestamps, prices = decode(price_series.to_binary(series), headers)
+    assert timestamps.tolist() == [c[0] for c in CANDLES]
+    assert prices.tolist() == [c[4] for c in CANDLES]
+    assert headers["X-Series-Source"] == "store"
+
+    stats = json.loads(headers["X-Series-Stats"])
+    assert stats["min"] == 2.0 and stats["max"] == 3.0 and stats["first"] == 2.0 and stats["last"] == 2.4
+    assert abs(stats["change_pct"] - 20.0) < 1e-9
+
+
+def test_empty_series_encodes_to_an_empty_frame():
+    series = price_series.from_candles([])
+    headers = price_series.binary_headers(series, "mock")
+    assert price_series.to_binary(series) == b""
+    assert headers["X-Series-Length"] == "0" and "X-Series-Stats" not in headers
+    assert price_series.series_stats(series[1]) == {}
+
+
+def test_rows_and_columns_agree():
+    series = price_series.from_candles(CANDLES)
+    rows = price_series.to_rows(series)
+    columns = price_series.to_columns(series)
+    assert [r["timestamp"] for r in rows] == columns["timestamps"]
+    assert [r["price"] for r in rows] == columns["prices"] == [c[4] for c in CANDLES]
+    assert all(isinstance(t, int) for t in columns["timestamps"])
+
+
+def test_thin_keeps_at_most_max_points():
+    series = price_series.mock_series(2.0, 30, np.random.default_rng(1))
+    thinned = price_series.thin(series, 100)
+    assert 0 < thinned[0].size <= 100
+    assert thinned[0][0] == series[0][0]
+    assert price_series.thin(series, 0) is series
@@ -0,0 +1,78 @@
+"""
+Price ticker refresh, rate-limit backoff and Retry-After parsing tests
+"""
+import asyncio
+import time
+from email.utils import formatdate
+
+from price_ticker import PriceTicker, RateLimited, parse_retry_after
+
+
+def test_retry_after_accepts_seconds_and_http_dates():
+    assert parse_retry_after("120") == 120.0
+    assert 55 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    # A date in the past, junk or a missing header fall back to the ticker's own backoff
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("inf") is None
+    assert parse_retry_after(None) is None
+
+
+class FlakySource:
+    """Raises the queued errors in order, then answers with prices"""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.calls = []
+
+    async def fetch(self):
+        self.calls.append(time.monotonic())
+        if self.errors:
+            raise self.errors.pop(0)
+        return {"xrp": 2.5}, {"xrp": 1.0}
+
+
+async def run_ticker(source, until, **kwargs):
+    ticker = PriceTicker(source.fetch, {"xrp": 2.0}, **kwargs)
+    pushed = []
+    ticker.listeners.append(lambda prices, changes: pushed.append(prices["xrp"]))
+    ticker.start()
+    for _ in range(200):
+        if until(ticker):
+            break
+        await asyncio.sleep(0.01)
+    await ticker.stop()
+    return ticker, pushed
+
+
+def test_rate_limits_back_off_and_recover():
+    async def run():
+        source = FlakySource(RateLimited(), RateLimited())
+        ticker, pushed = await run_ticker(source, lambda t: t.source == "coingecko", interval=0.01)
+        assert ticker.rate_limited == 2 and ticker.failures == 0
+        assert pushed == [2.5] and ticker.prices["xrp"] == 2.5
+        # Exponential: the second wait is drawn from a window twice as large as the first
+        first, second = source.calls[1] - source.calls[0], source.calls[2] - source.calls[1]
+        assert first >= 0.01 and second >= 0.02
+
+    asyncio.run(run())
+
+
+def test_retry_after_is_honoured():
+    async def run():
+        source = FlakySource(RateLimited(parse_retry_after("0.2")))
+        ticker, _ = await run_ticker(source, lambda t: t.source == "coingecko", interval=0.01)
+        assert ticker.rate_limited == 1
+        assert source.calls[1] - source.calls[0] >= 0.2
+
+    asyncio.run(run())
+
+
+def test_other_errors_are_counted_and_retried():
+    async def run():
+        source = FlakySource(ValueError("HTTP 500"))
+        ticker, _ = await run_ticker(source, lambda t: t.source == "coingecko", interval=0.01)
+        assert ticker.failures == 1 and ticker.rate_limited == 0
+        assert ticker.snapshot()["stale"] is False
+
+    asyncio.run(run())
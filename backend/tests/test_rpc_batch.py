@@ -0,0 +1,74 @@
+"""
+JSON-RPC batching tests: coalescing, id mapping and the unbatched fallback
+"""
+import asyncio
+
+import httpx
+
+from rpc_batch import RpcBatcher
+
+URL = "https://rpc.test"
+
+
+class FakeNode:
+    """Echoes each call's params back as its result; `reply` overrides answers to batch arrays"""
+
+    def __init__(self, reply=None):
+        self.reply = reply
+        self.posts = []
+
+    async def post(self, url, json=None, **kwargs):
+        self.posts.append(json)
+        if isinstance(json, list):
+            if self.reply is not None:
+                return httpx.Response(200, json=self.reply)
+            # Out of order, as nodes are allowed to answer
+            return httpx.Response(200, json=[{"jsonrpc": "2.0", "id": c["id"], "result": c["params"]} for c in reversed(json)])
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": json["id"], "result": json["params"]})
+
+
+def run_calls(batcher, count):
+    async def run():
+        return await asyncio.gather(*(batcher.call(URL, "eth_getBalance", [i]) for i in range(count)))
+    return asyncio.run(run())
+
+
+def test_concurrent_calls_share_one_batch_and_get_their_own_result():
+    node = FakeNode()
+    batcher = RpcBatcher(node)
+    results = run_calls(batcher, 5)
+    assert [r["result"] for r in results] == [[i] for i in range(5)]
+    assert len(node.posts) == 1 and len(node.posts[0]) == 5
+    assert batcher.stats()["calls_per_batch"] == 5
+
+
+def test_batches_split_at_max_size():
+    node = FakeNode()
+    run_calls(RpcBatcher(node, max_size=2), 5)
+    assert [len(p) if isinstance(p, list) else 1 for p in node.posts] == [2, 2, 1]
+
+
+def test_batch_rejection_falls_back_to_single_calls_for_a_while():
+    node = FakeNode(reply={"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch not supported"}})
+    batcher = RpcBatcher(node, unbatched_ttl=0.1)
+    results = run_calls(batcher, 3)
+    assert [r["result"] for r in results] == [[0], [1], [2]]
+    assert batcher.stats()["unbatched_endpoints"] == 1
+
+    node.posts.clear()
+    run_calls(batcher, 3)
+    assert all(isinstance(p, dict) for p in node.posts)
+
+    asyncio.run(asyncio.sleep(0.15))
+    node.posts.clear()
+    run_calls(batcher, 3)
+    assert isinstance(node.posts[0], list)
+
+
+def test_rate_limit_reply_is_an_error_for_each_call_not_a_rejection():
+    node = FakeNode(reply={"jsonrpc": "2.0", "id": None, "error": {"code": -32005, "message": "rate limited"}})
+    batcher = RpcBatcher(node)
+    results = run_calls(batcher, 3)
+    assert [r["id"] for r in results] == [p["id"] for p in node.posts[0]]
+    assert all(r["error"]["code"] == -32005 for r in results)
+    assert batcher.stats()["unbatched_endpoints"] == 0
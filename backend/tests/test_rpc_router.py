@@ -0,0 +1,106 @@
+"""
+RPC router failover, hedging and circuit breaker tests with fake endpoints
+"""
+import asyncio
+
+import pytest
+
+from rpc_router import RPC_BREAKER_THRESHOLD, RpcRouter, UpstreamError
+
+CHAINS = {
+    "ethereum": {"rpc": "https://primary.test", "rpcFallbacks": ["https://fallback.test"]},
+    "cronos": {"rpc": "https://single.test"},
+}
+
+
+def fake(behaviour):
+    """fn(url) that sleeps and/or raises per URL, recording the URLs called"""
+    calls = []
+
+    async def fn(url):
+        calls.append(url)
+        delay, error = behaviour.get(url, (0, None))
+        await asyncio.sleep(delay)
+        if error:
+            raise error
+        return url
+
+    return fn, calls
+
+
+def prime(router, chain, latency=0.01):
+    """Give the chain's endpoints a latency history, primary fastest"""
+    for i, endpoint in enumerate(router.endpoints[chain]):
+        for _ in range(10):
+            endpoint.record_success(latency * (i + 1))
+
+
+def test_fails_over_to_the_next_endpoint():
+    router = RpcRouter(CHAINS)
+    prime(router, "ethereum")
+    fn, calls = fake({"https://primary.test": (0, UpstreamError("HTTP 503"))})
+    assert asyncio.run(router.call("ethereum", fn)) == "https://fallback.test"
+    assert calls == ["https://primary.test", "https://fallback.test"]
+    assert router.stats()["failovers"] == 1
+    assert router.endpoints["ethereum"][0].failures == 1
+
+
+def test_slow_primary_is_hedged():
+    router = RpcRouter(CHAINS)
+    prime(router, "ethereum")
+    fn, calls = fake({"https://primary.test": (0.5, None)})
+    assert asyncio.run(router.call("ethereum", fn)) == "https://fallback.test"
+    stats = router.stats()
+    assert stats["hedges"] == 1 and stats["hedge_wins"] == 1
+    # The losing primary was cancelled, not counted as a failure
+    assert router.endpoints["ethereum"][0].failures == 0
+
+
+def test_all_endpoints_failing_raises_the_last_error():
+    router = RpcRouter(CHAINS)
+    fn, _ = fake({url: (0, UpstreamError(url)) for url in ("https://primary.test", "https://fallback.test")})
+    with pytest.raises(UpstreamError):
+        asyncio.run(router.call("ethereum", fn))
+
+
+def test_circuit_opens_after_consecutive_failures_and_closes_on_success():
+    router = RpcRouter(CHAINS)
+    prime(router, "ethereum")
+    primary = router.endpoints["ethereum"][0]
+    for _ in range(RPC_BREAKER_THRESHOLD):
+        primary.record_failure()
+    assert primary.state == "open"
+    assert router.ranked("ethereum")[-1] is primary
+    primary.record_success(0.01)
+    assert primary.state == "closed"
+
+
+def test_hung_attempt_times_out_and_counts_as_a_failure():
+    router = RpcRouter(CHAINS, attempt_timeout=0.05)
+    fn, _ = fake({"https://single.test": (10, None)})
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(router.call("cronos", fn))
+    assert router.endpoints["cronos"][0].failures == 1
+
+
+def test_probes_cover_single_endpoint_chains():
+    router = RpcRouter(CHAINS)
+    probed = []
+
+    async def probe(chain, url):
+        probed.append(url)
+
+    asyncio.run(router.probe_all(probe))
+    assert sorted(probed) == ["https://fallback.test", "https://primary.test", "https://single.test"]
+
+
+def test_request_errors_do_not_fail_over_or_open_circuits():
+    router = RpcRouter(CHAINS)
+    prime(router, "ethereum")
+    fn, calls = fake({"https://primary.test": (0, ValueError("Account malformed."))})
+    for _ in range(RPC_BREAKER_THRESHOLD):
+        with pytest.raises(ValueError):
+            asyncio.run(router.call("ethereum", fn))
+    assert calls == ["https://primary.test"] * RPC_BREAKER_THRESHOLD
+    assert [e.state for e in router.endpoints["ethereum"]] == ["closed", "closed"]
+    assert router.endpoints["ethereum"][0].failures == 0 and router.stats()["failovers"] == 0
@@ -0,0 +1,42 @@
+"""
+Snapshot scheduler lease tests: one replica takes snapshots at a time
+"""
+import asyncio
+
+import pytest
+
+from snapshots import SnapshotScheduler
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+
+def test_only_one_replica_holds_the_lease():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        first = SnapshotScheduler(db, None, lease_ttl=0.2)
+        second = SnapshotScheduler(db, None, lease_ttl=0.2)
+        assert await first.acquire_lease()
+        assert not await second.acquire_lease()
+        assert await first.acquire_lease()
+
+        # An expired lease passes to the next replica that asks
+        await asyncio.sleep(0.3)
+        assert await second.acquire_lease()
+        assert not await first.acquire_lease()
+
+        # Stopping releases it immediately
+        await second.stop()
+        assert await first.acquire_lease()
+
+    asyncio.run(run())
+
+
+def test_regaining_the_lease_drops_local_state():
+    async def run():
+        db = mongomock_motor.AsyncMongoMockClient()["test"]
+        scheduler = SnapshotScheduler(db, None)
+        scheduler.state["wallet"] = (0, {})
+        await scheduler.acquire_lease()
+        return scheduler.state
+
+    assert asyncio.run(run()) == {}
@@ -0,0 +1,122 @@
+"""
+Stream hub tests with a fake balance fetcher and price ticker
+"""
+import asyncio
+import json
+
+from stream_hub import StreamHub
+
+ACCOUNT = "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+PAIR = ("xrp", ACCOUNT)
+
+
+class FakeBackend:
+    """Balance jobs that answer from a dict and count fetches, plus a fixed price snapshot"""
+
+    def __init__(self):
+        self.balances = {ACCOUNT: 25.0}
+        self.fetches = []
+
+    def fetch_balance(self, chain, address):
+        async def job():
+            self.fetches.append((chain, address))
+            return {"chain": chain, "address": address, "balance": self.balances[address], "symbol": "XRP"}
+        return job
+
+    def prices(self):
+        return {"prices": {"xrp": 2.0}, "changes": {"xrp": 1.5}}
+
+
+def drain(session):
+    items = []
+    while not session.queue.empty():
+        items.append(session.queue.get_nowait())
+    return items
+
+
+def parse(frame):
+    lines = dict(line.split(": ", 1) for line in frame.strip().split("\n"))
+    return lines["event"], json.loads(lines["data"])
+
+
+def test_subscriptions_are_reference_counted():
+    async def run():
+        backend = FakeBackend()
+        hub = StreamHub(backend.fetch_balance, backend.prices)
+        first = hub.connect([PAIR])
+        second = hub.connect([PAIR])
+        await asyncio.gather(*hub._refreshing)
+        # One backend fetch for the pair however many sessions watch it
+        assert backend.fetches == [PAIR]
+        assert hub.subscribers[PAIR] == {first, second}
+        assert hub.stats()["tracked_addresses"] == 1
+
+        hub.disconnect(first)
+        assert hub.subscribers[PAIR] == {second} and PAIR in hub.balances
+        hub.disconnect(second)
+        assert hub.subscribers == {} and hub.balances == {} and hub.sessions == set()
+
+    asyncio.run(run())
+
+
+def test_only_changes_are_pushed():
+    async def run():
+        backend = FakeBackend()
+        hub = StreamHub(backend.fetch_balance, backend.prices)
+        session = hub.connect([PAIR])
+        await asyncio.gather(*hub._refreshing)
+        assert [event for event, _ in drain(session)] == ["prices", "balance"]
+
+        hub.on_balance("xrp", ACCOUNT, {"balance": 25.0, "symbol": "XRP"})
+        hub.on_balance("xrp", ACCOUNT, {"error": "timeout"})
+        hub.on_balance("xrp", "rSomeoneElse", {"balance": 1.0})
+        assert drain(session) == []
+        hub.on_balance("xrp", ACCOUNT, {"balance": 30.0, "symbol": "XRP"})
+        assert drain(session) == [("balance", {"chain": "xrp", "address": ACCOUNT, "balance": 30.0, "symbol": "XRP"})]
+
+        hub.on_prices({"xrp": 2.0, "eth": 3000.0}, {"xrp": 1.5})
+        hub.on_prices({"xrp": 2.0, "eth": 3000.0}, {"xrp": 1.5})
+        hub.on_prices({"xrp": 2.1, "eth": 3000.0}, {"xrp": 6.5})
+        assert drain(session) == [
+            ("prices", {"prices": {"xrp": 2.0, "eth": 3000.0}, "changes": {"xrp": 1.5}}),
+            ("prices", {"prices": {"xrp": 2.1}, "changes": {"xrp": 6.5}}),
+        ]
+
+    asyncio.run(run())
+
+
+def test_overflowing_session_is_closed():
+    async def run():
+        backend = FakeBackend()
+        hub = StreamHub(backend.fetch_balance, backend.prices, queue_size=4)
+        events = hub.events([PAIR])
+        assert await events.__anext__() == "retry: 3000\n\n"
+        assert parse(await events.__anext__())[0] == "prices"
+        await asyncio.gather(*hub._refreshing)
+        for balance in range(10):
+            hub.on_balance("xrp", ACCOUNT, {"balance": float(balance)})
+        # The backlog is dropped and the stream ends so the client reconnects for a fresh snapshot
+        frames = [frame async for frame in events]
+        assert frames == []
+        assert hub.stats()["overflows"] == 1
+        assert hub.sessions == set() and hub.subscribers == {}
+
+    asyncio.run(run())
+
+
+def test_stream_closed_before_it_starts_leaves_no_subscription():
+    async def run():
+        backend = FakeBackend()
+        hub = StreamHub(backend.fetch_balance, backend.prices)
+        events = hub.events([PAIR])
+        await events.aclose()
+        assert hub.sessions == set() and hub.subscribers == {}
+
+        events = hub.events([PAIR])
+        await events.__anext__()
+        assert hub.stats()["sessions"] == 1
+        await events.aclose()
+        await asyncio.gather(*hub._refreshing)
+        assert hub.sessions == set() and hub.subscribers == {} and hub.balances == {}
+
+    asyncio.run(run())
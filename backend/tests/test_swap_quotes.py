@@ -0,0 +1,49 @@
+"""
+Swap routing and quote arithmetic tests
+"""
+from decimal import Decimal
+
+import pytest
+
+from swap_quotes import QuoteError, SwapQuoter
+
+PRICES = {"xrp": 0.5, "eth": 3000.0, "btc": 60000.0, "sol": 150.0, "bnb": 600.0, "trx": 0.1}
+
+
+def test_route_prefers_fewest_hops_then_lowest_fee():
+    quoter = SwapQuoter(PRICES)
+    route = quoter.route("ethereum", "ETH")
+    # Bridge ETH to the XRP Ledger, then sell on the order book
+    assert [(h.source, h.target, h.provider) for h in route] == [
+        (("ethereum", "eth"), ("xrp", "eth"), "Axelar"),
+        (("xrp", "eth"), ("xrp", "xrp"), "XRP DEX"),
+    ]
+    assert quoter.route("xrp", "xrp") == ()
+    assert quoter.route("dogecoin", "doge") is None
+    assert quoter.route("ethereum", "eth") is route
+
+
+def test_quote_applies_rates_and_fees():
+    quote = SwapQuoter(PRICES).quote("ethereum", "eth", "1", slippage_bps=100)
+    # 1 ETH = 6000 XRP, less 10 + 20 bps
+    expected = Decimal(6000) * Decimal("0.999") * Decimal("0.998")
+    assert Decimal(quote["to_amount"]) == expected.quantize(Decimal("0.000001"))
+    assert Decimal(quote["min_to_amount"]) < Decimal(quote["to_amount"])
+    assert quote["fee_bps"] == 30
+    assert quote["provider"] == "Axelar + XRP DEX"
+
+
+@pytest.mark.parametrize("amount", ["abc", "0", "-1", "NaN", "Infinity", "1e30"])
+def test_invalid_amounts_raise_quote_error(amount):
+    with pytest.raises(QuoteError):
+        SwapQuoter(PRICES).quote("ethereum", "eth", amount)
+
+
+def test_largest_amount_is_quoted():
+    quote = SwapQuoter(PRICES).quote("bitcoin", "btc", "1e15")
+    assert Decimal(quote["to_amount"]) > 0
+
+
+def test_missing_price_raises_quote_error():
+    with pytest.raises(QuoteError):
+        SwapQuoter({"xrp": 0.5}).quote("solana", "sol", "1")
@@ -0,0 +1,63 @@
+"""
+Tracing span nesting and slow-request capture tests
+"""
+import asyncio
+import json
+import time
+
+from tracing import Tracer, _current, span
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, line: str):
+        self.traces.append(json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"])
+
+
+def test_child_spans_nest_across_tasks():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=1.0)
+
+    async def lookup(chain):
+        with span(f"balance {chain}", chain=chain):
+            with span("GET rpc", "client"):
+                await asyncio.sleep(0)
+
+    async def run():
+        root = tracer.start_trace("POST /api/balances/multi")
+        token = _current.set(root)
+        try:
+            await asyncio.gather(lookup("ethereum"), lookup("xrp"))
+        finally:
+            _current.reset(token)
+        tracer.finish_trace(root)
+
+    asyncio.run(run())
+    spans = {s["name"]: s for s in exporter.traces[0]}
+    root = spans["POST /api/balances/multi"]
+    assert spans["balance ethereum"]["parentSpanId"] == root["spanId"]
+    assert spans["balance xrp"]["parentSpanId"] == root["spanId"]
+    assert {s["traceId"] for s in exporter.traces[0]} == {root["traceId"]}
+    assert len(exporter.traces[0]) == 5
+
+
+def test_slow_mode_exports_only_slow_requests():
+    exporter = ListExporter()
+    tracer = Tracer(exporter, sample_rate=0.0, slow_ms=20)
+
+    fast = tracer.start_trace("GET /api/prices")
+    tracer.finish_trace(fast)
+    slow = tracer.start_trace("GET /api/wallets")
+    time.sleep(0.03)
+    tracer.finish_trace(slow)
+
+    assert [t[0]["name"] for t in exporter.traces] == ["GET /api/wallets"]
+    assert tracer.stats()["discarded"] == 1
+
+
+def test_spans_are_noops_without_a_trace():
+    with span("orphan") as s:
+        assert s is None
+    assert Tracer(None).start_trace("GET /api/health") is None
@@ -4,6 +4,7 @@ Tests: Authentication, Wallet, Blockchain, and Price endpoints
 """
 import pytest
 import requests
+import json
 import os
 import uuid
 
@@ -20,6 +21,15 @@ class TestHealthAndRoot:
         assert data.get("status") == "healthy"
         print(f"PASS: Health endpoint - status: {data.get('status')}")
     
+    def test_ready_endpoint(self):
+        """Test /api/ready reports startup phases once warm"""
+        response = requests.get(f"{BASE_URL}/api/ready")
+        assert response.status_code == 200
+        data = response.json()
+        assert data.get("ready") is True
+        assert [p["name"] for p in data["phases"]][:2] == ["imports", "app"]
+        print(f"PASS: Ready endpoint - ready in {data.get('ready_ms')}ms")
+    
     def test_root_endpoint(self):
         """Test /api/ root endpoint"""
         response = requests.get(f"{BASE_URL}/api/")
@@ -28,6 +38,14 @@ class TestHealthAndRoot:
         assert "message" in data
         print(f"PASS: Root endpoint - message: {data.get('message')}")
 
+    def test_stats_endpoint(self):
+        """Test /api/stats exposes upstream pool stats"""
+        response = requests.get(f"{BASE_URL}/api/stats")
+        assert response.status_code == 200
+        data = response.json()
+        assert "hosts" in data["upstream"]
+        print(f"PASS: Stats endpoint - hosts: {len(data['upstream']['hosts'])}")
+
 
 class TestAuthentication:
     """Authentication endpoint tests - Register, Login, Profile"""
@@ -185,6 +203,24 @@ class TestWallet:
         assert len(data) >= 1
         print(f"PASS: Get wallets - count: {len(data)}")
     
+    def test_get_wallets_paginated(self, auth_token):
+        """Test keyset pagination over wallets with X-Next-Cursor"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        for i in range(3):
+            requests.post(f"{BASE_URL}/api/wallets", headers=headers, json={"name": f"Paged Wallet {i}"})
+        
+        first = requests.get(f"{BASE_URL}/api/wallets?limit=2", headers=headers)
+        assert first.status_code == 200
+        assert len(first.json()) == 2
+        cursor = first.headers.get("X-Next-Cursor")
+        assert cursor
+        
+        second = requests.get(f"{BASE_URL}/api/wallets?limit=2&cursor={cursor}", headers=headers)
+        assert second.status_code == 200
+        first_ids = {w["id"] for w in first.json()}
+        assert all(w["id"] not in first_ids for w in second.json())
+        print(f"PASS: Paginated wallets - second page: {len(second.json())}")
+    
     def test_delete_wallet(self, auth_token):
         """Test wallet deletion"""
         # Create wallet
@@ -217,6 +253,23 @@ class TestWallet:
         data = response.json()
         assert data["is_imported"] == True
         print(f"PASS: Wallet imported - id: {data['id']}")
+    
+    def test_bulk_create_wallets(self, auth_token):
+        """Test bulk wallet create/import with addresses"""
+        response = requests.post(
+            f"{BASE_URL}/api/wallets/bulk",
+            headers={"Authorization": f"Bearer {auth_token}"},
+            json={"wallets": [
+                {"name": "Bulk Wallet", "mnemonic": "encrypted", "addresses": {"xrp": "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"}},
+                {"name": "Bulk Import", "mnemonic": "encrypted", "is_imported": True},
+            ]}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["created"] == 2
+        assert data["results"][0]["wallet"]["addresses"]["xrp"] == "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+        assert data["results"][1]["wallet"]["is_imported"] == True
+        print(f"PASS: Bulk wallets created - count: {data['created']}")
 
 
 class TestBlockchain:
@@ -264,6 +317,16 @@ class TestBlockchain:
         assert data["symbol"] == "XRP"
         print(f"PASS: XRP balance fetch - balance: {data['balance']}")
     
+    def test_balance_cached_on_repeat(self):
+        """Test repeated balance lookups are served from the balance cache"""
+        test_address = "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+        first = requests.post(f"{BASE_URL}/api/balance/xrp?address={test_address}").json()
+        second = requests.post(f"{BASE_URL}/api/balance/xrp?address={test_address}").json()
+        assert first["cached_at"] is not None, first.get("error")
+        assert second["cached_at"] == first["cached_at"]
+        assert second["stale"] is False
+        print(f"PASS: Cached XRP balance - cached_at: {second['cached_at']}")
+    
     def test_solana_balance(self):
         """Test Solana balance endpoint"""
         # Use a test Solana address
@@ -303,7 +366,65 @@ class TestBlockchain:
         assert response.status_code == 200
         data = response.json()
         assert "balances" in data
+        assert isinstance(data["timed_out"], list)
         print(f"PASS: Multi-chain balance fetch - chains: {list(data['balances'].keys())}")
+    
+    def test_stream_initial_snapshot(self):
+        """Test SSE stream sends a price snapshot and the requested balance on connect"""
+        address = "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+        response = requests.get(
+            f"{BASE_URL}/api/stream",
+            params={"addresses": f"xrp:{address}"},
+            stream=True,
+            timeout=10
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events, event = [], None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: ") and event:
+                events.append((event, json.loads(line[len("data: "):])))
+                event = None
+            if "balance" in [name for name, _ in events]:
+                break
+        response.close()
+        assert events[0][0] == "prices"
+        assert "xrp" in events[0][1]["prices"]
+        balances = [data for name, data in events if name == "balance"]
+        assert balances and balances[0]["chain"] == "xrp" and balances[0]["address"] == address
+        print(f"PASS: Stream snapshot - events: {[name for name, _ in events]}")
+    
+    def test_token_balances(self):
+        """Test token balance endpoint"""
+        response = requests.post(
+            f"{BASE_URL}/api/balances/tokens",
+            json={"addresses": {"ethereum": "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045"}}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert isinstance(data["balances"]["ethereum"]["tokens"], list)
+        print(f"PASS: Token balances - {len(data['balances']['ethereum']['tokens'])} ethereum tokens")
+    
+    def test_admin_rpc_endpoints_requires_token(self):
+        """Test RPC endpoint scores are not public"""
+        response = requests.get(f"{BASE_URL}/api/admin/rpc-endpoints")
+        assert response.status_code in (403, 404)
+        print("PASS: Admin RPC endpoints protected")
+    
+    def test_admin_profile_requires_token(self):
+        """Test the profiler and loop-block history are not public"""
+        for path in ("/api/admin/profile?seconds=1", "/api/admin/loop-blocks"):
+            response = requests.get(f"{BASE_URL}{path}")
+            assert response.status_code in (403, 404)
+        print("PASS: Admin profiler protected")
+    
+    def test_stream_unsupported_chain(self):
+        """Test SSE stream rejects unknown chains"""
+        response = requests.get(f"{BASE_URL}/api/stream", params={"addresses": "dogecoin:D123"})
+        assert response.status_code == 400
+        print("PASS: Stream rejects unsupported chain")
 
 
 class TestPrices:
@@ -320,6 +441,8 @@ class TestPrices:
         assert "xrp" in prices
         assert "eth" in prices
         assert "btc" in prices
+        assert data["source"] in ["coingecko", "fallback"]
+        assert "age" in data
         print(f"PASS: Prices fetched - XRP: ${prices['xrp']}")
     
     def test_price_history(self):
@@ -330,6 +453,73 @@ class TestPrices:
         assert "prices" in data
         assert len(data["prices"]) > 0
         print(f"PASS: Price history fetched - points: {len(data['prices'])}")
+    
+    def test_price_history_downsampled(self):
+        """Test long price history windows are downsampled server-side"""
+        response = requests.get(f"{BASE_URL}/api/prices/history/xrp?days=365&points=200")
+        assert response.status_code == 200
+        data = response.json()
+        assert data["source"] in ("store", "mock")
+        assert 0 < len(data["prices"]) <= 200
+        print(f"PASS: Downsampled price history - points: {len(data['prices'])}")
+    
+    def test_price_history_columnar(self):
+        """Test columnar price history format with aggregates"""
+        response = requests.get(f"{BASE_URL}/api/prices/history/xrp?days=7&format=columnar&stats=true")
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["timestamps"]) == len(data["prices"]) > 0
+        assert data["stats"]["min"] <= data["stats"]["mean"] <= data["stats"]["max"]
+        print(f"PASS: Columnar price history - points: {len(data['prices'])}")
+    
+    def test_price_history_binary(self):
+        """Test binary Float64 price history frame"""
+        response = requests.get(f"{BASE_URL}/api/prices/history/xrp?days=7&format=binary")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/octet-stream"
+        n = int(response.headers["x-series-length"])
+        assert len(response.content) == n * 2 * 8
+        print(f"PASS: Binary price history - points: {n}")
+
+
+class TestPortfolio:
+    """Portfolio valuation tests"""
+    
+    def test_portfolio_valuation(self):
+        """Test portfolio returns per-chain and total USD values"""
+        response = requests.post(
+            f"{BASE_URL}/api/portfolio",
+            json={"addresses": {
+                "ethereum": "0xd8dA6BF26964aF9D7eEd9e03E53415D37aA96045",
+                "xrp": "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+            }}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert "total_usd" in data
+        assert "chains" in data
+        assert "assets" in data
+        print(f"PASS: Portfolio valuation - total: ${data['total_usd']}")
+    
+    def test_portfolio_history(self):
+        """Test portfolio history for an owned wallet and 404 for an unknown one"""
+        email = f"history_test_{uuid.uuid4().hex[:8]}@example.com"
+        token = requests.post(
+            f"{BASE_URL}/api/auth/register",
+            json={"email": email, "password": "TestPass123"}
+        ).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        wallet = requests.post(f"{BASE_URL}/api/wallets", headers=headers, json={"name": "History Wallet"}).json()
+        
+        response = requests.get(f"{BASE_URL}/api/portfolio/history?wallet_id={wallet['id']}&days=7", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["resolution"] == "hour"
+        assert isinstance(data["points"], list)
+        
+        missing = requests.get(f"{BASE_URL}/api/portfolio/history?wallet_id=unknown", headers=headers)
+        assert missing.status_code == 404
+        print(f"PASS: Portfolio history - points: {len(data['points'])}")
 
 
 class TestSwap:
@@ -351,7 +541,18 @@ class TestSwap:
         data = response.json()
         assert "to_amount" in data
         assert "exchange_rate" in data
+        assert data["route"][-1]["to"] == "xrp:XRP"
+        assert float(data["min_to_amount"]) <= float(data["to_amount"])
         print(f"PASS: Swap quote - rate: {data['exchange_rate']}")
+    
+    def test_swap_quote_unsupported(self):
+        """Test swap quote rejects unroutable tokens and invalid amounts"""
+        params = {"from_chain": "ethereum", "to_chain": "xrp", "from_token": "eth", "to_token": "xrp"}
+        response = requests.post(f"{BASE_URL}/api/swap/quote", params={**params, "from_token": "nope", "amount": "1"})
+        assert response.status_code == 400
+        response = requests.post(f"{BASE_URL}/api/swap/quote", params={**params, "amount": "abc"})
+        assert response.status_code == 400
+        print("PASS: Unsupported swap quotes rejected")
 
 
 if __name__ == "__main__":
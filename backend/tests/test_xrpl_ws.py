@@ -0,0 +1,141 @@
+"""
+XRPL WebSocket pool tests against a local mock rippled server
+"""
+import asyncio
+import json
+
+from websockets.asyncio.server import serve
+
+from xrpl_ws import XRPLWebSocketPool
+
+ACCOUNT = "rPT1Sjq2YGrBMTttX4GZHjKu9dyfzbpAYe"
+
+
+class MockRippled:
+    """Minimal rippled: account_info, subscribe/unsubscribe and a transaction push"""
+
+    def __init__(self):
+        self.balances = {ACCOUNT: "25000000"}
+        self.subscribed = set()
+        self.connections = []
+
+    async def handler(self, ws):
+        self.connections.append(ws)
+        async for raw in ws:
+            request = json.loads(raw)
+            command = request["command"]
+            if command == "account_info":
+                # Answer slow lookups last so responses arrive out of order
+                await asyncio.sleep(0.05 if request["account"].endswith("slow") else 0)
+                balance = self.balances.get(request["account"])
+                if balance is None:
+                    response = {"error": "actNotFound", "status": "error"}
+                else:
+                    response = {"result": {"account_data": {"Account": request["account"], "Balance": balance}}, "status": "success"}
+            elif command == "subscribe":
+                self.subscribed.update(request["accounts"])
+                response = {"result": {}, "status": "success"}
+            elif command == "unsubscribe":
+                self.subscribed.difference_update(request["accounts"])
+                response = {"result": {}, "status": "success"}
+            else:
+                response = {"error": "unknownCmd", "status": "error"}
+            await ws.send(json.dumps({**response, "id": request["id"], "type": "response"}))
+
+    async def push_payment(self, account: str, balance: str):
+        message = {
+            "type": "transaction",
+            "validated": True,
+            "meta": {"AffectedNodes": [{"ModifiedNode": {
+                "LedgerEntryType": "AccountRoot",
+                "FinalFields": {"Account": account, "Balance": balance},
+            }}]},
+        }
+        for ws in self.connections:
+            await ws.send(json.dumps(message))
+
+
+async def start_pool(mock, **kwargs):
+    server = await serve(mock.handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    pool = XRPLWebSocketPool(f"ws://127.0.0.1:{port}", size=2, **kwargs)
+    await pool.start()
+    for _ in range(100):
+        if all(c.connected for c in pool.connections):
+            break
+        await asyncio.sleep(0.01)
+    return server, pool
+
+
+def test_requests_are_correlated_by_id():
+    async def run():
+        mock = MockRippled()
+        mock.balances["rSlow"] = "1000000"
+        server, pool = await start_pool(mock)
+        try:
+            slow, fast, missing = await asyncio.gather(
+                pool.request("account_info", account="rSlow", ledger_index="validated"),
+                pool.request("account_info", account=ACCOUNT, ledger_index="validated"),
+                pool.request("account_info", account="rMissing", ledger_index="validated"),
+            )
+            assert slow["result"]["account_data"]["Balance"] == "1000000"
+            assert fast["result"]["account_data"]["Balance"] == "25000000"
+            assert missing["error"] == "actNotFound"
+        finally:
+            await pool.stop()
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_subscribed_account_balance_is_pushed():
+    async def run():
+        pushed = {}
+        mock = MockRippled()
+        server, pool = await start_pool(mock, on_balance=lambda account, drops: pushed.update({account: drops}))
+        try:
+            await pool.track(ACCOUNT)
+            assert ACCOUNT in mock.subscribed
+
+            await mock.push_payment(ACCOUNT, "30000000")
+            await mock.push_payment("rSomeoneElse", "1")
+            await asyncio.sleep(0.05)
+            assert pushed == {ACCOUNT: 30000000}
+        finally:
+            await pool.stop()
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_live_subscriptions_are_reported_lost_on_disconnect():
+    async def run():
+        lost = []
+        mock = MockRippled()
+        server, pool = await start_pool(mock, on_lost=lost.extend)
+        try:
+            await pool.track(ACCOUNT)
+            assert pool.is_live(ACCOUNT)
+
+            for ws in mock.connections:
+                await ws.close()
+            await asyncio.sleep(0.05)
+            assert not pool.is_live(ACCOUNT)
+            assert lost == [ACCOUNT]
+        finally:
+            await pool.stop()
+            server.close()
+
+    asyncio.run(run())
+
+
+def test_request_fails_without_connection():
+    async def run():
+        pool = XRPLWebSocketPool("ws://127.0.0.1:9", size=1)
+        try:
+            await pool.request("account_info", account=ACCOUNT)
+        except ConnectionError:
+            return
+        raise AssertionError("expected ConnectionError")
+
+    asyncio.run(run())
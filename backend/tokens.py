@@ -0,0 +1,190 @@
+"""
+Token balance helpers: Multicall3 ABI encoding, address/currency decoding
+and the permanent token metadata store.
+
+EVM token balances are read with one Multicall3 `aggregate3` eth_call
+per chain, so N tokens cost one RPC round trip. Token decimals and
+symbols never change, so they are looked up once and kept in-process
+and in the `token_metadata` collection.
+"""
+import hashlib
+import logging
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+# Same address on every chain it is deployed to; override per chain with "multicall3"
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+AGGREGATE3_SELECTOR = "82ad56cb"  # aggregate3((address,bool,bytes)[])
+BALANCE_OF = bytes.fromhex("70a08231")  # balanceOf(address)
+DECIMALS = bytes.fromhex("313ce567")  # decimals()
+SYMBOL = bytes.fromhex("95d89b41")  # symbol()
+
+SPL_TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+
+# Tokens checked when the caller does not name any
+DEFAULT_TOKENS: Dict[str, List[str]] = {
+    "ethereum": [
+        "0xdAC17F958D2ee523a2206206994597C13D831ec7",  # USDT
+        "0xA0b86991c6218b36c1d19D4a2E9Eb0cE3606eB48",  # USDC
+        "0x6B175474E89094C44Da98b954EedeAC495271d0F",  # DAI
+    ],
+    "bsc": [
+        "0x55d398326f99059fF775485246999027B3197955",  # USDT
+        "0x8AC76a51cc950d9822D68b83fE1Ad97B32Cd580d",  # USDC
+    ],
+    "polygon": [
+        "0xc2132D05D31c914a87C6611C10748AEb04B58e8F",  # USDT
+        "0x3c499c542cEF5E3811e1192ce70d8cC03d5c3359",  # USDC
+    ],
+    "arbitrum": [
+        "0xFd086bC7CD5C481DCC9C85ebE478A1C0b69FCbb9",  # USDT
+        "0xaf88d065e77c8cC2239327C5EDb3A432268e5831",  # USDC
+    ],
+    "optimism": ["0x0b2C639c533813f4Aa9D7837CAf62653d097Ff85"],  # USDC
+    "base": ["0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"],  # USDC
+    "avalanche": [
+        "0x9702230A8Ea53601f5cD2dc00fDBc13d4dF4A8c7",  # USDT
+        "0xB97EF9Ef8734C71904D8002F8b6Bc66Dd9c48a6E",  # USDC
+    ],
+    "tron": ["TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"],  # USDT
+}
+
+# SPL mints have no on-chain symbol without Metaplex; name the common ones
+SPL_SYMBOLS = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",
+    "Es9vMFrzaCERmJfrF4H2FYD4KCoNkY11McCe8BenwNYB": "USDT",
+}
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+
+# ---- ABI ----
+
+def _uint(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+def _word(data: bytes, offset: int) -> int:
+    return int.from_bytes(data[offset:offset + 32], "big")
+
+
+def encode_address(address: str) -> bytes:
+    return bytes(12) + bytes.fromhex(address[2:] if address.startswith("0x") else address)
+
+
+def encode_call(selector: bytes, *addresses: str) -> bytes:
+    return selector + b"".join(encode_address(a) for a in addresses)
+
+
+def encode_aggregate3(calls: List[Tuple[str, bytes]]) -> str:
+    """Calldata for aggregate3 over (target, callData) pairs, all with allowFailure"""
+    encoded = []
+    for target, data in calls:
+        padded = data + bytes(-len(data) % 32)
+        encoded.append(encode_address(target) + _uint(1) + _uint(0x60) + _uint(len(data)) + padded)
+    offsets, position = [], 32 * len(calls)
+    for item in encoded:
+        offsets.append(_uint(position))
+        position += len(item)
+    body = _uint(0x20) + _uint(len(calls)) + b"".join(offsets) + b"".join(encoded)
+    return "0x" + AGGREGATE3_SELECTOR + body.hex()
+
+
+def decode_aggregate3(result: str) -> List[Tuple[bool, bytes]]:
+    """(success, returnData) for each call from aggregate3's return value"""
+    data = bytes.fromhex(result[2:] if result.startswith("0x") else result)
+    array = _word(data, 0)
+    base = array + 32
+    decoded = []
+    for i in range(_word(data, array)):
+        item = base + _word(data, base + 32 * i)
+        start = item + _word(data, item + 32)
+        length = _word(data, start)
+        decoded.append((bool(_word(data, item)), data[start + 32:start + 32 + length]))
+    return decoded
+
+
+def decode_uint(data: bytes) -> Optional[int]:
+    return _word(data, 0) if len(data) >= 32 else None
+
+
+def decode_string(data: bytes) -> Optional[str]:
+    """ABI string, or the bytes32 some older tokens return for symbol()"""
+    if len(data) == 32:
+        return data.rstrip(b"\0").decode("utf-8", "replace") or None
+    if len(data) < 64:
+        return None
+    start = _word(data, 0)
+    return data[start + 32:start + 32 + _word(data, start)].decode("utf-8", "replace") or None
+
+
+# ---- Tron / XRPL ----
+
+def base58check_decode(value: str) -> bytes:
+    number = 0
+    for char in value:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    raw = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    raw = bytes(len(value) - len(value.lstrip("1"))) + raw
+    payload, checksum = raw[:-4], raw[-4:]
+    if hashlib.sha256(hashlib.sha256(payload).digest()).digest()[:4] != checksum:
+        raise ValueError(f"Bad base58check checksum: {value}")
+    return payload
+
+
+def tron_address_param(address: str) -> str:
+    """ABI-encoded address argument for a base58 Tron address (0x41 prefix dropped)"""
+    return encode_address(base58check_decode(address)[1:].hex()).hex()
+
+
+def decode_xrpl_currency(code: str) -> str:
+    """Three-letter codes pass through; 40-hex non-standard codes are decoded to text"""
+    if len(code) != 40:
+        return code
+    try:
+        return bytes.fromhex(code).rstrip(b"\0").decode("ascii") or code
+    except (ValueError, UnicodeDecodeError):
+        return code
+
+
+# ---- Metadata ----
+
+class TokenMetadataStore:
+    """Decimals/symbol per (chain, token), cached in-process and in Mongo forever"""
+
+    def __init__(self, db):
+        self.db = db
+        self.cache: Dict[Tuple[str, str], dict] = {}
+
+    async def get_many(self, chain: str, tokens: Iterable[str]) -> Dict[str, dict]:
+        found = {t: self.cache[(chain, t)] for t in tokens if (chain, t) in self.cache}
+        missing = [t for t in tokens if t not in found]
+        if missing:
+            try:
+                async for doc in self.db.token_metadata.find(
+                    {"chain": chain, "token": {"$in": missing}}, {"_id": 0, "chain": 0}
+                ):
+                    token = doc.pop("token")
+                    self.cache[(chain, token)] = found[token] = doc
+            except Exception as e:
+                logger.error(f"Error reading token metadata: {e}")
+        return found
+
+    async def put_many(self, chain: str, metadata: Dict[str, dict]):
+        if not metadata:
+            return
+        for token, meta in metadata.items():
+            self.cache[(chain, token)] = meta
+        try:
+            await self.db.token_metadata.bulk_write([
+                UpdateOne({"chain": chain, "token": token}, {"$set": meta}, upsert=True)
+                for token, meta in metadata.items()
+            ], ordered=False)
+        except Exception as e:
+            logger.error(f"Error storing token metadata: {e}")
+
+    def __len__(self):
+        return len(self.cache)
@@ -0,0 +1,362 @@
+"""
+Opt-in request tracing.
+
+Each HTTP request becomes a trace whose root span is opened by
+TracingMiddleware. Spans for balance lookups, routed RPC calls, upstream
+HTTP requests and Motor operations nest under it through a context
+variable, so tasks spawned by fan_out inherit the right parent. Finished
+traces are written as OTLP/JSON `resourceSpans` documents, one per line,
+to the console or a file, where an OpenTelemetry collector's file
+receiver or any JSON tooling can read them.
+
+TRACE_SAMPLE_RATE picks the fraction of requests that are always
+exported. With TRACE_SLOW_MS set, the remaining requests are recorded too
+but only exported when the request took at least that long. With neither,
+unsampled requests record nothing and a span costs one ContextVar lookup.
+"""
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TRACE_EXPORTER = os.environ.get("TRACE_EXPORTER", "").lower()  # "", "console" or "file"
+TRACE_FILE = os.environ.get("TRACE_FILE", "traces.jsonl")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 1.0))
+TRACE_SLOW_MS = float(os.environ.get("TRACE_SLOW_MS", 0))
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 1000))
+SERVICE_NAME = os.environ.get("SERVICE_NAME", "xrp-nexus-backend")
+
+SPAN_KIND = {"internal": 1, "server": 2, "client": 3}
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+_current: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Trace:
+    """Spans recorded for one request"""
+
+    __slots__ = ("trace_id", "sampled", "spans", "dropped")
+
+    def __init__(self, trace_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.sampled = sampled
+        self.spans: List["Span"] = []
+        self.dropped = 0
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: str = "internal",
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.trace = trace
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end: Optional[int] = None
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.end = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if len(self.trace.spans) < TRACE_MAX_SPANS:
+            self.trace.spans.append(self)
+        else:
+            self.trace.dropped += 1
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end or time.time_ns()) - self.start) / 1e6
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KIND[self.kind],
+            "startTimeUnixNano": str(self.start),
+            "endTimeUnixNano": str(self.end),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items() if v is not None],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class ConsoleExporter:
+    def export(self, line: str):
+        sys.stdout.write(line + "\n")
+
+
+class FileExporter:
+    def __init__(self, path: str):
+        self.file = open(path, "a", buffering=1)
+
+    def export(self, line: str):
+        self.file.write(line + "\n")
+
+
+class Tracer:
+    """Starts request traces and exports the ones that are sampled or slow"""
+
+    def __init__(self, exporter=None, sample_rate: float = TRACE_SAMPLE_RATE, slow_ms: float = TRACE_SLOW_MS):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self._stats = {"traces": 0, "exported": 0, "slow_exported": 0, "discarded": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None,
+                    attributes: Optional[Dict[str, Any]] = None) -> Optional[Span]:
+        """Root span for a request, or None when the request is not recorded"""
+        if self.exporter is None:
+            return None
+        match = TRACEPARENT.match(traceparent or "")
+        if match:
+            # Follow the caller's sampling decision so distributed traces stay whole
+            trace_id, parent_id = match.group(1), match.group(2)
+            sampled = bool(int(match.group(3), 16) & 1)
+        else:
+            trace_id, parent_id = os.urandom(16).hex(), None
+            sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return None
+        self._stats["traces"] += 1
+        return Span(Trace(trace_id, sampled), name, parent_id, "server", attributes)
+
+    def finish_trace(self, root: Span, error: Optional[BaseException] = None):
+        root.finish(error)
+        trace = root.trace
+        if trace.sampled:
+            self._stats["exported"] += 1
+        elif root.duration_ms >= self.slow_ms:
+            self._stats["slow_exported"] += 1
+        else:
+            self._stats["discarded"] += 1
+            return
+        document = {"resourceSpans": [{
+            "resource": {"attributes": [_attribute("service.name", SERVICE_NAME)]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": [s.to_otlp() for s in trace.spans]}],
+        }]}
+        try:
+            self.exporter.export(json.dumps(document, separators=(",", ":")))
+        except Exception as e:
+            logger.error(f"Error exporting trace: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "enabled": self.enabled, "sample_rate": self.sample_rate, "slow_ms": self.slow_ms}
+
+
+def _exporter_from_env():
+    if TRACE_EXPORTER == "console":
+        return ConsoleExporter()
+    if TRACE_EXPORTER == "file":
+        return FileExporter(TRACE_FILE)
+    return None
+
+
+tracer = Tracer(_exporter_from_env())
+
+
+def start_span(name: str, kind: str = "internal", **attributes) -> Optional[Span]:
+    """Child of the current span, not made current; None outside a recorded trace"""
+    parent = _current.get()
+    if parent is None:
+        return None
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+
+class span:
+    """Context manager for a child span of the current one; a no-op outside a recorded trace"""
+
+    __slots__ = ("name", "kind", "attributes", "span", "token")
+
+    def __init__(self, name: str, kind: str = "internal", **attributes):
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.span: Optional[Span] = None
+
+    def __enter__(self) -> Optional[Span]:
+        self.span = start_span(self.name, self.kind, **self.attributes)
+        if self.span is not None:
+            self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is not None:
+            _current.reset(self.token)
+            self.span.finish(exc)
+        return False
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request"""
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope.get("headers") or ())
+        traceparent = headers.get(b"traceparent", b"").decode("latin-1")
+        root = self.tracer.start_trace(
+            f"{scope['method']} {scope['path']}", traceparent,
+            {"http.method": scope["method"], "http.target": scope["path"]},
+        )
+        if root is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                root.set("http.status_code", message["status"])
+            await send(message)
+
+        token = _current.set(root)
+        error = None
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                root.name = f"{scope['method']} {route}"
+                root.set("http.route", route)
+            self.tracer.finish_trace(root, error)
+
+
+# ---- Motor ----
+
+class TracedCursor:
+    """Motor cursor proxy timing to_list() and async iteration"""
+
+    def __init__(self, cursor, name: str, attributes: Dict[str, Any]):
+        self._cursor = cursor
+        self._name = name
+        self._attributes = attributes
+
+    def __getattr__(self, name):
+        attr = getattr(self._cursor, name)
+        if not callable(attr):
+            return attr
+
+        def chained(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # sort()/limit()/skip() return the cursor itself; keep the proxy in the chain
+            return self if result is self._cursor else result
+        return chained
+
+    async def to_list(self, *args, **kwargs):
+        with span(self._name, "client", **self._attributes) as s:
+            result = await self._cursor.to_list(*args, **kwargs)
+            if s is not None:
+                s.set("db.documents", len(result))
+            return result
+
+    async def __aiter__(self):
+        s = start_span(self._name, "client", **self._attributes)
+        count = 0
+        error = None
+        try:
+            async for doc in self._cursor:
+                count += 1
+                yield doc
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            if s is not None:
+                s.set("db.documents", count)
+                s.finish(error)
+
+
+CURSOR_METHODS = {"find", "aggregate", "list_indexes"}
+ASYNC_METHODS = {
+    "find_one", "find_one_and_update", "find_one_and_replace", "find_one_and_delete",
+    "insert_one", "insert_many", "update_one", "update_many", "replace_one", "delete_one", "delete_many",
+    "bulk_write", "count_documents", "estimated_document_count", "distinct",
+    "create_index", "create_indexes", "drop_index", "index_information",
+}
+
+
+class TracedCollection:
+    """Motor collection proxy wrapping each operation in a client span"""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in CURSOR_METHODS and name not in ASYNC_METHODS:
+            return attr
+        attributes = {"db.system": "mongodb", "db.operation": name, "db.collection": self._collection.name}
+        span_name = f"mongo {self._collection.name}.{name}"
+        if name in CURSOR_METHODS:
+            return lambda *args, **kwargs: TracedCursor(attr(*args, **kwargs), span_name, attributes)
+
+        async def traced(*args, **kwargs):
+            with span(span_name, "client", **attributes):
+                return await attr(*args, **kwargs)
+        return traced
+
+
+class TracedDatabase:
+    """Motor database proxy returning traced collections"""
+
+    def __init__(self, database):
+        self._database = database
+        self._collections: Dict[str, TracedCollection] = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            return getattr(self._database, name)
+        collection = self._collections.get(name)
+        if collection is None:
+            collection = self._collections[name] = TracedCollection(self._database[name])
+        return collection
+
+    def __getitem__(self, name):
+        return self.__getattr__(name)
+
+    def command(self, *args, **kwargs):
+        return self._database.command(*args, **kwargs)
+
+
+def trace_database(database):
+    """The database itself when tracing is off, so untraced deployments pay nothing"""
+    return TracedDatabase(database) if tracer.enabled else database
@@ -0,0 +1,141 @@
+"""
+Shared upstream HTTP client for RPC nodes and price APIs.
+
+One pooled httpx.AsyncClient is kept per upstream host for the lifetime of
+the app, so balance and price handlers reuse warm TCP/TLS connections
+instead of handshaking on every request.
+"""
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from tracing import span
+
+try:
+    import h2  # noqa: F401 - only needed so httpx can negotiate HTTP/2
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST_LIMITS = {
+    "max_connections": int(os.environ.get("UPSTREAM_MAX_CONNECTIONS", 50)),
+    "max_keepalive_connections": int(os.environ.get("UPSTREAM_MAX_KEEPALIVE", 20)),
+    "keepalive_expiry": float(os.environ.get("UPSTREAM_KEEPALIVE_EXPIRY", 60.0)),
+    "http2": os.environ.get("UPSTREAM_HTTP2", "true").lower() == "true",
+}
+
+# Per-host overrides, e.g. UPSTREAM_HOST_LIMITS='{"api.coingecko.com": {"max_connections": 4}}'
+HOST_LIMITS: Dict[str, Dict[str, Any]] = {
+    "rpc.ankr.com": {"max_connections": 100, "max_keepalive_connections": 50},
+    "api.coingecko.com": {"max_connections": 4, "max_keepalive_connections": 2},
+    **json.loads(os.environ.get("UPSTREAM_HOST_LIMITS", "{}")),
+}
+
+
+class UpstreamClient:
+    """App-lifetime pool of per-host httpx clients"""
+
+    def __init__(self, host_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.host_limits = host_limits if host_limits is not None else HOST_LIMITS
+        self.transport = transport
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        # Called with (host, status or "error", seconds) after every request
+        self.listeners: List[Callable[[str, str, float], None]] = []
+
+    def _config_for(self, host: str) -> Dict[str, Any]:
+        return {**DEFAULT_HOST_LIMITS, **self.host_limits.get(host, {})}
+
+    def _client_for(self, host: str) -> httpx.AsyncClient:
+        client = self._clients.get(host)
+        if client is None:
+            config = self._config_for(host)
+            client = httpx.AsyncClient(
+                http2=config["http2"] and HTTP2_AVAILABLE,
+                limits=httpx.Limits(
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_keepalive_connections"],
+                    keepalive_expiry=config["keepalive_expiry"],
+                ),
+                timeout=10.0,
+                transport=self.transport,
+            )
+            self._clients[host] = client
+            self._stats[host] = {
+                "requests": 0, "in_flight": 0, "new_connections": 0, "reused_connections": 0,
+                "errors": 0, "http_versions": {},
+            }
+        return client
+
+    def open(self, urls: Iterable[str]):
+        """Create the pools for known upstream hosts ahead of the first request"""
+        for url in urls:
+            if url.startswith("http"):
+                self._client_for(urlsplit(url).netloc)
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        host = urlsplit(url).netloc
+        client = self._client_for(host)
+        stats = self._stats[host]
+        opened = False
+
+        async def trace(event_name: str, info: dict):
+            nonlocal opened
+            if event_name == "connection.connect_tcp.complete":
+                opened = True
+
+        stats["requests"] += 1
+        stats["in_flight"] += 1
+        started = time.perf_counter()
+        try:
+            with span(f"{method} {host}", "client", **{"http.method": method, "server.address": host}) as s:
+                response = await client.request(method, url, extensions={"trace": trace}, **kwargs)
+                if s is not None:
+                    s.set("http.status_code", response.status_code)
+        except Exception:
+            stats["errors"] += 1
+            for listener in self.listeners:
+                listener(host, "error", time.perf_counter() - started)
+            raise
+        finally:
+            stats["in_flight"] -= 1
+
+        for listener in self.listeners:
+            listener(host, str(response.status_code), time.perf_counter() - started)
+
+        stats["new_connections" if opened else "reused_connections"] += 1
+        versions = stats["http_versions"]
+        versions[response.http_version] = versions.get(response.http_version, 0) + 1
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        hosts = {}
+        for host, stats in self._stats.items():
+            config = self._config_for(host)
+            total = stats["new_connections"] + stats["reused_connections"]
+            hosts[host] = {
+                **stats,
+                "reuse_ratio": round(stats["reused_connections"] / total, 4) if total else 0,
+                "max_connections": config["max_connections"],
+                "http2": config["http2"] and HTTP2_AVAILABLE,
+            }
+        return {"hosts": hosts, "http2_available": HTTP2_AVAILABLE}
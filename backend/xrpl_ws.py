@@ -0,0 +1,238 @@
+"""
+Persistent XRPL WebSocket client.
+
+A small pool of long-lived rippled connections carries account_info and
+other commands, correlating responses by `id`. Accounts that are looked
+up are subscribed to, and balance changes from validated transactions
+are pushed to a callback instead of being polled. Accounts that have not
+been looked up for XRPL_WS_IDLE_TTL seconds are unsubscribed again.
+
+`live` holds the accounts whose subscription rippled has confirmed on a
+connection that is still up. When a connection drops or an account is
+swept, `on_lost` is told which accounts stopped receiving pushes, so
+balances cached on the strength of those pushes can be dropped.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from websockets.asyncio.client import connect
+
+logger = logging.getLogger(__name__)
+
+XRPL_WS_POOL_SIZE = int(os.environ.get("XRPL_WS_POOL_SIZE", 2))
+XRPL_WS_TIMEOUT = float(os.environ.get("XRPL_WS_TIMEOUT", 10))
+XRPL_WS_IDLE_TTL = float(os.environ.get("XRPL_WS_IDLE_TTL", 900))
+XRPL_WS_MAX_ACCOUNTS = int(os.environ.get("XRPL_WS_MAX_ACCOUNTS", 5000))
+
+
+class XRPLConnection:
+    """One rippled WebSocket with id-correlated requests"""
+
+    def __init__(self, url: str, on_stream: Callable[[dict], None]):
+        self.url = url
+        self.on_stream = on_stream
+        self.ws = None
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader: Optional[asyncio.Task] = None
+
+    @property
+    def connected(self) -> bool:
+        return self._reader is not None and not self._reader.done()
+
+    @property
+    def load(self) -> int:
+        return len(self._pending)
+
+    async def connect(self):
+        self.ws = await connect(self.url, max_size=8 * 1024 * 1024, open_timeout=XRPL_WS_TIMEOUT)
+        self._reader = asyncio.create_task(self._read())
+
+    async def close(self):
+        if self.ws is not None:
+            await self.ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def wait_closed(self):
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+
+    async def request(self, payload: dict, timeout: float = XRPL_WS_TIMEOUT) -> dict:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self.ws.send(json.dumps({**payload, "id": request_id}))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _read(self):
+        try:
+            async for raw in self.ws:
+                message = json.loads(raw)
+                if message.get("type") == "response" and "id" in message:
+                    future = self._pending.get(message["id"])
+                    if future is not None and not future.done():
+                        future.set_result(message)
+                else:
+                    try:
+                        self.on_stream(message)
+                    except Exception as e:
+                        logger.error(f"Error handling XRPL stream message: {e}")
+        except Exception as e:
+            logger.warning(f"XRPL WebSocket closed: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("XRPL WebSocket closed"))
+
+
+class XRPLWebSocketPool:
+    """Multiplexes XRPL commands and account subscriptions over a few connections"""
+
+    def __init__(self, url: str, size: int = XRPL_WS_POOL_SIZE,
+                 on_balance: Optional[Callable[[str, int], None]] = None,
+                 on_lost: Optional[Callable[[List[str]], None]] = None,
+                 idle_ttl: float = XRPL_WS_IDLE_TTL, max_accounts: int = XRPL_WS_MAX_ACCOUNTS):
+        self.url = url
+        self.size = size
+        self.on_balance = on_balance
+        self.on_lost = on_lost
+        self.idle_ttl = idle_ttl
+        self.max_accounts = max_accounts
+        self.connections: List[XRPLConnection] = []
+        self.accounts: Dict[str, float] = {}  # subscribed account -> last lookup time
+        self.live: Set[str] = set()  # accounts with a confirmed subscription on a connected socket
+        self._tasks: List[asyncio.Task] = []
+        self._stats = {"requests": 0, "pushes": 0, "reconnects": 0}
+
+    @property
+    def connected(self) -> bool:
+        return any(c.connected for c in self.connections)
+
+    async def start(self):
+        self.connections = [XRPLConnection(self.url, self._on_stream) for _ in range(self.size)]
+        self._tasks = [asyncio.create_task(self._supervise(i)) for i in range(self.size)]
+        self._tasks.append(asyncio.create_task(self._sweep_idle()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await asyncio.gather(*(c.close() for c in self.connections), return_exceptions=True)
+        self._tasks = []
+
+    async def request(self, command: str, **params) -> dict:
+        live = [c for c in self.connections if c.connected]
+        if not live:
+            raise ConnectionError("No XRPL WebSocket connection")
+        self._stats["requests"] += 1
+        return await min(live, key=lambda c: c.load).request({"command": command, **params})
+
+    async def track(self, address: str):
+        """Keep `address` subscribed while it is being looked up"""
+        if address in self.accounts:
+            self.accounts[address] = time.time()
+            return
+        if len(self.accounts) >= self.max_accounts:
+            return
+        self.accounts[address] = time.time()
+        connection = self._owner(address)
+        if connection.connected:
+            try:
+                await self._subscribe(connection, [address])
+            except Exception as e:
+                # Stays in self.accounts, so it is resubscribed on reconnect
+                logger.warning(f"XRPL subscribe failed: {e}")
+
+    def touch(self, address: str):
+        """Record a lookup served without calling track(), e.g. from a cache"""
+        if address in self.accounts:
+            self.accounts[address] = time.time()
+
+    def is_live(self, address: str) -> bool:
+        """Balance changes for `address` are being pushed right now"""
+        return address in self.live
+
+    async def _subscribe(self, connection: XRPLConnection, accounts: List[str]):
+        reply = await connection.request({"command": "subscribe", "accounts": accounts})
+        if reply.get("status") == "success" and connection.connected:
+            self.live.update(a for a in accounts if a in self.accounts)
+
+    def _lose(self, accounts: List[str]):
+        lost = [a for a in accounts if a in self.live]
+        self.live.difference_update(lost)
+        if lost and self.on_lost is not None:
+            self.on_lost(lost)
+
+    def _owner(self, address: str) -> XRPLConnection:
+        # Each account is subscribed on one fixed connection so pushes are not duplicated
+        return self.connections[hash(address) % len(self.connections)]
+
+    async def _supervise(self, index: int):
+        connection = self.connections[index]
+        attempt = 0
+        while True:
+            try:
+                await connection.connect()
+                attempt = 0
+                accounts = [a for a in self.accounts if self._owner(a) is connection]
+                if accounts:
+                    await self._subscribe(connection, accounts)
+                await connection.wait_closed()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"XRPL WebSocket connect failed: {e}")
+                await asyncio.gather(connection.close(), return_exceptions=True)
+            finally:
+                # Pushes for this connection's accounts stopped with it
+                self._lose([a for a in self.live if self._owner(a) is connection])
+            attempt += 1
+            self._stats["reconnects"] += 1
+            await asyncio.sleep(min(60, 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    async def _sweep_idle(self):
+        while True:
+            await asyncio.sleep(min(self.idle_ttl, 60))
+            cutoff = time.time() - self.idle_ttl
+            idle = [a for a, seen in self.accounts.items() if seen < cutoff]
+            self._lose(idle)
+            for address in idle:
+                del self.accounts[address]
+                connection = self._owner(address)
+                if connection.connected:
+                    try:
+                        await connection.request({"command": "unsubscribe", "accounts": [address]})
+                    except Exception as e:
+                        logger.warning(f"XRPL unsubscribe failed: {e}")
+
+    def _on_stream(self, message: dict):
+        if message.get("type") != "transaction" or not message.get("validated"):
+            return
+        for node in message.get("meta", {}).get("AffectedNodes", []):
+            kind, entry = next(iter(node.items()))
+            if entry.get("LedgerEntryType") != "AccountRoot":
+                continue
+            fields = entry.get("FinalFields") or entry.get("NewFields") or {}
+            account = fields.get("Account")
+            if account in self.accounts and self.on_balance is not None:
+                balance = 0 if kind == "DeletedNode" else int(fields.get("Balance", 0))
+                self._stats["pushes"] += 1
+                self.on_balance(account, balance)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "connections": sum(c.connected for c in self.connections),
+            "subscribed_accounts": len(self.accounts),
+            "live_accounts": len(self.live),
+        }
@@ -33,7 +33,7 @@ export default function Layout() {
   const location = useLocation();
   const navigate = useNavigate();
   
-  const { wallets, activeWalletId, setActiveWallet, getActiveWallet, fetchBalances, fetchPrices } = useWalletStore();
+  const { wallets, activeWalletId, setActiveWallet, getActiveWallet, fetchBalances, fetchPrices, fetchPortfolio, subscribeUpdates } = useWalletStore();
   const { user, token, isAuthenticated } = useAuthStore();
   const activeWallet = getActiveWallet();
 
@@ -42,16 +42,15 @@ export default function Layout() {
     if (activeWallet && token) {
       fetchBalances(token);
       fetchPrices();
+      fetchPortfolio();
     }
   }, [activeWalletId, token]);
 
-  // Periodic price refresh
+  // Balance and price changes are pushed by the server
   useEffect(() => {
-    const interval = setInterval(() => {
-      fetchPrices();
-    }, 60000);
-    return () => clearInterval(interval);
-  }, []);
+    if (!activeWallet) return undefined;
+    return subscribeUpdates();
+  }, [activeWalletId]);
 
   const handleWalletSelect = (walletId) => {
     setActiveWallet(walletId);
@@ -61,7 +61,7 @@ const CustomTooltip = ({ active, payload, label }) => {
 const PRIMARY_CHAINS = ['xrp', 'ethereum', 'bitcoin', 'solana', 'bsc', 'polygon', 'arbitrum', 'avalanche'];
 
 export default function Dashboard() {
-  const { getActiveWallet, balances, prices, fetchBalances, fetchPrices, isLoading } = useWalletStore();
+  const { getActiveWallet, balances, prices, portfolio, fetchBalances, fetchPrices, fetchPortfolio, isLoading } = useWalletStore();
   const { token } = useAuthStore();
   const activeWallet = getActiveWallet();
   const [refreshing, setRefreshing] = useState(false);
@@ -77,7 +77,7 @@ export default function Dashboard() {
 
   const handleRefresh = async () => {
     setRefreshing(true);
-    await Promise.all([fetchBalances(token), fetchPrices()]);
+    await Promise.all([fetchBalances(token), fetchPrices(), fetchPortfolio()]);
     setRefreshing(false);
   };
 
@@ -95,7 +95,8 @@ export default function Dashboard() {
     return total;
   };
 
-  const totalValue = calculateTotalValue();
+  // Server valuation also covers tokens and L2 symbols; fall back to the local estimate
+  const totalValue = portfolio ? portfolio.total_usd : calculateTotalValue();
   const xrpBalance = balances.xrp || 0;
   const xrpPrice = prices.xrp || 0;
   const xrpValue = xrpBalance * xrpPrice;
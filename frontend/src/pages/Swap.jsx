@@ -66,18 +66,20 @@ export default function Swap() {
 
   // Get swap quote
   const { data: quoteData, isLoading: quoteLoading } = useQuery({
-    queryKey: ['swapQuote', fromToken, 'XRP', fromAmount],
+    queryKey: ['swapQuote', fromToken, 'XRP', fromAmount, slippage],
     queryFn: async () => {
       if (!fromAmount || parseFloat(fromAmount) <= 0) return null;
       const fromTokenData = FROM_TOKENS.find(t => t.symbol === fromToken);
       
-      const response = await axios.post(`${API}/swap/quote`, {
-        from_chain: fromTokenData?.chain || 'ETH',
-        to_chain: 'XRP',
-        from_token: fromToken,
-        to_token: 'XRP',
-        amount: fromAmount,
-        from_address: activeWallet?.addresses[fromTokenData?.chain] || '',
+      const response = await axios.post(`${API}/swap/quote`, null, {
+        params: {
+          from_chain: fromTokenData?.chain || 'ethereum',
+          to_chain: 'xrp',
+          from_token: fromToken,
+          to_token: 'XRP',
+          amount: fromAmount,
+          slippage_bps: Math.round(parseFloat(slippage) * 100),
+        },
       });
       return response.data;
     },
@@ -305,7 +307,11 @@ export default function Swap() {
               </div>
               <div className="flex items-center justify-between text-sm">
                 <span className="text-slate-400">Route</span>
-                <span className="text-slate-300 text-xs">{fromToken} → XRP</span>
+                <span className="text-slate-300 text-xs">
+                  {quoteData.route?.length
+                    ? [quoteData.route[0].from, ...quoteData.route.map(hop => hop.to)].join(' → ')
+                    : `${fromToken} → XRP`}
+                </span>
               </div>
               <div className="flex items-center justify-between text-sm">
                 <span className="text-slate-400">Est. Gas</span>
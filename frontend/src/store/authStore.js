@@ -102,6 +102,12 @@ export const useAuthStore = create(
           throw new Error(error.detail || 'Update failed');
         }
 
+        // Tokens with embedded profile claims are reissued on update
+        const result = await response.json();
+        if (result.access_token) {
+          set({ token: result.access_token });
+        }
+
         if (data.name) {
           set((state) => ({
             user: { ...state.user, name: data.name },
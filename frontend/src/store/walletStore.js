@@ -4,6 +4,7 @@ import CryptoJS from 'crypto-js';
 import { generateMnemonic, validateMnemonic, deriveAllAddresses, CHAIN_CONFIG } from '../lib/wallet';
 
 const API = process.env.REACT_APP_BACKEND_URL + '/api';
+const PORTFOLIO_REFRESH_DEBOUNCE_MS = 2000;
 
 // Encryption utilities
 const encrypt = (data, password) => {
@@ -29,6 +30,7 @@ export const useWalletStore = create(
       activeWalletId: null,
       balances: {},
       prices: {},
+      portfolio: null,
       isLoading: false,
       lastBalanceUpdate: null,
 
@@ -61,23 +63,16 @@ export const useWalletStore = create(
           // Save to backend if authenticated
           if (token) {
             try {
-              await fetch(`${API}/wallets`, {
+              // Wallet and its addresses are saved in a single request
+              await fetch(`${API}/wallets/bulk`, {
                 method: 'POST',
                 headers: {
                   'Content-Type': 'application/json',
                   'Authorization': `Bearer ${token}`,
                 },
-                body: JSON.stringify({ name: wallet.name, mnemonic: encryptedMnemonic }),
-              });
-              
-              // Save addresses to backend
-              await fetch(`${API}/wallets/save-addresses?wallet_id=${wallet.id}`, {
-                method: 'POST',
-                headers: {
-                  'Content-Type': 'application/json',
-                  'Authorization': `Bearer ${token}`,
-                },
-                body: JSON.stringify(addresses),
+                body: JSON.stringify({
+                  wallets: [{ name: wallet.name, mnemonic: encryptedMnemonic, addresses }],
+                }),
               });
             } catch (e) {
               console.error('Failed to save wallet to backend:', e);
@@ -125,13 +120,15 @@ export const useWalletStore = create(
           // Save to backend if authenticated
           if (token) {
             try {
-              await fetch(`${API}/wallets/import`, {
+              await fetch(`${API}/wallets/bulk`, {
                 method: 'POST',
                 headers: {
                   'Content-Type': 'application/json',
                   'Authorization': `Bearer ${token}`,
                 },
-                body: JSON.stringify({ name: wallet.name, mnemonic: encryptedMnemonic }),
+                body: JSON.stringify({
+                  wallets: [{ name: wallet.name, mnemonic: encryptedMnemonic, addresses, is_imported: true }],
+                }),
               });
             } catch (e) {
               console.error('Failed to save wallet to backend:', e);
@@ -162,7 +159,7 @@ export const useWalletStore = create(
       },
 
       setActiveWallet: (walletId) => {
-        set({ activeWalletId: walletId });
+        set({ activeWalletId: walletId, portfolio: null });
       },
 
       deleteWallet: (walletId) => {
@@ -231,6 +228,64 @@ export const useWalletStore = create(
         }
       },
 
+      // Fetch server-side USD valuation (native + token balances)
+      fetchPortfolio: async () => {
+        const wallet = get().getActiveWallet();
+        if (!wallet) return;
+        
+        try {
+          const response = await fetch(`${API}/portfolio`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ addresses: wallet.addresses }),
+          });
+          
+          if (response.ok) {
+            set({ portfolio: await response.json() });
+          }
+        } catch (error) {
+          console.error('Failed to fetch portfolio:', error);
+        }
+      },
+
+      // Subscribe to pushed balance/price changes; returns a function that closes the stream
+      subscribeUpdates: () => {
+        const wallet = get().getActiveWallet();
+        if (!wallet || typeof EventSource === 'undefined') return () => {};
+
+        const pairs = Object.entries(wallet.addresses || {})
+          .filter(([, address]) => address)
+          .map(([chain, address]) => `${chain}:${address}`);
+        if (pairs.length === 0) return () => {};
+
+        const source = new EventSource(`${API}/stream?addresses=${encodeURIComponent(pairs.join(','))}`);
+
+        // Pushes move balances and prices; revalue the portfolio once a burst of them settles
+        let portfolioTimer = null;
+        const refreshPortfolio = () => {
+          clearTimeout(portfolioTimer);
+          portfolioTimer = setTimeout(() => get().fetchPortfolio(), PORTFOLIO_REFRESH_DEBOUNCE_MS);
+        };
+
+        source.addEventListener('balance', (event) => {
+          const data = JSON.parse(event.data);
+          get().updateBalances({ [data.chain]: data.balance || 0 });
+          set({ lastBalanceUpdate: new Date().toISOString() });
+          refreshPortfolio();
+        });
+
+        source.addEventListener('prices', (event) => {
+          const data = JSON.parse(event.data);
+          get().updatePrices(data.prices);
+          refreshPortfolio();
+        });
+
+        return () => {
+          clearTimeout(portfolioTimer);
+          source.close();
+        };
+      },
+
       updateBalances: (balances) => {
         set((state) => ({
           balances: { ...state.balances, ...balances },